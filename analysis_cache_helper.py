@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python3
+#%############################################################
+#%Regular package imports here
+#%############################################################
+import argparse
+import atexit
+import json
+import numpy
+import os
+#%############################################################
+#% Local file imports here
+#%############################################################
+import global_values
+import build_cache_helper
+
+######################################################################
+# constants
+######################################################################
+
+### Cache namespace of the pitch, intensity and formant analyses
+##### (see get_cached_analysis)
+ANALYSIS_CACHE_NAMESPACE = 'analyses'
+
+### Part of every analysis cache key; increase it whenever an analysis
+##### (of any engine) changes its results, so older entries are not used
+ANALYSIS_CACHE_VERSION = 1
+
+### Name of the file (in the cache directory, outside the namespace, so it is
+##### never evicted) which accumulates the hits and misses of all runs
+ANALYSIS_CACHE_STATISTICS_FILENAME = 'analysis_cache_statistics.json'
+
+######################################################################
+# variables
+######################################################################
+
+### Whether this run's hits and misses are added to the statistics file
+##### when the process exits (see save_analysis_cache_statistics)
+_is_saving_statistics = False
+
+######################################################################
+######################################################################
+### Get the path of the cache entry of an analysis
+#####
+#####
+### Arguments:
+##### wav_file_path		- the full path of the analyzed .wav file
+##### analysis			- the name of the analysis (e.g. 'pitch')
+##### parameters		- dict of every parameter of the analysis (including
+#####						its engine and time range)
+#####
+### Returns:
+##### string			- the path of the (.npz) entry; the name starts with the
+#####						content hash of the file, so entries of older content
+#####						are removed by build_cache_helper
+######################################################################
+######################################################################
+def get_analysis_cache_path(wav_file_path, analysis, parameters):
+	### (numbers are keyed by their value, so e.g. 60, 60.0 and numpy.float64(60) share an entry)
+	parameters = sorted((name, float(value) if isinstance(value, (int, float, numpy.number)) and not isinstance(value, bool) else value) for name, value in parameters.items())
+	content_hash = build_cache_helper.get_file_content_hash(wav_file_path)
+	cache_key = build_cache_helper.make_cache_key(ANALYSIS_CACHE_VERSION, analysis, parameters)
+	return build_cache_helper.get_cache_dir(ANALYSIS_CACHE_NAMESPACE) + content_hash + '_' + cache_key + '.npz'
+
+######################################################################
+######################################################################
+### Check whether the results of an analysis are cached (without loading
+##### them, or counting a hit or miss)
+#####
+#####
+### Arguments:
+##### wav_file_path ... parameters - see get_analysis_cache_path
+#####
+### Returns:
+##### bool				- True if the cache has an entry of the analysis
+######################################################################
+######################################################################
+def is_analysis_cached(wav_file_path, analysis, parameters):
+	if not global_values.use_analysis_cache:
+		return False
+	return os.path.isfile(get_analysis_cache_path(wav_file_path, analysis, parameters))
+
+######################################################################
+######################################################################
+### Store the results of an analysis which missed the cache (a compressed
+##### .npz file, counted as a miss), and remove the least recently used
+##### entries beyond global_values.analysis_cache_max_bytes
+#####
+##### Results with arrays of objects (e.g. None for undefined values) are
+##### not cached.
+#####
+#####
+### Arguments:
+##### wav_file_path ... parameters - see get_analysis_cache_path
+##### arrays			- dict of the result arrays (name -> numpy array)
+#####
+### Returns:
+##### (nothing)
+######################################################################
+######################################################################
+def save_cached_analysis(wav_file_path, analysis, parameters, arrays):
+	if not global_values.use_analysis_cache:
+		return
+	start_saving_analysis_cache_statistics()
+	build_cache_helper.count_cache_access(ANALYSIS_CACHE_NAMESPACE, False)
+	arrays = {name:numpy.asarray(array) for name, array in arrays.items()}
+	if any(array.dtype == object for array in arrays.values()):
+		return
+	analysis_file_path = get_analysis_cache_path(wav_file_path, analysis, parameters)
+	tmp_file_path = build_cache_helper.get_temporary_file_path(analysis_file_path)
+	with open(tmp_file_path, 'wb') as f:
+		numpy.savez_compressed(f, **arrays)
+	os.replace(tmp_file_path, analysis_file_path)
+	build_cache_helper.evict_least_recently_used(ANALYSIS_CACHE_NAMESPACE, global_values.analysis_cache_max_bytes, analysis_file_path)
+
+######################################################################
+######################################################################
+### Get the results of an analysis from the cache, or calculate (and cache)
+##### them on a miss
+#####
+#####
+### Arguments:
+##### wav_file_path ... parameters - see get_analysis_cache_path
+##### calculate			- function without arguments which calculates the
+#####						results (a dict of numpy arrays)
+#####
+### Returns:
+##### dict				- the result arrays (name -> numpy array)
+######################################################################
+######################################################################
+def get_cached_analysis(wav_file_path, analysis, parameters, calculate):
+	if not global_values.use_analysis_cache:
+		return calculate()
+	start_saving_analysis_cache_statistics()
+	analysis_file_path = get_analysis_cache_path(wav_file_path, analysis, parameters)
+	if os.path.isfile(analysis_file_path):
+		try:
+			with numpy.load(analysis_file_path, allow_pickle=False) as npz_file:
+				arrays = {name:npz_file[name] for name in npz_file.files}
+			build_cache_helper.touch_cache_entry(analysis_file_path)
+			build_cache_helper.count_cache_access(ANALYSIS_CACHE_NAMESPACE, True)
+			return arrays
+		except Exception:
+			### Unreadable entries are recalculated below
+			pass
+
+	arrays = calculate()
+	save_cached_analysis(wav_file_path, analysis, parameters, arrays)
+	return arrays
+
+######################################################################
+######################################################################
+### Read the hits and misses of all runs (see save_analysis_cache_statistics)
+#####
+#####
+### Arguments:
+##### (nothing)
+#####
+### Returns:
+##### dict				- hits and misses (both 0 if nothing was saved yet)
+######################################################################
+######################################################################
+def load_analysis_cache_statistics():
+	statistics = {'hits':0, 'misses':0}
+	try:
+		with open(build_cache_helper.get_cache_dir() + ANALYSIS_CACHE_STATISTICS_FILENAME, 'r') as f:
+			saved_statistics = json.load(f)
+		for name in statistics:
+			statistics[name] = int(saved_statistics.get(name, 0))
+	except (OSError, ValueError, AttributeError):
+		pass
+	return statistics
+
+######################################################################
+######################################################################
+### Add this run's hits and misses to the statistics of all runs
+##### (registered to run when the process exits, by
+##### start_saving_analysis_cache_statistics)
+#####
+#####
+### Arguments:
+##### (nothing)
+#####
+### Returns:
+##### (nothing)
+######################################################################
+######################################################################
+def save_analysis_cache_statistics():
+	run_statistics = build_cache_helper.get_cache_statistics(ANALYSIS_CACHE_NAMESPACE)
+	if run_statistics['hits'] == 0 and run_statistics['misses'] == 0:
+		return
+	statistics = load_analysis_cache_statistics()
+	for name in statistics:
+		statistics[name] += run_statistics[name]
+	try:
+		build_cache_helper.write_file_atomically(build_cache_helper.get_cache_dir() + ANALYSIS_CACHE_STATISTICS_FILENAME, json.dumps(statistics).encode('utf-8'))
+	except OSError:
+		pass
+
+######################################################################
+######################################################################
+### Make sure this run's hits and misses are saved when the process exits
+#####
+#####
+### Arguments:
+##### (nothing)
+#####
+### Returns:
+##### (nothing)
+######################################################################
+######################################################################
+def start_saving_analysis_cache_statistics():
+	global _is_saving_statistics
+	if not _is_saving_statistics:
+		_is_saving_statistics = True
+		atexit.register(save_analysis_cache_statistics)
+
+######################################################################
+######################################################################
+### Get the statistics of the analysis cache
+#####
+#####
+### Arguments:
+##### (nothing)
+#####
+### Returns:
+##### dict				- run_hits, run_misses, run_hit_rate (of this run),
+#####						total_hits, total_misses, total_hit_rate (of all runs,
+#####						including this one), num_entries, num_bytes and max_bytes
+######################################################################
+######################################################################
+def get_analysis_cache_statistics():
+	run_statistics = build_cache_helper.get_cache_statistics(ANALYSIS_CACHE_NAMESPACE)
+	total_statistics = load_analysis_cache_statistics()
+	if _is_saving_statistics:
+		for name in total_statistics:
+			total_statistics[name] += run_statistics[name]
+	num_entries, num_bytes = build_cache_helper.get_cache_size(ANALYSIS_CACHE_NAMESPACE)
+	return {
+		'run_hits':run_statistics['hits'],
+		'run_misses':run_statistics['misses'],
+		'run_hit_rate':build_cache_helper.get_cache_hit_rate(run_statistics),
+		'total_hits':total_statistics['hits'],
+		'total_misses':total_statistics['misses'],
+		'total_hit_rate':build_cache_helper.get_cache_hit_rate(total_statistics),
+		'num_entries':num_entries,
+		'num_bytes':num_bytes,
+		'max_bytes':global_values.analysis_cache_max_bytes,
+	}
+
+######################################################################
+######################################################################
+### Remove every cached analysis, and reset the statistics of all runs
+#####
+#####
+### Arguments:
+##### (nothing)
+#####
+### Returns:
+##### int				- the number of entries removed
+######################################################################
+######################################################################
+def purge_analysis_cache():
+	num_removed = build_cache_helper.purge_cache(ANALYSIS_CACHE_NAMESPACE)
+	try:
+		os.remove(build_cache_helper.get_cache_dir() + ANALYSIS_CACHE_STATISTICS_FILENAME)
+	except OSError:
+		pass
+	return num_removed
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Show the statistics of the cache of pitch, intensity and formant analyses, or purge it.')
+	parser.add_argument('command', nargs='?', choices=('stats', 'purge'), default='stats', help='show the statistics (default), or remove every cached analysis')
+	args = parser.parse_args()
+	if args.command == 'purge':
+		print('removed ' + str(purge_analysis_cache()) + ' cached analyses')
+	else:
+		statistics = get_analysis_cache_statistics()
+		print('entries: ' + str(statistics['num_entries']) + ' (' + str(statistics['num_bytes']) + ' bytes, limit ' + str(statistics['max_bytes']) + ')')
+		print('hits: ' + str(statistics['total_hits']) + ', misses: ' + str(statistics['total_misses']) + ' (hit rate ' + '{:.1%}'.format(statistics['total_hit_rate']) + ')')
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python3
+#%############################################################
+#%Regular package imports here
+#%############################################################
+import numpy
+#%############################################################
+#% Local file imports here
+#%############################################################
+import global_path_helper
+import audio_file_helper
+import waveform_peaks_helper
+import wav_file_helper
+
+######################################################################
+
+class TimeAxis:
+	"""
+	a class to describe the times of evenly spaced samples by their start
+	time, sample rate and count, instead of by an allocated array. indexing
+	works like it does for a numpy array (single indices return a float,
+	slices return a numpy array of only the requested times), and the whole
+	axis is only materialized when it is converted with numpy.asarray().
+	"""
+
+	# ---------------------------------------------------------------------- #
+
+	def __init__(self, start_time, sample_rate, num_samples):
+		"""
+		@param start_time the time of the first sample [s]
+		@param sample_rate the number of samples per second
+		@param num_samples the number of samples
+		"""
+		self.start_time = start_time
+		self.sample_rate = sample_rate
+		self.num_samples = num_samples
+
+	# ---------------------------------------------------------------------- #
+
+	def __len__(self):
+		return self.num_samples
+
+	# ---------------------------------------------------------------------- #
+
+	def __getitem__(self, index):
+		if isinstance(index, slice):
+			return self.get_time(numpy.arange(*index.indices(self.num_samples)))
+		if index < 0:
+			index += self.num_samples
+		if index < 0 or index >= self.num_samples:
+			raise IndexError("index " + str(index) + " is out of bounds for a time axis of " + str(self.num_samples) + " samples")
+		return self.get_time(index)
+
+	# ---------------------------------------------------------------------- #
+
+	def __array__(self, dtype=None, copy=None):
+		return numpy.asarray(self[:], dtype=dtype)
+
+	# ---------------------------------------------------------------------- #
+
+	def get_time(self, sample_index):
+		"""
+		@param sample_index an index (or a numpy array of indices) of a sample
+		@return the time(s) of the sample(s) [s]
+		"""
+		return self.start_time + sample_index / float(self.sample_rate)
+
+######################################################################
+
+class AudioBuffer:
+	"""
+	a class to hold the (mono) samples of a time range of a .wav file,
+	decoded at most once, together with everything the plotting stages need to know
+	about them (sample rate, bit depth, peak amplitude, and the mapping
+	between sample indices and times). one AudioBuffer is shared by the
+	waveform, spectrogram, pitch, intensity and formant stages of a figure.
+	"""
+
+	# ---------------------------------------------------------------------- #
+
+	def __init__(self, wav_file_path, startTime=0.0, endTime=-1):
+		"""
+		@param wav_file_path the full path of a (mono) .wav file
+		@param startTime beginning point of the .wav file to decode [s]
+		@param endTime ending point of the .wav file to decode [s] (-1
+			means "end of file")
+		"""
+		self.wav_file_path = wav_file_path
+		self.wav_file = wav_file_helper.WavFile(wav_file_path)
+		self.sample_rate = self.wav_file.sample_rate
+		self.bit_depth = self.wav_file.bit_depth
+		self.start_frame = self.wav_file.time_to_frame(startTime)
+		self.end_frame = self.wav_file.time_to_frame(endTime)
+		self.start_time = max(startTime, 0.0)
+		self.end_time = endTime
+		if self.end_frame <= self.start_frame:
+			raise Exception("file '" + wav_file_path + "' contains no audio data between " + str(startTime) + " s and " + str(endTime) + " s")
+		self._data = None
+		self._statistics = None
+		self._peak_pyramid = None
+		self._data_max = None
+
+	# ---------------------------------------------------------------------- #
+
+	@classmethod
+	def from_wav_filename(cls, wavFilename, startTime=0.0, endTime=-1):
+		"""
+		@param wavFilename the name of a .wav file within the Tex audio
+			subdirectory (multi-channel files are replaced by their mono downmix)
+		@param startTime beginning point of the .wav file to decode [s]
+		@param endTime ending point of the .wav file to decode [s]
+		@return a new AudioBuffer
+		"""
+		wav_file_path = audio_file_helper.get_full_wav_file_path(wavFilename)
+		global_path_helper.verify_file_exists(wav_file_path)
+		return cls(wav_file_path, startTime, endTime)
+
+	# ---------------------------------------------------------------------- #
+
+	def get_num_samples(self):
+		"""
+		@return the number of samples in the time range
+		"""
+		return self.end_frame - self.start_frame
+
+	# ---------------------------------------------------------------------- #
+
+	def get_data(self):
+		"""
+		@return the (float32) samples, normalized to 16-bit range (see
+			audio_file_helper.get_mono_data). they are decoded on the first
+			call only.
+		"""
+		if self._data is None:
+			self._data = audio_file_helper.get_mono_data(self.wav_file, self.start_frame, self.end_frame)
+		return self._data
+
+	# ---------------------------------------------------------------------- #
+
+	def get_statistics(self):
+		"""
+		@return the level statistics (peak, RMS, dBFS, clip count, DC offset)
+			of the samples, see audio_file_helper.get_data_statistics. they
+			are cached on disk (see waveform_peaks_helper.get_cached_audio_statistics),
+			so the samples (or, if they are not decoded yet, the file in
+			chunks) are only read if the range is not cached yet.
+		"""
+		if self._statistics is None:
+			self._statistics = waveform_peaks_helper.get_cached_audio_statistics(self.wav_file, self.start_frame, self.end_frame, self._data)
+		return self._statistics
+
+	# ---------------------------------------------------------------------- #
+
+	def get_peak_pyramid(self):
+		"""
+		@return the (cached) waveform_peaks_helper.PeakPyramid of the whole file
+		"""
+		if self._peak_pyramid is None:
+			self._peak_pyramid = waveform_peaks_helper.get_cached_peak_pyramid(self.wav_file)
+		return self._peak_pyramid
+
+	# ---------------------------------------------------------------------- #
+
+	def get_data_max(self):
+		"""
+		@return the largest amplitude (either negative or positive), in
+			16-bit range. unless the samples or their statistics are already
+			at hand, it is taken from the peak pyramid of the file, so only
+			the samples of the partially covered buckets at both ends of the
+			range are read (drawing the cached waveform envelope, or a cached
+			spectrogram, of a long recording never decodes all of it).
+		"""
+		if self._data_max is None:
+			if self._statistics is not None:
+				self._data_max = self._statistics['peak']
+			elif self._data is not None:
+				self._data_max = max(-float(numpy.amin(self._data)), float(numpy.amax(self._data)), 0.)
+			else:
+				read_samples = lambda start_sample, end_sample: audio_file_helper.get_mono_data(self.wav_file, start_sample, end_sample)
+				self._data_max = self.get_peak_pyramid().get_absolute_peak(self.start_frame, self.end_frame, read_samples)
+		return self._data_max
+
+	# ---------------------------------------------------------------------- #
+
+	def get_peak_amplitude(self):
+		"""
+		@return the peak amplitude in dB, see audio_file_helper.get_peak_amplitude
+		"""
+		return audio_file_helper.get_peak_amplitude(self.get_data_max(), self.bit_depth)
+
+	# ---------------------------------------------------------------------- #
+
+	def get_times(self):
+		"""
+		@return the TimeAxis of the decoded samples (times are only
+			computed for the samples that are actually looked up)
+		"""
+		return TimeAxis(self.start_time, self.sample_rate, self.get_num_samples())
+
+	# ---------------------------------------------------------------------- #
+
+	def get_last_sample_time(self):
+		"""
+		@return the time of the last decoded sample [s]
+		"""
+		return self.get_times()[-1]
+
+	# ---------------------------------------------------------------------- #
+
+	def frame_to_time(self, frame):
+		"""
+		@param frame a frame index (or a numpy array of frame indices) of the
+			whole .wav file
+		@return the time(s) of the frame(s) on the time axis of this buffer [s]
+		"""
+		return self.get_times().get_time(frame - self.start_frame)
@@ -4,13 +4,27 @@
 #%Regular package imports here
 #%############################################################
 #import inspect
+import json
+import math
 import numpy
 import os
-import pydub
 #%############################################################
 #% Local file imports here
 #%############################################################
 import global_values
+import build_cache_helper
+import derived_audio_helper
+import wav_file_helper
+
+### File (inside the cache directory) which stores the header metadata of
+##### every .wav file in audio_dir, keyed by filename (with size/modification time)
+AUDIO_DIR_INDEX_FILENAME = 'audio_dir_index.json'
+
+### The audio_dir metadata index loaded (and refreshed) during this run
+_audio_dir_index = None
+
+### Number of frames decoded at a time while computing level statistics
+STATISTICS_CHUNK_SIZE = 262144
 
 ######################################################################
 ######################################################################
@@ -28,24 +42,207 @@ import global_values
 ######################################################################
 ######################################################################
 def get_samplerate_bitdepth_data_peakamplitude(wav_file_path, startTime=0, endTime=-1):
-	wav_data = pydub.AudioSegment.from_file(wav_file_path, format='wav')
-	
-	wav_data = wav_data[(startTime*1000):(endTime*1000 if endTime >= 0 else -1)]
+	### Only the requested frame range of the (memory-mapped) file is touched
+	wav_file = wav_file_helper.WavFile(wav_file_path)
+	data = get_mono_data(wav_file, wav_file.time_to_frame(startTime), wav_file.time_to_frame(endTime))
+
+	sample_rate = wav_file.sample_rate
+	bit_depth = wav_file.bit_depth
+
+	peak_amplitude = get_peak_amplitude(max(abs(float(numpy.amin(data))), abs(float(numpy.amax(data)))), bit_depth)
+
+	wav_file = None
+
+	return sample_rate, bit_depth, data, peak_amplitude
+
+######################################################################
+######################################################################
+### Get the (mono) data of a frame range of a .wav file, in 16-bit range
+#####
+#####
+### Arguments:
+##### wav_file			- a wav_file_helper.WavFile
+##### start_frame		- the first frame to read
+##### end_frame			- the frame after the last frame to read (-1 means "end of file")
+#####
+### Returns:
+##### data				- the (float32) data of the .wav file (channels averaged,
+#####						24-bit, 32-bit and float data normalized down to 16-bit range)
+######################################################################
+######################################################################
+def get_mono_data(wav_file, start_frame=0, end_frame=-1):
+	### A view onto the memory-mapped file (no copy yet)
+	frames = wav_file.read_frames(start_frame, end_frame)
+
+	### The only copy: mix multi-channel audio down to mono (by averaging
+		# the channels), or convert the single channel, straight into float32
+	if wav_file.channels > 1:
+		data = frames.mean(axis=1, dtype=numpy.float32)
+	else:
+		data = frames[:, 0].astype(numpy.float32)
+	frames = None
 
-	sample_rate = wav_data.frame_rate
-	bit_depth = wav_data.sample_width * 8
-	
+	### Float data is scaled to the range of 32-bit PCM (and then to 16-bit range)
+	if wav_file.is_float():
+		data *= 2**15
 	### Normalize the data down to 16-bit range (if .wav file is 24-bits or 32-bits)
+	elif wav_file.bit_depth > 16:
+		data *= 2**-16
+	return data
+
+######################################################################
+######################################################################
+### Get the data of every channel of a frame range of a .wav file, in
+##### Praat's units (full scale is 1)
+#####
+#####
+### Arguments:
+##### wav_file			- a wav_file_helper.WavFile
+##### start_frame		- the first frame to read
+##### end_frame			- the frame after the last frame to read (-1 means "end of file")
+#####
+### Returns:
+##### data				- the (float64) data of the .wav file, shape (frames, channels)
+######################################################################
+######################################################################
+def get_channel_data(wav_file, start_frame=0, end_frame=-1):
+	data = wav_file.read_frames(start_frame, end_frame).astype(numpy.float64)
+	### (8-bit PCM is read as signed 8-bit values, 24-bit PCM is left-justified into 32 bits)
+	if not wav_file.is_float():
+		data *= 1. / (128. if wav_file.bit_depth == 8 else 2.**15 if wav_file.bit_depth == 16 else 2.**31)
+	return data
+
+######################################################################
+######################################################################
+### Get the peak amplitude (in dB) from the largest absolute data value
+#####
+#####
+### Arguments:
+##### data_max			- the largest absolute value of the data (in 16-bit range)
+##### bit_depth			- the bit depth of the .wav file
+#####
+### Returns:
+##### peak_amplitude	- the peak amplitude/intensity of the .wav file (e.g. 62 dB, etc.)
+######################################################################
+######################################################################
+def get_peak_amplitude(data_max, bit_depth):
+	### Samples are decoded into 16-bit (8/16-bit PCM) or 32-bit (24/32-bit PCM, float) containers
 	if bit_depth > 16:
-		data = numpy.divide(wav_data.get_array_of_samples(), 2**16)
-	else:
-		data = wav_data.get_array_of_samples()
+		return 20 * numpy.log10(data_max * 2**16) / 3
+	return 20 * numpy.log10(data_max)
 
-	peak_amplitude = 20 * numpy.log10(wav_data.max) / (wav_data.sample_width-1)
-	
-	wav_data = None
-	
-	return sample_rate, bit_depth, data, peak_amplitude
+######################################################################
+######################################################################
+### Get the level statistics of a frame range of a .wav file, in a single
+##### pass over fixed-size chunks (so memory use does not depend on the
+##### length of the range)
+#####
+#####
+### Arguments:
+##### wav_file			- a wav_file_helper.WavFile
+##### start_frame		- the first frame to read
+##### end_frame			- the frame after the last frame to read (-1 means "end of file")
+##### chunk_size		- the number of frames decoded at a time
+#####
+### Returns:
+##### dict				- see get_data_statistics
+######################################################################
+######################################################################
+def get_audio_statistics(wav_file, start_frame=0, end_frame=-1, chunk_size=STATISTICS_CHUNK_SIZE):
+	if end_frame is None or end_frame < 0 or end_frame > wav_file.num_frames:
+		end_frame = wav_file.num_frames
+	chunks = (get_mono_data(wav_file, chunk_start, min(chunk_start + chunk_size, end_frame))
+				for chunk_start in range(start_frame, end_frame, chunk_size))
+	return get_data_statistics(chunks, wav_file.bit_depth, wav_file.is_float())
+
+######################################################################
+######################################################################
+### Get the level statistics of (mono) data, one chunk at a time
+#####
+#####
+### Arguments:
+##### chunks			- iterable of (mono, 16-bit range) data arrays, see get_mono_data
+##### bit_depth			- the bit depth of the .wav file
+##### is_float			- whether the .wav file holds float samples
+#####
+### Returns:
+##### dict				- num_samples, peak (largest absolute value, in 16-bit range),
+#####						peak_amplitude (see get_peak_amplitude), peak_dBFS,
+#####						rms, rms_dBFS, dc_offset, and clip_count (number of
+#####						samples at (or beyond) full scale)
+######################################################################
+######################################################################
+def get_data_statistics(chunks, bit_depth, is_float=False):
+	### Full scale (in the units of get_mono_data) and the level at which
+		# PCM samples count as clipped (within one 16-bit step of full scale)
+	full_scale = get_full_scale(bit_depth)
+	clip_level = full_scale if is_float else full_scale - 1
+
+	num_samples = 0
+	data_min, data_max = 0., 0.
+	data_sum, data_sum_of_squares = 0., 0.
+	clip_count = 0
+	for chunk in chunks:
+		if len(chunk) == 0:
+			continue
+		num_samples += len(chunk)
+		data_min = min(data_min, float(numpy.amin(chunk)))
+		data_max = max(data_max, float(numpy.amax(chunk)))
+		### Sums are accumulated in float64 (a float32 sum drifts over long recordings)
+		chunk = chunk.astype(numpy.float64)
+		data_sum += float(numpy.sum(chunk))
+		data_sum_of_squares += float(numpy.dot(chunk, chunk))
+		clip_count += int(numpy.count_nonzero(numpy.abs(chunk) >= clip_level))
+
+	if num_samples == 0:
+		raise Exception("no audio data to compute statistics of")
+
+	peak = max(-data_min, data_max)
+	rms = math.sqrt(data_sum_of_squares / num_samples)
+	return {
+		'num_samples':num_samples,
+		'peak':peak,
+		'peak_amplitude':get_peak_amplitude(peak, bit_depth),
+		'peak_dBFS':get_dBFS(peak, full_scale),
+		'rms':rms,
+		'rms_dBFS':get_dBFS(rms, full_scale),
+		'dc_offset':data_sum / num_samples,
+		'clip_count':clip_count,
+	}
+
+######################################################################
+######################################################################
+### Get the full scale amplitude of data returned by get_mono_data
+##### (8-bit data keeps its own range, everything else is in 16-bit range)
+#####
+#####
+### Arguments:
+##### bit_depth			- the bit depth of the .wav file
+#####
+### Returns:
+##### float				- the full scale amplitude
+######################################################################
+######################################################################
+def get_full_scale(bit_depth):
+	return 128. if bit_depth == 8 else 2.**15
+
+######################################################################
+######################################################################
+### Get a level in decibels relative to full scale (dBFS)
+#####
+#####
+### Arguments:
+##### level				- an amplitude (e.g. peak or RMS)
+##### full_scale		- the full scale amplitude (in the same units)
+#####
+### Returns:
+##### float				- the level in dBFS (-inf for silence)
+######################################################################
+######################################################################
+def get_dBFS(level, full_scale):
+	if level <= 0:
+		return float('-inf')
+	return 20 * math.log10(level / full_scale)
 
 ######################################################################
 ######################################################################
@@ -80,7 +277,143 @@ def get_data_dB(data=[]):
 ######################################################################
 ######################################################################
 def get_wav_file_channels(wavFilename=''):
-	return pydub.AudioSegment.from_file(global_values.audio_dir + wavFilename, format='wav').channels
+	return get_audio_file_metadata(wavFilename)['channels']
+
+######################################################################
+######################################################################
+### Get the duration of an audio file within the current Tex project
+#####
+#####
+### Arguments:
+##### wavFilename		- the name of the .wav file
+#####
+### Returns:
+##### float				- duration (in seconds) of the .wav file
+#####						(within the Tex audio subdirectory)
+######################################################################
+######################################################################
+def get_wav_file_duration(wavFilename=''):
+	return get_audio_file_metadata(wavFilename)['duration']
+
+######################################################################
+######################################################################
+### Get the (header) metadata of an audio file within the current Tex project
+##### from the audio_dir index (probing the header only if the file is new
+##### or its size/modification time changed)
+#####
+#####
+### Arguments:
+##### wavFilename		- the name of the .wav file
+#####
+### Returns:
+##### dict				- channels, sample_rate, bit_depth, is_float,
+#####						num_frames, and duration (in seconds)
+######################################################################
+######################################################################
+def get_audio_file_metadata(wavFilename=''):
+	index = load_audio_dir_index()
+	if refresh_audio_dir_index_entry(index, wavFilename):
+		save_audio_dir_index(index)
+	return index[wavFilename]
+
+######################################################################
+######################################################################
+### Load the audio_dir metadata index (once per run), refreshing every entry
+#####
+#####
+### Arguments:
+##### (nothing)
+#####
+### Returns:
+##### dict				- .wav filename -> metadata (see get_audio_file_metadata)
+######################################################################
+######################################################################
+def load_audio_dir_index():
+	global _audio_dir_index
+	if _audio_dir_index is None:
+		_audio_dir_index = {}
+		index_file_path = build_cache_helper.get_cache_dir() + AUDIO_DIR_INDEX_FILENAME
+		if os.path.isfile(index_file_path):
+			try:
+				with open(index_file_path, 'r') as f:
+					_audio_dir_index = json.load(f)
+			except ValueError:
+				### A corrupt index is simply rebuilt
+				_audio_dir_index = {}
+		refresh_audio_dir_index(_audio_dir_index)
+	return _audio_dir_index
+
+######################################################################
+######################################################################
+### Bring the audio_dir metadata index up to date with the audio directory
+#####
+#####
+### Arguments:
+##### index				- the index (as returned by load_audio_dir_index)
+#####
+### Returns:
+##### (nothing)
+######################################################################
+######################################################################
+def refresh_audio_dir_index(index):
+	is_changed = False
+	wav_filenames = []
+	if os.path.isdir(global_values.audio_dir):
+		wav_filenames = [filename for filename in os.listdir(global_values.audio_dir) if filename.lower().endswith('.wav')]
+	### Forget files which no longer exist
+	for wavFilename in list(index.keys()):
+		if wavFilename not in wav_filenames:
+			del index[wavFilename]
+			is_changed = True
+	for wavFilename in wav_filenames:
+		try:
+			is_changed = refresh_audio_dir_index_entry(index, wavFilename) or is_changed
+		except Exception:
+			### Files which are not (supported) RIFF/WAVE files are left out of the index
+			index.pop(wavFilename, None)
+	if is_changed:
+		save_audio_dir_index(index)
+
+######################################################################
+######################################################################
+### Probe one file of the audio directory, if it is not indexed yet or
+##### its size or modification time changed
+#####
+#####
+### Arguments:
+##### index				- the index (as returned by load_audio_dir_index)
+##### wavFilename		- the name of the .wav file
+#####
+### Returns:
+##### bool				- True if the entry was (re-)probed
+######################################################################
+######################################################################
+def refresh_audio_dir_index_entry(index, wavFilename):
+	file_stat = os.stat(global_values.audio_dir + wavFilename)
+	entry = index.get(wavFilename)
+	if entry is not None and entry['size'] == file_stat.st_size and entry['mtime_ns'] == file_stat.st_mtime_ns:
+		return False
+	entry = wav_file_helper.probe_wav_file(global_values.audio_dir + wavFilename)
+	entry['size'] = file_stat.st_size
+	entry['mtime_ns'] = file_stat.st_mtime_ns
+	index[wavFilename] = entry
+	return True
+
+######################################################################
+######################################################################
+### Write the audio_dir metadata index (below python_build_dir)
+#####
+#####
+### Arguments:
+##### index				- the index (as returned by load_audio_dir_index)
+#####
+### Returns:
+##### (nothing)
+######################################################################
+######################################################################
+def save_audio_dir_index(index):
+	build_cache_helper.write_file_atomically(build_cache_helper.get_cache_dir() + AUDIO_DIR_INDEX_FILENAME,
+												json.dumps(index, indent='\t', sort_keys=True).encode())
 
 ######################################################################
 ######################################################################
@@ -96,16 +429,10 @@ def get_wav_file_channels(wavFilename=''):
 ######################################################################
 ######################################################################
 def convert_wav_file_to_mono(wavFilename=''):
-	### Get the original .wav file as a pydub.AudioSegment
-	sound = pydub.AudioSegment.from_file(global_values.audio_dir + wavFilename, format='wav')
-	### Set the pydub.AudioSegment object down to mono (1 channel)
-	sound = sound.set_channels(1)
-	### Create a new filename with "_mono" in the name (so that we retain the original multi-channel .wav file
-	new_mono_wav_filename = (global_values.audio_dir + wavFilename)[:-4]+'_mono.wav'
-	### Write the new pydub.AudioSegment audio to a file
-	sound.export(new_mono_wav_filename, format='wav')
-	### Return the name of the new mono (1 channel) .wav file
-	return new_mono_wav_filename
+	### The mono file lives in the (content-addressed) derived audio store,
+	##### so it is only written once per source content and the audio
+	##### directory itself is never modified
+	return derived_audio_helper.get_mono_wav_file(global_values.audio_dir + wavFilename)
 
 ######################################################################
 ######################################################################
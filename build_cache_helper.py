@@ -0,0 +1,400 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python3
+#%############################################################
+#%Regular package imports here
+#%############################################################
+import hashlib
+import json
+import os
+import shutil
+import uuid
+#%############################################################
+#% Local file imports here
+#%############################################################
+import global_values
+import global_path_helper
+
+######################################################################
+# constants
+######################################################################
+
+### Sub-directory (of python_build_dir) where all cache namespaces live
+CACHE_SUBDIR = 'cache/'
+
+### File (inside the cache directory) which remembers the content hash of
+##### each source file, keyed by its path, size and modification time
+CONTENT_HASH_INDEX_FILENAME = 'content_hashes.json'
+
+### Number of bytes read at a time while hashing a file
+HASH_CHUNK_SIZE = 1024 * 1024
+
+### Content hashes computed (or loaded) during this run
+_content_hash_index = None
+
+### Number of cache hits and misses during this run, per namespace
+_cache_statistics = {}
+
+######################################################################
+######################################################################
+### Get the directory of a cache namespace (e.g. 'peaks')
+#####
+#####
+### Arguments:
+##### namespace			- the name of the cache
+#####
+### Returns:
+##### string			- the full path to the directory (with a trailing slash)
+######################################################################
+######################################################################
+def get_cache_dir(namespace=''):
+	cache_dir = global_values.python_build_dir + CACHE_SUBDIR
+	if namespace != '':
+		cache_dir += namespace + '/'
+	return cache_dir
+
+######################################################################
+######################################################################
+### Make a cache key from any number of (printable) parameters
+#####
+#####
+### Arguments:
+##### *parts			- the values that identify the cache entry
+#####
+### Returns:
+##### string			- a short hex digest of all parameters
+######################################################################
+######################################################################
+def make_cache_key(*parts):
+	return hashlib.sha1(repr(parts).encode()).hexdigest()[:16]
+
+######################################################################
+######################################################################
+### Get a unique temporary path next to a file (creating its directory),
+##### to write the file to before renaming it (with os.replace) into place
+#####
+#####
+### Arguments:
+##### file_path			- the full path of the file
+#####
+### Returns:
+##### string			- the full path of the temporary file
+######################################################################
+######################################################################
+def get_temporary_file_path(file_path):
+	global_path_helper.verify_or_make_dirs_for(file_path)
+	return file_path + '.' + uuid.uuid4().hex + '.tmp'
+
+######################################################################
+######################################################################
+### Write bytes to a file so that readers never see a partial file
+##### (write to a unique temporary file, then rename it)
+#####
+#####
+### Arguments:
+##### file_path			- the full path of the file
+##### data_bytes		- the bytes to write
+#####
+### Returns:
+##### (nothing)
+######################################################################
+######################################################################
+def write_file_atomically(file_path, data_bytes):
+	tmp_file_path = get_temporary_file_path(file_path)
+	with open(tmp_file_path, 'wb') as f:
+		f.write(data_bytes)
+	os.replace(tmp_file_path, file_path)
+
+######################################################################
+######################################################################
+### Load the index of content hashes (once per run)
+#####
+#####
+### Arguments:
+##### (nothing)
+#####
+### Returns:
+##### dict				- file path -> [size, modification time (ns), content hash]
+######################################################################
+######################################################################
+def load_content_hash_index():
+	global _content_hash_index
+	if _content_hash_index is None:
+		_content_hash_index = {}
+		index_file_path = get_cache_dir() + CONTENT_HASH_INDEX_FILENAME
+		if os.path.isfile(index_file_path):
+			try:
+				with open(index_file_path, 'r') as f:
+					_content_hash_index = json.load(f)
+			except ValueError:
+				### A corrupt index is simply rebuilt
+				_content_hash_index = {}
+	return _content_hash_index
+
+######################################################################
+######################################################################
+### Get the content hash of a file
+##### The file is only (re-)hashed if its size or modification time changed.
+##### If the content changed, all cache entries of the old content are removed.
+#####
+#####
+### Arguments:
+##### file_path			- the full path of the file
+#####
+### Returns:
+##### string			- the SHA-1 hex digest of the file's content
+######################################################################
+######################################################################
+def get_file_content_hash(file_path):
+	index = load_content_hash_index()
+	file_stat = os.stat(file_path)
+	entry = index.get(file_path)
+	if entry is not None and entry[0] == file_stat.st_size and entry[1] == file_stat.st_mtime_ns:
+		return entry[2]
+
+	sha1 = hashlib.sha1()
+	with open(file_path, 'rb') as f:
+		for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+			sha1.update(chunk)
+	content_hash = sha1.hexdigest()
+
+	if entry is not None and entry[2] != content_hash:
+		remove_cache_entries_for_hash(entry[2])
+	index[file_path] = [file_stat.st_size, file_stat.st_mtime_ns, content_hash]
+	write_file_atomically(get_cache_dir() + CONTENT_HASH_INDEX_FILENAME, json.dumps(index, indent='\t').encode())
+	return content_hash
+
+######################################################################
+######################################################################
+### Remove every cache entry (in every namespace) built from a content hash
+#####
+#####
+### Arguments:
+##### content_hash		- the content hash of the (outdated) source file
+#####
+### Returns:
+##### (nothing)
+######################################################################
+######################################################################
+def remove_cache_entries_for_hash(content_hash):
+	cache_dir = get_cache_dir()
+	if not os.path.isdir(cache_dir):
+		return
+	for namespace in os.listdir(cache_dir):
+		if not os.path.isdir(cache_dir + namespace):
+			continue
+		for cache_filename in os.listdir(cache_dir + namespace):
+			if cache_filename.startswith(content_hash):
+				cache_entry_path = cache_dir + namespace + '/' + cache_filename
+				try:
+					### Entries are either single files or whole directories
+					if os.path.isdir(cache_entry_path):
+						shutil.rmtree(cache_entry_path)
+					else:
+						os.remove(cache_entry_path)
+				except OSError:
+					pass
+
+######################################################################
+######################################################################
+### Count a cache hit or miss (see get_cache_statistics)
+#####
+#####
+### Arguments:
+##### namespace			- the name of the cache
+##### is_hit			- True for a hit, False for a miss
+#####
+### Returns:
+##### (nothing)
+######################################################################
+######################################################################
+def count_cache_access(namespace, is_hit):
+	namespace_statistics = _cache_statistics.setdefault(namespace, {'hits':0, 'misses':0})
+	namespace_statistics['hits' if is_hit else 'misses'] += 1
+
+######################################################################
+######################################################################
+### Get the number of cache hits and misses during this run
+#####
+#####
+### Arguments:
+##### namespace			- the name of the cache
+#####
+### Returns:
+##### dict				- hits and misses
+######################################################################
+######################################################################
+def get_cache_statistics(namespace):
+	return dict(_cache_statistics.get(namespace, {'hits':0, 'misses':0}))
+
+######################################################################
+######################################################################
+### Get the hit rate of cache hits and misses (see get_cache_statistics)
+#####
+#####
+### Arguments:
+##### statistics		- dict with hits and misses
+#####
+### Returns:
+##### float				- the fraction of hits (0 if there were no accesses)
+######################################################################
+######################################################################
+def get_cache_hit_rate(statistics):
+	num_accesses = statistics['hits'] + statistics['misses']
+	return statistics['hits'] / float(num_accesses) if num_accesses > 0 else 0.0
+
+######################################################################
+######################################################################
+### Mark a cache entry as (most recently) used
+##### (the modification time of the entries orders them for eviction)
+#####
+#####
+### Arguments:
+##### file_path			- the full path of the cache entry
+#####
+### Returns:
+##### (nothing)
+######################################################################
+######################################################################
+def touch_cache_entry(file_path):
+	try:
+		os.utime(file_path)
+	except OSError:
+		pass
+
+######################################################################
+######################################################################
+### Get the size of a cache entry
+#####
+#####
+### Arguments:
+##### cache_entry_path	- the full path of the entry (a single file, or a whole
+#####						directory, e.g. a set of spectrogram tiles)
+#####
+### Returns:
+##### int				- its size (in bytes, the total of the files inside a
+#####						directory)
+######################################################################
+######################################################################
+def get_cache_entry_size(cache_entry_path):
+	if not os.path.isdir(cache_entry_path):
+		return os.path.getsize(cache_entry_path)
+	num_bytes = 0
+	for dir_path, _, filenames in os.walk(cache_entry_path):
+		for filename in filenames:
+			try:
+				num_bytes += os.path.getsize(os.path.join(dir_path, filename))
+			except OSError:
+				pass
+	return num_bytes
+
+######################################################################
+######################################################################
+### Remove the least recently used entries of a cache namespace until the
+##### namespace is no larger than max_bytes
+#####
+#####
+### Arguments:
+##### namespace			- the name of the cache
+##### max_bytes			- the size limit of the namespace (None means "no limit")
+##### keep_file_path	- an entry which is never removed (e.g. the one just written,
+#####						even if it is larger than max_bytes on its own); entries
+#####						may be files or directories (see get_cache_entry_size)
+#####
+### Returns:
+##### int				- the number of entries removed
+######################################################################
+######################################################################
+def evict_least_recently_used(namespace, max_bytes, keep_file_path=None):
+	cache_dir = get_cache_dir(namespace)
+	if max_bytes is None or not os.path.isdir(cache_dir):
+		return 0
+	### (directory entries may be given with a trailing slash)
+	if keep_file_path is not None:
+		keep_file_path = keep_file_path.rstrip('/')
+	entries = []
+	for cache_filename in os.listdir(cache_dir):
+		### Temporary files belong to writes still in progress
+		if cache_filename.endswith('.tmp') or cache_dir + cache_filename == keep_file_path:
+			continue
+		try:
+			entries.append((os.stat(cache_dir + cache_filename).st_mtime_ns, get_cache_entry_size(cache_dir + cache_filename), cache_dir + cache_filename))
+		except OSError:
+			continue
+	total_bytes = sum(entry[1] for entry in entries)
+	if keep_file_path is not None and os.path.exists(keep_file_path):
+		total_bytes += get_cache_entry_size(keep_file_path)
+	num_removed = 0
+	for _, file_size, file_path in sorted(entries):
+		if total_bytes <= max_bytes:
+			break
+		try:
+			if os.path.isdir(file_path):
+				shutil.rmtree(file_path)
+			else:
+				os.remove(file_path)
+			num_removed += 1
+		except OSError:
+			pass
+		total_bytes -= file_size
+	return num_removed
+
+######################################################################
+######################################################################
+### Get the number and the total size of the entries of a cache namespace
+#####
+#####
+### Arguments:
+##### namespace			- the name of the cache
+#####
+### Returns:
+##### num_entries		- the number of entries
+##### num_bytes			- their total size (in bytes)
+######################################################################
+######################################################################
+def get_cache_size(namespace):
+	cache_dir = get_cache_dir(namespace)
+	num_entries = 0
+	num_bytes = 0
+	if not os.path.isdir(cache_dir):
+		return num_entries, num_bytes
+	for cache_filename in os.listdir(cache_dir):
+		if cache_filename.endswith('.tmp'):
+			continue
+		try:
+			num_bytes += get_cache_entry_size(cache_dir + cache_filename)
+			num_entries += 1
+		except OSError:
+			pass
+	return num_entries, num_bytes
+
+######################################################################
+######################################################################
+### Remove every entry of a cache namespace (writes still in progress
+##### finish into an empty namespace)
+#####
+#####
+### Arguments:
+##### namespace			- the name of the cache
+#####
+### Returns:
+##### int				- the number of entries removed
+######################################################################
+######################################################################
+def purge_cache(namespace):
+	cache_dir = get_cache_dir(namespace)
+	if namespace == '' or not os.path.isdir(cache_dir):
+		return 0
+	num_removed = 0
+	for cache_filename in os.listdir(cache_dir):
+		if cache_filename.endswith('.tmp'):
+			continue
+		cache_entry_path = cache_dir + cache_filename
+		try:
+			if os.path.isdir(cache_entry_path):
+				shutil.rmtree(cache_entry_path)
+			else:
+				os.remove(cache_entry_path)
+			num_removed += 1
+		except OSError:
+			pass
+	return num_removed
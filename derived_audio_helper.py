@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python3
+#%############################################################
+#%Regular package imports here
+#%############################################################
+import numpy
+import os
+#%############################################################
+#% Local file imports here
+#%############################################################
+import global_path_helper
+import build_cache_helper
+import wav_file_helper
+
+######################################################################
+# constants
+######################################################################
+
+### Cache namespace (sub-directory of the cache directory) of derived audio
+DERIVED_AUDIO_NAMESPACE = 'derived_audio'
+
+######################################################################
+######################################################################
+### Get the path of a derived .wav file from the content-addressed store
+##### (building it first, if it is not stored yet)
+#####
+##### Each derivative lives in its own directory named after the content
+##### hash of the source file plus the transform, so that the derived file
+##### itself keeps the source's file name (plus a suffix) and its path is
+##### stable across runs for as long as the source content does not change.
+#####
+#####
+### Arguments:
+##### wav_file_path		- the full path of the source .wav file
+##### transform			- the name of the transform (e.g. 'mono')
+##### transform_params	- tuple of all parameters of the transform
+##### filename_suffix	- appended to the source file name (e.g. '_mono')
+##### build_frames		- function (WavFile) -> (frames, sample_rate, bit_depth, is_float)
+#####
+### Returns:
+##### string			- the full path to the derived .wav file
+######################################################################
+######################################################################
+def get_derived_wav_file(wav_file_path, transform, transform_params, filename_suffix, build_frames):
+	content_hash = build_cache_helper.get_file_content_hash(wav_file_path)
+	derived_wav_file_path = build_cache_helper.get_cache_dir(DERIVED_AUDIO_NAMESPACE) \
+							+ content_hash + '_' + build_cache_helper.make_cache_key(transform, transform_params) + '/' \
+							+ global_path_helper.get_filename_only(wav_file_path) + filename_suffix + '.wav'
+
+	if not os.path.isfile(derived_wav_file_path):
+		frames, sample_rate, bit_depth, is_float = build_frames(wav_file_helper.WavFile(wav_file_path))
+		### Write to a unique temporary file and rename it, so that concurrent
+		##### builds never see (or overwrite) a half-written file
+		tmp_wav_file_path = build_cache_helper.get_temporary_file_path(derived_wav_file_path)
+		wav_file_helper.write_wav_file(tmp_wav_file_path, frames, sample_rate, bit_depth, is_float)
+		os.replace(tmp_wav_file_path, derived_wav_file_path)
+
+	return derived_wav_file_path
+
+######################################################################
+######################################################################
+### Convert frames back to the sample type they were read as
+#####
+#####
+### Arguments:
+##### frames			- the (float) frames
+##### wav_file			- the wav_file_helper.WavFile the frames were read from
+#####
+### Returns:
+##### array				- frames rounded and clipped to the integer range of the
+#####						file's representation (float data is returned as is)
+######################################################################
+######################################################################
+def to_sample_type(frames, wav_file):
+	if wav_file.is_float():
+		return frames
+	sample_type = numpy.int16 if wav_file.bit_depth <= 16 else numpy.int32
+	### 8-bit samples are held in int16, but only use the 8-bit range
+	if wav_file.bit_depth == 8:
+		sample_min, sample_max = -128, 127
+	else:
+		sample_min, sample_max = numpy.iinfo(sample_type).min, numpy.iinfo(sample_type).max
+	return numpy.clip(numpy.round(frames), sample_min, sample_max).astype(sample_type)
+
+######################################################################
+######################################################################
+### Get a mono (1 channel) version of a .wav file
+##### (channels are averaged)
+#####
+#####
+### Arguments:
+##### wav_file_path		- the full path of the source .wav file
+#####
+### Returns:
+##### string			- the full path to the derived mono '<name>_mono.wav' file
+######################################################################
+######################################################################
+def get_mono_wav_file(wav_file_path):
+	def build_frames(wav_file):
+		frames = wav_file.read_frames()
+		if wav_file.channels > 1:
+			frames = to_sample_type(frames.mean(axis=1), wav_file)
+		return frames, wav_file.sample_rate, wav_file.bit_depth, wav_file.is_float()
+	return get_derived_wav_file(wav_file_path, 'mono', (), '_mono', build_frames)
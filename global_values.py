@@ -148,6 +148,76 @@ else:
 figure_width = 13.6
 figure_height = 7.68
 
+##----------------------------------------------------------------------##
+### Build cache values
+##----------------------------------------------------------------------##
+### Largest total size of the cached peak pyramids and level statistics (in bytes), beyond
+##### which the least recently used ones are removed (None means "no limit", see waveform_peaks_helper)
+peaks_cache_max_bytes = 1024 * 1024 * 1024
+### Largest total size of the cached spectrogram matrices (in bytes),
+##### beyond which the least recently used ones are removed (None means "no limit")
+spectrogram_cache_max_bytes = 1024 * 1024 * 1024
+### Whether praatUtil caches the pitch, intensity and formant analyses
+##### (see analysis_cache_helper)
+use_analysis_cache = True
+### Largest total size of the cached analyses (in bytes), beyond which the least
+##### recently used ones are removed (None means "no limit")
+analysis_cache_max_bytes = 256 * 1024 * 1024
+### Largest total size of the cached spectrogram tile sets (in bytes), beyond which the least
+##### recently used ones are removed (None means "no limit", see spectrogram_tiles_helper)
+spectrogram_tiles_max_bytes = 1024 * 1024 * 1024
+
+##----------------------------------------------------------------------##
+### Spectrogram values
+##----------------------------------------------------------------------##
+### Number of threads computing (long) spectrograms (None means "one per CPU core", 1 means serial)
+spectrogram_num_workers = None
+### Whether the STFT hop and frequency-bin spacing are derived from the pixels the spectrogram
+##### is drawn on (True), or always from the window length (False, much slower for long excerpts)
+spectrogram_adaptive_resolution = True
+### Whether long excerpts (whose STFT frames outnumber the pixels, in adaptive resolution mode) are
+##### assembled from an on-disk pyramid of spectrogram tiles of the whole file (see spectrogram_tiles_helper)
+spectrogram_tiles = True
+
+##----------------------------------------------------------------------##
+### Praat spectrogram values (see praat_spectrogram_helper)
+##----------------------------------------------------------------------##
+### "To Spectrogram..." settings (Praat defaults)
+praat_spectrogram_window_length = 0.005
+praat_spectrogram_time_step = 0.002
+praat_spectrogram_frequency_step = 20.0
+### "Paint..." settings (Praat defaults)
+praat_spectrogram_dynamic_range = 50.0
+praat_spectrogram_pre_emphasis = 6.0
+
+##----------------------------------------------------------------------##
+### Praat worker values (see praat_worker_pool_helper)
+##----------------------------------------------------------------------##
+### Number of long-lived Praat processes running the analysis scripts (0 means
+##### "start a new Praat process for every script")
+praat_worker_pool_size = 2
+### Longest time a single Praat script may run (in seconds) before its worker is restarted
+praat_job_timeout = 120.0
+### How often an idle worker looks for a new script (in seconds)
+praat_worker_poll_interval = 0.005
+### Whether Praat saves the analysis results (PitchTier, IntensityTier, Formant) as binary
+##### files (True, decoded by praat_binary_helper) or as short text files (False)
+praat_binary_output = True
+
+##----------------------------------------------------------------------##
+### Analysis engine values
+##----------------------------------------------------------------------##
+### Engine of praatUtil.calculatePitch: 'praat' (a Praat script, "To Pitch (ac)...")
+##### or 'native' (praat_pitch_helper, in this process without a subprocess)
+pitch_engine = 'praat'
+### Engine of praatUtil.calculateFormants: 'praat' (a Praat script, "To Formant (burg)...")
+##### or 'native' (praat_formant_helper, in this process without a subprocess)
+formant_engine = 'praat'
+### Engine of praatUtil.calculateIntensity: 'native' (praat_intensity_helper, in this process
+##### without a subprocess, checked against Praat by tests/test_praat_intensity_helper.py)
+##### or 'praat' (a Praat script, "To Intensity...")
+intensity_engine = 'native'
+
 ##----------------------------------------------------------------------##
 ### Font values
 ##----------------------------------------------------------------------##
@@ -243,6 +313,15 @@ image_DPI = 72
 #Whether images should be saves with transparent background (True) or not (False)
 image_transparency = True#False
 
+#Whether vector images (see image_file_helper.VECTOR_IMAGE_FORMATS) are saved in hybrid mode:
+	#the spectrogram image (their only raster content) is rasterized at spectrogram_raster_DPI
+	#(and, in SVG files, stored as a lossless palette PNG, see image_file_helper.compress_SVG_images),
+	#while axes, text and annotations stay vectors (which do not depend on the dpi)
+hybrid_vector_output = True
+#Quality of the rasterized spectrogram in hybrid mode (dpi), at least image_DPI
+	#150 is plenty for a spectrogram, even in a printed final version
+spectrogram_raster_DPI = 150
+
 #Default image extension
 #(supported formats: eps, jpeg, jpg, pdf, pgf, png, ps, raw, rgba, svg, svgz, tif, tiff)
 image_format = 'svg'
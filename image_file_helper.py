@@ -3,7 +3,12 @@
 #%############################################################
 #%Regular package imports here
 #%############################################################
+import base64
+import io
+import numpy
 import os
+import PIL.Image
+import re
 import subprocess
 import sys
 #%############################################################
@@ -12,6 +17,17 @@ import sys
 import global_values
 import global_path_helper
 
+######################################################################
+# constants
+######################################################################
+
+### Image formats whose axes, text and lines are stored as vectors
+##### (images in them are embedded rasters, at the dpi given to savefig)
+VECTOR_IMAGE_FORMATS = ('svg', 'svgz', 'pdf', 'eps', 'ps')
+
+### The (base64) data of the PNG images embedded in an SVG file by matplotlib
+SVG_PNG_DATA_PATTERN = re.compile(rb'(?<=data:image/png;base64,)([A-Za-z0-9+/=\s]+)')
+
 ######################################################################
 ######################################################################
 ### Delete previously generated Python files
@@ -231,6 +247,84 @@ def optimize_SVG(filename=''):
 	### 
 	subprocess.run(rsvg_convert_cmd + ['&&'] + delete_old_svg_cmd + ['&&'] + rename_new_svg_cmd, env=dict(os.environ, PANGOCAIRO_BACKEND='fc'), shell=True)
 '''
+######################################################################
+######################################################################
+### Get the dpi to save a figure with (see global_values.hybrid_vector_output)
+##### In vector formats, the dpi only decides the resolution of embedded
+##### rasters (i.e. of the spectrogram), so in hybrid mode it is
+##### spectrogram_raster_DPI, while raster formats keep image_DPI.
+#####
+### Arguments:
+##### (nothing)
+#####
+### Returns:
+##### int/float			- the dpi for savefig
+######################################################################
+######################################################################
+def get_savefig_DPI():
+	if global_values.hybrid_vector_output and global_values.image_format in VECTOR_IMAGE_FORMATS:
+		return global_values.spectrogram_raster_DPI
+	return global_values.image_DPI
+
+######################################################################
+######################################################################
+### Encode a PNG image as a palette PNG (lossless, if it has at most 256
+##### colors, e.g. a colormapped image interpolated before the colormap)
+#####
+### Arguments:
+##### png_bytes			- the PNG file (bytes)
+#####
+### Returns:
+##### bytes				- the palette PNG file (None if the image has more
+#####						than 256 colors)
+######################################################################
+######################################################################
+def get_palette_PNG(png_bytes):
+	image = numpy.ascontiguousarray(PIL.Image.open(io.BytesIO(png_bytes)).convert('RGBA'))
+	colors, indices = numpy.unique(image.reshape(-1, 4).view(numpy.uint32), return_inverse=True)
+	if len(colors) > 256:
+		return None
+	palette = colors.view(numpy.uint8).reshape(-1, 4)
+	palette_image = PIL.Image.fromarray(indices.reshape(image.shape[:2]).astype(numpy.uint8), 'P')
+	palette_image.putpalette(palette[:, :3].tobytes())
+	palette_PNG = io.BytesIO()
+	palette_image.save(palette_PNG, format='PNG', optimize=True, transparency=palette[:, 3].tobytes())
+	return palette_PNG.getvalue()
+
+######################################################################
+######################################################################
+### Store the embedded images of an SVG file saved in hybrid mode (i.e. the
+##### rasterized spectrogram, see get_savefig_DPI) as palette PNGs, where
+##### that is smaller; matplotlib embeds them as RGBA PNGs, although a
+##### colormapped image has (at most) the 256 colors of its colormap
+#####
+### Arguments:
+##### file_path			- the full path of the SVG file
+#####
+### Returns:
+##### int				- the number of bytes saved (0 outside of hybrid mode,
+#####						or in other formats than SVG)
+######################################################################
+######################################################################
+def compress_SVG_images(file_path):
+	if not global_values.hybrid_vector_output or global_values.image_format != 'svg':
+		return 0
+	with open(file_path, 'rb') as f:
+		svg_bytes = f.read()
+	### (every odd part is the data of an image)
+	parts = SVG_PNG_DATA_PATTERN.split(svg_bytes)
+	for part_index in range(1, len(parts), 2):
+		png_bytes = base64.b64decode(parts[part_index])
+		palette_PNG = get_palette_PNG(png_bytes)
+		if palette_PNG is not None and len(palette_PNG) < len(png_bytes):
+			parts[part_index] = base64.b64encode(palette_PNG)
+	compressed_svg_bytes = b''.join(parts)
+	if len(compressed_svg_bytes) >= len(svg_bytes):
+		return 0
+	with open(file_path, 'wb') as f:
+		f.write(compressed_svg_bytes)
+	return len(svg_bytes) - len(compressed_svg_bytes)
+
 ######################################################################
 ######################################################################
 ### Create \includegraphics command for TeX, based on image filename
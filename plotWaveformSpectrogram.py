@@ -11,6 +11,7 @@ import matplotlib.image
 import matplotlib.patheffects
 import matplotlib.pyplot as plt
 import numpy
+import os
 import re
 import time
 #%############################################################
@@ -23,6 +24,14 @@ import image_file_helper
 import praatFormants
 import praatIntensity
 import praatPitch
+import praatUtil
+import audio_buffer_helper
+import spectrogram_helper
+import spectrogram_tiles_helper
+import praat_spectrogram_helper
+import analysis_cache_helper
+import build_cache_helper
+import waveform_peaks_helper
 
 ######################################################################
 ######################################################################
@@ -40,7 +49,8 @@ def create_waveform_from_wav_file(wav_file_path,
 									showYaxisLabel=False,
 									isSubplot=False,
 									ax=None,
-									annotations=[]):
+									annotations=[],
+									audio_buffer=None):
 	#####################
 	### Make the figure (if not a subplot)
 	#####################
@@ -54,17 +64,30 @@ def create_waveform_from_wav_file(wav_file_path,
 	fig=plt.gcf()
 
 	#####################
-	### Load the data and calculate the time of each sample
+	### Decode the requested time range (unless the samples were already
+	### decoded for another part of the figure)
 	#####################
-	samplerate, bitdepth, data, peakamplitude = audio_file_helper.get_samplerate_bitdepth_data_peakamplitude(wav_file_path, startTime, endTime)
-	
-	times = numpy.arange(len(data)) / float(samplerate)
-	times += startTime
-	
-	# Determine the largest amplitude (either negative or positive) and
-		# add a small padding.  
-	data_max = max(numpy.absolute(numpy.amin(data)), numpy.absolute(numpy.amax(data)))
-	normalized_data = numpy.multiply(numpy.divide(data, data_max), peakamplitude)
+	if audio_buffer is None:
+		audio_buffer = audio_buffer_helper.AudioBuffer(wav_file_path, startTime, endTime)
+	start_frame, end_frame = audio_buffer.start_frame, audio_buffer.end_frame
+
+	# Only the first and last times are computed (unless every sample is plotted)
+	times = audio_buffer.get_times()
+
+	#####################
+	### Load the min/max envelope of the whole file (at power-of-two decimation levels)
+	### from the peak cache and pick the level that matches the output pixel width
+	#####################
+	peak_pyramid = audio_buffer.get_peak_pyramid()
+	peak_level = peak_pyramid.select_level(end_frame - start_frame, waveform_peaks_helper.get_output_pixel_width())
+
+	# The largest amplitude (either negative or positive), taken from the decoded
+		# samples if every sample is plotted, and from the peak pyramid otherwise
+		# (only the partially covered buckets at both ends of the range are read)
+	if peak_level is None:
+		data = audio_buffer.get_data()
+	data_max = audio_buffer.get_data_max()
+	peakamplitude = audio_buffer.get_peak_amplitude()
 
 	#####################
 	### Plot the times (x-axis) versus audio data (y-axis)
@@ -72,9 +95,27 @@ def create_waveform_from_wav_file(wav_file_path,
 	#####################
 	#Plot time values (x-axis) against amplitude values (y-axis)
 	ax.plot([0,times[-1]], [0,0], color='k', zorder=0)#creates a 'false' x-axis at y=0
-	ax.plot(times, normalized_data, color='k', zorder=0)
-	
-	samplerate, bitdepth, data, normalized_data = None, None, None, None
+	# Few samples per pixel: plot every sample
+	if peak_level is None:
+		# (a single float32 array; the shared samples themselves are not modified)
+		normalized_data = numpy.multiply(data, numpy.float32(peakamplitude / data_max))
+		ax.plot(times[:], normalized_data, color='k', zorder=0)
+	# Many samples per pixel: draw the min/max envelope (outlined with the
+		# same line width as a plotted line, so it looks the same when printed)
+	else:
+		envelope_start, envelope_min, envelope_max = peak_pyramid.get_envelope(peak_level, start_frame, end_frame)
+		bucket_size = peak_pyramid.get_bucket_size(peak_level)
+		envelope_times = audio_buffer.frame_to_time(envelope_start + numpy.arange(len(envelope_min)) * bucket_size + bucket_size / 2.)
+		envelope_scale = peakamplitude / data_max
+		ax.fill_between(envelope_times,
+						envelope_min * envelope_scale,
+						envelope_max * envelope_scale,
+						facecolor='k',
+						edgecolor='k',
+						linewidth=plt.rcParams['lines.linewidth'],
+						zorder=0)
+
+	data, normalized_data, peak_pyramid, audio_buffer = None, None, None, None
 
 	##-----------------------------------##
 	### General axes setup
@@ -234,7 +275,10 @@ def create_spectrogram_from_wav_file(wav_file_path,
 										maxFormantFrequency=None,
 										showTextgridFormants=False,
 										isSubplot=False,
-										ax=None):
+										ax=None,
+										audio_buffer=None,
+										praatSpectrogram=False,
+										output_runtime=True):
 	#%##################################################################################
 	### Make the figure (if not a subplot)
 	#%##################################################################################
@@ -248,24 +292,39 @@ def create_spectrogram_from_wav_file(wav_file_path,
 	fig=plt.gcf()
 
 	#%##################################################################################
-	### Load the data and calculate the time of each sample
+	### Load the data and its time axis (times are computed lazily, on lookup)
 	#%##################################################################################
-	samplerate, bitdepth, data, peakamplitude = audio_file_helper.get_samplerate_bitdepth_data_peakamplitude(wav_file_path, startTime, endTime)
-	
-	times = numpy.arange(len(data)) / float(samplerate)
-	times += startTime
+	if audio_buffer is None:
+		audio_buffer = audio_buffer_helper.AudioBuffer(wav_file_path, startTime, endTime)
+	samplerate = audio_buffer.sample_rate
+	# (from the peak pyramid of the file, so the samples are only decoded if the
+		# spectrogram is not cached yet)
+	peakamplitude = audio_buffer.get_peak_amplitude()
+
+	times = audio_buffer.get_times()
 
 	#%##################################################################################
 	### Set up values and parameters for calling spectrogram
 	#%##################################################################################
 	# (Nyquist frequency) - For cutoff frequency of 5000Hz (Sampling Rate)
-	Fs = maxFrequency*2.#10000.
-
-	NFFT = int(float(samplerate) * 0.01066666666666666666666666666667)
-	# Number of overlaps (I really don't understand why, but /2 is good)
-	noverlap = int(NFFT / 1.03)#
-	# Gives more detail, the higher the multiplier
-	pad_to = NFFT * 8#16#64#32#16
+		# Nothing above maxFrequency is shown, so decimate (anti-aliased, by an integer
+		# factor) to just above twice maxFrequency before the (much smaller) STFT, whose
+		# window length, overlap and padding are derived from the (decimated) sample rate
+	decimation_factor, Fs, NFFT, noverlap, pad_to = spectrogram_helper.get_spectrogram_parameters(samplerate, maxFrequency)
+	# In adaptive resolution mode, the hop and the frequency-bin spacing are derived from
+		# the pixels the spectrogram is drawn on (never finer than the values above), and
+		# runs of frames are averaged into one column if they still outnumber the pixels
+	frames_per_column = 1
+	if global_values.spectrogram_adaptive_resolution:
+		pixel_width, pixel_height = get_axes_raster_size(ax)
+		noverlap, pad_to, frames_per_column = spectrogram_helper.get_adaptive_resolution(-(-audio_buffer.get_num_samples() // decimation_factor),
+																							NFFT,
+																							Fs,
+																							maxFrequency,
+																							pixel_width,
+																							pixel_height,
+																							min_hop=NFFT - noverlap,
+																							max_pad_to=pad_to)
 	
 	# Use 'inferno' colormap
 		# including '_r' after the cmap name will INVERT/REVERSE the colors
@@ -301,26 +360,96 @@ def create_spectrogram_from_wav_file(wav_file_path,
 	### Plot the times (x-axis) versus audio data (y-axis)
 	##### Also set up plot
 	#%##################################################################################
-	#spectra / Pxx: 2-D array - columns are the periodograms of successive segments
+	#spectra / Pxx: 2-D array (in dB) - columns are the magnitude spectra of successive segments
 	#freqs: 1-D array - The frequencies corresponding to the rows in spectrum
 	#t / spectimes: 1-D array - The times corresponding to midpoints of segments (i.e the columns in spectrum)
+	if praatSpectrogram:
+		# Praat's "To Spectrogram..." (Gaussian window) of the undecimated data, in Praat's units
+			# (full scale = 1), in dB like Praat's "Paint..." (pre-emphasis, autoscaled maximum)
+		Pxx, freqs, spectimes = praat_spectrogram_helper.compute_praat_spectrogram(audio_buffer.get_data() / audio_file_helper.get_full_scale(audio_buffer.bit_depth),
+																					samplerate,
+																					window_length=global_values.praat_spectrogram_window_length,
+																					max_frequency=maxFrequency,
+																					time_step=global_values.praat_spectrogram_time_step,
+																					frequency_step=global_values.praat_spectrogram_frequency_step,
+																					start_time=audio_buffer.start_frame / float(samplerate))
+		Pxx, praat_maximum = praat_spectrogram_helper.get_praat_spectrogram_dB(Pxx, freqs, pre_emphasis=global_values.praat_spectrogram_pre_emphasis)
+		# (the image spans Praat's dynamic range below the maximum, unless a range was given)
+		if dynamicRange == None:
+			vmax = praat_maximum
+		if dynamicRangeMin == None:
+			vmin = vmax - global_values.praat_spectrogram_dynamic_range
+		spectrogram_extent = praat_spectrogram_helper.get_praat_spectrogram_extent(freqs, spectimes)
+	elif global_values.spectrogram_tiles and frames_per_column > 1:
+		# Long excerpts (whose frames outnumber the pixels) are assembled from the tiles of a
+			# spectrogram pyramid of the whole file, so only the covering tiles are computed (once)
+		spectrogram_tile_set = spectrogram_tiles_helper.SpectrogramTileSet(audio_buffer.wav_file,
+																			decimation_factor,
+																			NFFT,
+																			pad_to,
+																			max_frequency=maxFrequency,
+																			num_workers=global_values.spectrogram_num_workers)
+		Pxx, freqs, spectimes = spectrogram_tile_set.get_spectrogram(audio_buffer.start_frame, audio_buffer.end_frame, pixel_width)
+		spectrogram_tile_set = None
+		spectrogram_extent = (times[0], times[-1]) + spectrogram_helper.get_frequency_extent(freqs, Fs, pad_to)
+	else:
+		# (loaded from the on-disk cache, if this range was already computed with the same parameters,
+			# otherwise computed by several threads, if the excerpt is long)
+		Pxx, freqs, spectimes = spectrogram_helper.get_cached_spectrogram(audio_buffer,
+																			decimation_factor,
+																			NFFT=NFFT,
+																			Fs=Fs,
+																			noverlap=noverlap,
+																			pad_to=pad_to,
+																			max_frequency=maxFrequency,
+																			num_workers=global_values.spectrogram_num_workers,
+																			frames_per_column=frames_per_column)
+		spectrogram_extent = (times[0], times[-1]) + spectrogram_helper.get_frequency_extent(freqs, Fs, pad_to)
 	#im /  cax: instance of class AxesImage - The image created by imshow containing the spectrogram
-	Pxx, freqs, spectimes, cax = ax.specgram(data,
-												NFFT=NFFT,
-												Fs=samplerate,
-												noverlap=noverlap,
-												mode='magnitude',
-												scale='dB',
-												pad_to=pad_to,
-												cmap=cmap,
-												vmin=vmin,
-												vmax=vmax,
-												xextent=(times[0], times[-1]),
-												zorder=0)
+		# (drawn the way ax.specgram draws it: stretched from the first to the last sample time,
+		# and with the rows of the whole band stretched from the lowest to the highest frequency,
+		# of which only the rows up to maxFrequency were computed), or the way Praat paints it;
+		# resampled before the colormap, so the image only has the colormap's colors
+		# (see image_file_helper.compress_SVG_images)
+	cax = ax.imshow(Pxx,
+					cmap=cmap,
+					extent=spectrogram_extent,
+					vmin=vmin,
+					vmax=vmax,
+					origin='lower',
+					interpolation_stage='data',
+					zorder=0)
+	ax.axis('auto')
 	
-	bitdepth, data, peakamplitude = None, None, None
+	peakamplitude = None
 	Pxx, freqs, spectimes = None, None, None
 	
+	# Pitch settings of spectrograms (see praatUtil.calculatePitch)
+	pitch_parameters = {
+		'timeStep':0.0,#0.0005,
+		'fMin':75.0,#Praat default is 75
+		'fMax':600.0,#Praat default is 600
+		'veryAccurate':False,#Praat default is False
+		'silenceThreshold':0.075,#Praat default is 0.03
+		'voicingThreshold':0.3,#Praat default is 0.45
+		'octaveCost':0.05,#Praat default is 0.01
+		'octaveJumpCost':0.15,#Praat default is 0.35
+		'voicedUnvoicedCost':0.2,#Praat default is 0.14
+	}
+	
+	##-----------------------------------##
+	### If more than one of pitch, intensity and formants is shown, analyze them
+	##### in a single Praat script (which reads the sound only once)
+	##-----------------------------------##
+	praat_analysis = {'pitch':None, 'intensity':None, 'formants':None}
+	if [showPitch, showIntensity, showFormants].count(True) > 1:
+		praat_analysis = praatUtil.calculatePitchIntensityFormants(audio_buffer.wav_file_path,
+																	startTime=startTime,
+																	endTime=endTime,
+																	pitchParameters=pitch_parameters if showPitch else None,
+																	intensityParameters={'fMin':100, 'timeStep':0.0, 'subtractMean':True} if showIntensity else None,
+																	formantParameters={'maxFormantFrequency':5500 if maxFormantFrequency == None else maxFormantFrequency} if showFormants else None)
+	
 	##-----------------------------------##
 	### Show pitch (plot)
 	##-----------------------------------##
@@ -330,17 +459,19 @@ def create_spectrogram_from_wav_file(wav_file_path,
 										endTime=endTime,
 										minViewFrequency=0.0,
 										maxViewFrequency=maxFrequency,
-										#timeStep = 0.0005,
-										#minPitchHz=75.0,#Praat default is 75
-										#maxPitchHz=600.0,#Praat default is 600
-										veryAccurate = False,#Praat default is False
-										silenceThreshold = 0.075,#Praat default is 0.03
-										voicingThreshold = 0.3,#Praat default is 0.45
-										octaveCost = 0.05,#Praat default is 0.01
-										octaveJumpCost = 0.15,#Praat default is 0.35
-										voicedUnvoicedCost = 0.2,#Praat default is 0.14
+										timeStep=pitch_parameters['timeStep'],
+										minPitchHz=pitch_parameters['fMin'],
+										maxPitchHz=pitch_parameters['fMax'],
+										veryAccurate=pitch_parameters['veryAccurate'],
+										silenceThreshold=pitch_parameters['silenceThreshold'],
+										voicingThreshold=pitch_parameters['voicingThreshold'],
+										octaveCost=pitch_parameters['octaveCost'],
+										octaveJumpCost=pitch_parameters['octaveJumpCost'],
+										voicedUnvoicedCost=pitch_parameters['voicedUnvoicedCost'],
 										normalizePitch = True,#Need to normalize pitch for spectrograms (but not pitch plots)
-										ax=ax)
+										ax=ax,
+										audio_buffer=audio_buffer,
+										pitchData=praat_analysis['pitch'])
 	
 	##-----------------------------------##
 	### Show intensity (plot)
@@ -353,7 +484,9 @@ def create_spectrogram_from_wav_file(wav_file_path,
 										sampleRate=samplerate,
 										minFrequency=100,
 										limitToTextgrid=False,
-										ax=ax)
+										ax=ax,
+										audio_buffer=audio_buffer,
+										intensityData=praat_analysis['intensity'])
 										
 	samplerate = None
 
@@ -364,7 +497,9 @@ def create_spectrogram_from_wav_file(wav_file_path,
 		praatFormants.scatterPlotFormants(wav_file_path,
 											maxFormantFrequency=maxFormantFrequency,
 											showTextgridFormants=showTextgridFormants,
-											ax=ax)
+											ax=ax,
+											audio_buffer=audio_buffer,
+											formantData=praat_analysis['formants'])
 
 	##-----------------------------------##
 	### General axes setup
@@ -431,16 +566,27 @@ def create_spectrogram_from_wav_file(wav_file_path,
 		
 		fig.patch.set_alpha(0.0)
 		ax.patch.set_alpha(0.0)
+		savefig_DPI = image_file_helper.get_savefig_DPI()
 		plt.savefig(global_values.python_images_dir + '{0:0>2}'.format(global_values.plot_counter) + filename,
 						format=global_values.image_format,
 						bbox_inches='tight',
-						dpi=global_values.image_DPI,
+						dpi=savefig_DPI,# (only the spectrogram is rasterized, at this dpi)
 						#frameon=False,
 						aspect='normal',
 						pad_inches=0.15,
 						facecolor=fig.get_facecolor(),
 						edgecolor='none',
 						transparent=global_values.image_transparency)
+		# In hybrid mode, the rasterized spectrogram is stored as a (lossless) palette PNG
+		hybrid_bytes_saved = image_file_helper.compress_SVG_images(global_values.python_images_dir + '{0:0>2}'.format(global_values.plot_counter) + filename)
+		if output_runtime:
+			runtimes_output = '------------------------------------\n'
+			runtimes_output += 'Runtimes for ' + wav_file_path + '\n'
+			runtimes_output += 'image size: {:d} bytes (spectrogram rasterized at {:g} dpi, {:d} bytes saved)\n'.format(os.path.getsize(global_values.python_images_dir + '{0:0>2}'.format(global_values.plot_counter) + filename),
+																													savefig_DPI,
+																													hybrid_bytes_saved)
+			runtimes_output += '\n'
+			global_path_helper.append_to_file(global_values.python_runtimes_dir + 'create_spectrogram_from_wav_file.log', runtimes_output)
 		
 		### Display plot in GUI window, if desired
 		#display_plot(fig, plt)
@@ -499,6 +645,19 @@ def create_spectrogram_colorbar(theLabel, theAxesImage, theFigure=plt.figure(),
 
 	return cbar
 
+######################################################################
+######################################################################
+### Get the size (in pixels) of the raster an axes image is drawn into
+###
+###	(at the dpi the figure is saved with, see image_file_helper.get_savefig_DPI)
+######################################################################
+######################################################################
+def get_axes_raster_size(ax):
+	fig = ax.get_figure()
+	position = ax.get_position()
+	raster_DPI = image_file_helper.get_savefig_DPI()
+	return int(round(position.width * fig.get_figwidth() * raster_DPI)), int(round(position.height * fig.get_figheight() * raster_DPI))
+
 ######################################################################
 ######################################################################
 ### Customize the axes for a particular plot
@@ -902,6 +1061,7 @@ def create_waveform_and_spectrogram_from_wav_file(wavFilename,
 													dynamicRangeMin=None,
 													showTextgridFormants=False,
 													wavFormAnnotations=None,
+													praatSpectrogram=False,
 													output_runtime=True):
 	global_values.plot_counter += 1
 	start_time = time.perf_counter()
@@ -914,12 +1074,12 @@ def create_waveform_and_spectrogram_from_wav_file(wavFilename,
 	if wavFilename is None or wavFilename == '':
 		raise Exception("praatFormants.py->scatterPlotFormants: No audio filename provided")
 
-	wav_file_path = audio_file_helper.get_full_wav_file_path(wavFilename)
-	
 	##----------------------------------------------------------------------##
-	### Check that the specified file actually exists
+	### Find (and check) the audio file and decode the requested time range once,
+	##### for all parts of the figure
 	##----------------------------------------------------------------------##
-	global_path_helper.verify_file_exists(wav_file_path)
+	audio_buffer = audio_buffer_helper.AudioBuffer.from_wav_filename(wavFilename, startTime, endTime)
+	wav_file_path = audio_buffer.wav_file_path
 	
 	if wavFormAnnotations is None:
 		wavFormAnnotations=[]
@@ -944,7 +1104,8 @@ def create_waveform_and_spectrogram_from_wav_file(wavFilename,
 									endTime=endTime,
 									isSubplot=True,
 									ax=axs[0],
-									annotations=wavFormAnnotations)
+									annotations=wavFormAnnotations,
+									audio_buffer=audio_buffer)
 	waveform_runtime = time.perf_counter() - waveform_start_time
 
 	##-----------------------------------##
@@ -963,7 +1124,11 @@ def create_waveform_and_spectrogram_from_wav_file(wavFilename,
 														dynamicRangeMin=dynamicRangeMin,
 														showTextgridFormants=showTextgridFormants,
 														isSubplot=True,
-														ax=axs[1])
+														ax=axs[1],
+														audio_buffer=audio_buffer,
+														praatSpectrogram=praatSpectrogram)
+	audio_statistics = audio_buffer.get_statistics()
+	audio_buffer = None
 	spectrogram_runtime = time.perf_counter() - spectrogram_start_time
 
 	##-----------------------------------##
@@ -1010,10 +1175,13 @@ def create_waveform_and_spectrogram_from_wav_file(wavFilename,
 	fig.patch.set_alpha(0.0)
 	axs[0].patch.set_alpha(0.0)
 	axs[1].patch.set_alpha(0.0)
+	# In hybrid mode, only the spectrogram is rasterized (at spectrogram_raster_DPI);
+		# axes, text and annotations stay vectors
+	savefig_DPI = image_file_helper.get_savefig_DPI()
 	plt.savefig(global_values.python_images_dir + '{0:0>2}'.format(global_values.plot_counter) + filename,
 					format=global_values.image_format,
 					bbox_inches='tight',
-					dpi=global_values.image_DPI,
+					dpi=savefig_DPI,
 					#frameon=False,
 					aspect='normal',
 					pad_inches=0.15,
@@ -1021,6 +1189,10 @@ def create_waveform_and_spectrogram_from_wav_file(wavFilename,
 					edgecolor='none',
 					transparent=global_values.image_transparency)
 	
+	### Store the rasterized spectrogram as a (lossless) palette PNG, in hybrid mode
+	hybrid_bytes_saved = image_file_helper.compress_SVG_images(global_values.python_images_dir + '{0:0>2}'.format(global_values.plot_counter) + filename)
+	image_bytes = os.path.getsize(global_values.python_images_dir + '{0:0>2}'.format(global_values.plot_counter) + filename)
+	
 	### Optimize the SVG file
 	image_file_helper.optimize_SVG(global_values.cli_python_images_dir + '{0:0>2}'.format(global_values.plot_counter) + filename)
 	
@@ -1049,6 +1221,17 @@ def create_waveform_and_spectrogram_from_wav_file(wavFilename,
 		runtimes_output += 'waveform plot time: {:.7f}\n'.format(waveform_runtime)
 		runtimes_output += 'spectrogram  plot time: {:.7f}\n'.format(spectrogram_runtime)
 		runtimes_output += 'waveform+spectrogram plot time: {:.7f}\n'.format(time.perf_counter() - start_time)
+		runtimes_output += 'levels: peak {:.2f} dBFS, RMS {:.2f} dBFS, DC offset {:.2f}, clipped samples {:d}\n'.format(audio_statistics['peak_dBFS'],
+																																audio_statistics['rms_dBFS'],
+																																audio_statistics['dc_offset'],
+																																audio_statistics['clip_count'])
+		spectrogram_cache_statistics = build_cache_helper.get_cache_statistics(spectrogram_helper.SPECTROGRAM_CACHE_NAMESPACE)
+		runtimes_output += 'spectrogram cache: {:d} hits, {:d} misses\n'.format(spectrogram_cache_statistics['hits'], spectrogram_cache_statistics['misses'])
+		spectrogram_tiles_statistics = build_cache_helper.get_cache_statistics(spectrogram_tiles_helper.SPECTROGRAM_TILES_NAMESPACE)
+		runtimes_output += 'spectrogram tiles: {:d} hits, {:d} misses\n'.format(spectrogram_tiles_statistics['hits'], spectrogram_tiles_statistics['misses'])
+		analysis_cache_statistics = build_cache_helper.get_cache_statistics(analysis_cache_helper.ANALYSIS_CACHE_NAMESPACE)
+		runtimes_output += 'analysis cache: {:d} hits, {:d} misses\n'.format(analysis_cache_statistics['hits'], analysis_cache_statistics['misses'])
+		runtimes_output += 'image size: {:d} bytes (spectrogram rasterized at {:g} dpi, {:d} bytes saved)\n'.format(image_bytes, savefig_DPI, hybrid_bytes_saved)
 		runtimes_output += '\n'
 		global_path_helper.append_to_file(global_values.python_runtimes_dir + 'create_waveform_and_spectrogram_from_wav_file.log', runtimes_output)
 
@@ -26,10 +26,19 @@ def scatterPlotFormants(wav_file_path,
 						windowLength=0.025,#Praat default is 0.025
 						dynamicRange=30,#Praat default is 30 dB
 						showTextgridFormants=False,
-						ax=None):
+						ax=None,
+						audio_buffer=None,
+						formantData=None):
 	####################################################################################
 	### Check and fix arguments for problems OR to set default values (if necessary)
 	####################################################################################
+	##----------------------------------------------------------------------##
+	### If an audio buffer (decoded once for the whole figure) is given,
+	##### analyze the file it was decoded from
+	##----------------------------------------------------------------------##
+	if audio_buffer is not None:
+		wav_file_path = audio_buffer.wav_file_path
+
 	##----------------------------------------------------------------------##
 	### No audio file specified... can't do anything
 	##----------------------------------------------------------------------##
@@ -41,19 +50,6 @@ def scatterPlotFormants(wav_file_path,
 	##----------------------------------------------------------------------##
 	global_path_helper.verify_file_exists(wav_file_path)
 
-	# assemble a Praat script to analyze the formants of the file. Make sure that 
-	# you add a backslach in front of every single quote of your Praat script (i.e.,
-	# every ' turns into /' - this does not apply here, since the Praat script below 
-	# does not contain any single quotes). Also, add a new line (backslash n) at the
-	# end of every line in the script
-	#
-	# In particular, we'll create the script below. Note how the path and file names
-	# are being replaced by variables, so that you can easily change them.
-	# 
-	# do ("Read from file...", "/Users/ch/data/programming/python/lib/demo/AEIOU_vocalFry.wav")
-	# do ("To Formant (burg)...", 0, 5, 5000, 0.025, 50)
-	# do ("Save as short text file...", "/Users/ch/data/programming/python/lib/demo/AEIOU_vocalFry.Formant")
-	
 	if maxFormantFrequency == None:
 		maxFormantFrequency = 5500
 	if windowLength == None:
@@ -62,26 +58,23 @@ def scatterPlotFormants(wav_file_path,
 		dynamicRange = 12.5
 	
 	wav_dir, filename_only, _ = global_path_helper.split_path_filename_extension(wav_file_path)
-	formant_file_path = wav_dir + filename_only + '.Formant'
 	textgrid_file_path = wav_dir + filename_only + '.TextGrid'
-	
-	script = ''
-	script += 'do ("Read from file...", "' +  wav_file_path + '")\n'
-	#five arguments: 
-	##### the time step,
-	##### the maximum number of formants,
-	##### the maximum hertz,
-	##### the window length,
-	##### Pre-emphasis from (Hz) 
-	script += 'do ("To Formant (burg)...", 0, 5, '+'{:.2f},'.format(maxFormantFrequency)+' 0.025, 50)\n'
-	script += 'do ("Save as short text file...", "' + str(formant_file_path) + '")\n'
-	scriptFileName = 'tmp_formants.praat'
-	praatUtil.runPraatScript(script, scriptFileName)
-
+	# derived audio (e.g. a mono downmix) lives in the build cache, while its
+	# TextGrid stays in the audio directory
+	if not pathlib.Path(textgrid_file_path).exists():
+		textgrid_file_path = global_values.audio_dir + filename_only + '.TextGrid'
 
-	# read the generated Praat formants file
-	formants = praatUtil.PraatFormants()
-	formants.readFile(formant_file_path)
+	# get the formants of the file (unless they were already analyzed, e.g. by
+	# praatUtil.calculatePitchIntensityFormants). praatUtil.calculateFormants
+	# returns them from the analysis cache, calculates them in this process
+	# (global_values.formant_engine 'native'), or has Praat run "To Formant
+	# (burg)..." and save the Formant next to the .wav file (as a binary file,
+	# unless global_values.praat_binary_output is off), see
+	# praatUtil.getFormantScript
+	if formantData is None:
+		formants = praatUtil.calculateFormants(wav_file_path, maxFormantFrequency=maxFormantFrequency)
+	else:
+		formants = formantData
 	
 	if showTextgridFormants:#First, verify .TextGrid file exists
 		# read the accompanying Praat text grid (see the Praat TextGrid example for an
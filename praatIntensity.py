@@ -28,6 +28,9 @@ import praatUtil
 ##### sampleRate			- the sample rate of the .wav file
 ##### limitToTextgrid		- ???
 ##### ax					- the axis (i.e. of a subplot) where to plot pitch data
+##### audio_buffer			- the audio_buffer_helper.AudioBuffer of the figure (optional)
+##### intensityData			- times and intensities already calculated by Praat, e.g. by
+#####							praatUtil.calculatePitchIntensityFormants (optional)
 #####
 ### Returns:
 ##### (nothing)
@@ -40,10 +43,21 @@ def plotIntensity(wav_file_path,
 					maxFrequency=5000.0,
 					sampleRate=None,
 					limitToTextgrid=False,
-					ax=None):
+					ax=None,
+					audio_buffer=None,
+					intensityData=None):
 	####################################################################################
 	### Check and fix arguments for problems OR to set default values (if necessary)
 	####################################################################################
+	##----------------------------------------------------------------------##
+	### If an audio buffer (decoded once for the whole figure) is given,
+	##### analyze the file it was decoded from
+	##----------------------------------------------------------------------##
+	if audio_buffer is not None:
+		wav_file_path = audio_buffer.wav_file_path
+		if sampleRate is None:
+			sampleRate = audio_buffer.sample_rate
+
 	##----------------------------------------------------------------------##
 	### No audio file specified... can't do anything
 	##----------------------------------------------------------------------##
@@ -76,14 +90,17 @@ def plotIntensity(wav_file_path,
 	##### and then break the intensities into continuous intervals
 	####################################################################################
 	##----------------------------------------------------------------------##
-	### Have Praat calculate all times and intensities for audio file
+	### Have Praat calculate all times and intensities for audio file (if not already calculated)
 	##----------------------------------------------------------------------##
-	times, intensities = praatUtil.calculateIntensity(wav_file_path,
-														startTime=startTime,
-														endTime=endTime,
-														fMin = minFrequency,
-														timeStep = 0.0,
-														subtractMean = True)
+	if intensityData is None:
+		times, intensities = praatUtil.calculateIntensity(wav_file_path,
+															startTime=startTime,
+															endTime=endTime,
+															fMin = minFrequency,
+															timeStep = 0.0,
+															subtractMean = True)
+	else:
+		times, intensities = intensityData
 	
 	##----------------------------------------------------------------------##
 	### If the start time is not specified OR is less than the minimum one in Praat data, 
@@ -38,6 +38,9 @@ import praatUtil
 ##### voicedUnvoicedCost	- (Praat default is 0.14)
 ##### normalizePitch		- need to normalize pitch for spectrograms, but not pitch plots
 ##### ax					- the axis (i.e. of a subplot) where to plot pitch data
+##### audio_buffer			- the audio_buffer_helper.AudioBuffer of the figure (optional)
+##### pitchData				- times and pitches already calculated by Praat, e.g. by
+#####							praatUtil.calculatePitchIntensityFormants (optional)
 #####
 ### Returns:
 ##### (nothing)
@@ -58,10 +61,19 @@ def plotSpectrogramPitch(wav_file_path,
 							octaveJumpCost = 0.25,#Praat default is 0.35
 							voicedUnvoicedCost = 0.26,#Praat default is 0.14
 							normalizePitch = False,#Need to normalize pitch for spectrograms, but not pitch plots
-							ax=None):
+							ax=None,
+							audio_buffer=None,
+							pitchData=None):
 	####################################################################################
 	### Check and fix arguments for problems OR to set default values (if necessary)
 	####################################################################################
+	##----------------------------------------------------------------------##
+	### If an audio buffer (decoded once for the whole figure) is given,
+	##### analyze the file it was decoded from
+	##----------------------------------------------------------------------##
+	if audio_buffer is not None:
+		wav_file_path = audio_buffer.wav_file_path
+
 	##----------------------------------------------------------------------##
 	### No audio file specified... can't do anything
 	##----------------------------------------------------------------------##
@@ -100,20 +112,23 @@ def plotSpectrogramPitch(wav_file_path,
 	##### and then break the pitches into continuous intervals
 	####################################################################################
 	##----------------------------------------------------------------------##
-	### Have Praat calculate all times and pitches (F0) for audio file
-	##----------------------------------------------------------------------##
-	times, pitches = praatUtil.calculatePitch(wav_file_path,
-												startTime=startTime,
-												endTime=endTime,
-												timeStep=timeStep,
-												fMin=minPitchHz,
-												fMax=maxPitchHz,
-												veryAccurate = veryAccurate,
-												silenceThreshold = silenceThreshold,
-												voicingThreshold = voicingThreshold,
-												octaveCost = octaveCost,
-												octaveJumpCost = octaveJumpCost,
-												voicedUnvoicedCost = voicedUnvoicedCost)
+	### Have Praat calculate all times and pitches (F0) for audio file (if not already calculated)
+	##----------------------------------------------------------------------##
+	if pitchData is None:
+		times, pitches = praatUtil.calculatePitch(wav_file_path,
+													startTime=startTime,
+													endTime=endTime,
+													timeStep=timeStep,
+													fMin=minPitchHz,
+													fMax=maxPitchHz,
+													veryAccurate = veryAccurate,
+													silenceThreshold = silenceThreshold,
+													voicingThreshold = voicingThreshold,
+													octaveCost = octaveCost,
+													octaveJumpCost = octaveJumpCost,
+													voicedUnvoicedCost = voicedUnvoicedCost)
+	else:
+		times, pitches = pitchData
 	
 	##----------------------------------------------------------------------##
 	### If the start time is not specified OR is less than the minimum one in Praat data, 
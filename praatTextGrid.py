@@ -167,6 +167,9 @@ class PraatTextGrid:
 	def readFromFile(self, fileName):
 		import codecs
 		import cchardet
+		import praat_binary_helper
+		if praat_binary_helper.is_praat_binary_file(fileName):
+			return self.readFromBinaryFile(fileName)
 		f = open(fileName, 'rb')
 		encoded_text = f.read()
 		encoding = cchardet.detect(encoded_text)
@@ -331,6 +334,25 @@ class PraatTextGrid:
 		
 		return self.arrTiers	
 		
+	def readFromBinaryFile(self, fileName):
+		# reads a TextGrid saved as binary file within Praat (see 
+		# praat_binary_helper), e.g. by readFromFile
+		import praat_binary_helper
+		self.tStart, self.tEnd, arrBinaryTiers = praat_binary_helper.read_binary_text_grid(fileName)
+		self.arrTiers = []
+		for binaryTier in arrBinaryTiers:
+			if binaryTier['class'] == 'TextTier':
+				tier = PraatPointTier()
+				for t, label in binaryTier['items']:
+					tier.add(t, label)
+			else:
+				tier = PraatIntervalTier()
+				for t, t2, label in binaryTier['items']:
+					tier.add(t, t2, label)
+			tier.setName(binaryTier['name'])
+			self.arrTiers.append(tier)
+		return self.arrTiers
+		
 ######################################################################
 
 class PraatAbstractTier:
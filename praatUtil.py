@@ -27,6 +27,7 @@ this program; if not, see <http://www.gnu.org/licenses/>.
 #%############################################################
 #%Regular Python package imports here
 #%############################################################
+import inspect
 import math
 import numpy
 import os
@@ -36,14 +37,21 @@ import time
 #%############################################################
 import global_values
 import global_path_helper
+import analysis_cache_helper
 import generalUtility
 import praatTextGrid
+import praat_binary_helper
+import praat_formant_helper
+import praat_intensity_helper
+import praat_pitch_helper
+import praat_worker_pool_helper
 
 ######################################################################
 
 def readIntensityTier(fileName, startTime=0, endTime=-1):
 	"""
-	reads Praat Intensity data, saved as "short text file" within Praat
+	reads Praat Intensity data, saved as "short text file" or "binary file"
+	within Praat
 	@param fileName
 	@return a tuple containing two lists: the time offset, and the 
 		corresponding Intensity data
@@ -55,7 +63,8 @@ def readIntensityTier(fileName, startTime=0, endTime=-1):
 
 def readPitchTier(fileName, startTime=0, endTime=-1):
 	"""
-	reads Praat PitchTier data, saved as "short text file" within Praat
+	reads Praat PitchTier data, saved as "short text file" or "binary file"
+	within Praat
 	@param fileName
 	@return a tuple containing two lists: the time offset, and the 
 		corresponding F0 (inaccurately called "pitch" in Praat) data
@@ -65,9 +74,51 @@ def readPitchTier(fileName, startTime=0, endTime=-1):
 	
 ######################################################################
 
+def readPraatSpectrogram(fileName):
+	"""
+	reads a Praat Spectrogram, saved as "text file" or "short text file"
+	within Praat
+	@param fileName
+	@return a tuple containing the power spectral density (a two-dimensional
+		numpy array, rows are frequencies and columns are times), and a dict
+		with the sampling of both axes: xmin, xmax, nx, dx, x1 (time of the
+		first column), ymin, ymax, ny, dy, y1 (frequency of the first row)
+	"""
+	decoded_text, _ , _ = global_path_helper.read_from_file(fileName)
+	lines = decoded_text.splitlines()
+	if len(lines) < 2 or lines[0].strip() != "File type = \"ooTextFile\"":
+		raise Exception ("file " + fileName + " is not a Praat text file")
+	if lines[1].strip() != "Object class = \"Spectrogram\"" and lines[1].strip() != "Object class = \"Spectrogram 2\"":
+		raise Exception ("file " + fileName + " is not a Praat Spectrogram file")
+
+	### Both formats list the same numbers in the same order: the "text file"
+	##### has one "name = value" per line (plus label lines without values),
+	##### the "short text file" has one value per line
+	values = []
+	for line in lines[2:]:
+		if '=' in line:
+			line = line[line.index('=') + 1:]
+		try:
+			values.append(float(line))
+		except ValueError:
+			pass
+	names = ['xmin', 'xmax', 'nx', 'dx', 'x1', 'ymin', 'ymax', 'ny', 'dy', 'y1']
+	if len(values) < len(names):
+		raise Exception ("file " + fileName + " is not a complete Praat Spectrogram file")
+	metaData = dict(zip(names, values[:len(names)]))
+	metaData['nx'] = int(metaData['nx'])
+	metaData['ny'] = int(metaData['ny'])
+	if len(values) - len(names) != metaData['nx'] * metaData['ny']:
+		raise Exception('\nfile "' + fileName + '" promised to contain ' + str(metaData['nx'] * metaData['ny']) + ' values, but ' + str(len(values) - len(names)) + ' were found')
+	z = numpy.array(values[len(names):]).reshape(metaData['ny'], metaData['nx'])
+	return z, metaData
+
+######################################################################
+
 def readPraatShortTextFile(fileName, obj, startTime=0.0, endTime=-1):
 	""" 
-	this function reads a Praat pitch tier file (saved as a 'short text file')
+	this function reads a Praat pitch tier file (saved as a 'short text file',
+	or as a 'binary file', see @ref readPraatBinaryFile)
 	@param fileName
 	@param obj the file type. Currently we support these file types (as defined
 		internally by Praat):
@@ -81,6 +132,8 @@ def readPraatShortTextFile(fileName, obj, startTime=0.0, endTime=-1):
 		(index = 0) representing the time offsets of data values, and the 
 		second row representing the detected fundamental frequency values 
 	"""
+	if praat_binary_helper.is_praat_binary_file(fileName):
+		return readPraatBinaryFile(fileName, obj, startTime=startTime, endTime=endTime)
 	cnt = 0
 	dataX = []
 	dataY = []
@@ -144,6 +197,62 @@ def readPraatShortTextFile(fileName, obj, startTime=0.0, endTime=-1):
 
 ######################################################################
 
+def readPraatBinaryFile(fileName, obj, startTime=0.0, endTime=-1):
+	"""
+	this function reads a Praat tier or matrix file saved as 'binary file'
+	(see praat_binary_helper), and returns the same data as
+	@ref readPraatShortTextFile
+	@param fileName
+	@param obj the file type. Currently we support these file types (as defined
+		internally by Praat):
+			- PitchTier
+			- Intensity (an IntensityTier or Intensity 2)
+			- Harmonicity 2
+	@return a tuple containing the time offsets of the data values, the data
+		values and the header values (xmin, xmax and the number of values)
+	"""
+	arrFileTypes = ['Harmonicity 2', 'PitchTier', 'Intensity']
+	if not obj in arrFileTypes:
+		raise Exception('readPraatBinaryFile - file type must be: ' + ', '.join(arrFileTypes))
+	
+	if praat_binary_helper.get_praat_binary_class_name(fileName) in praat_binary_helper.PRAAT_TIER_CLASSES:
+		xmin, xmax, dataX, dataY = praat_binary_helper.read_binary_tier(fileName)
+	else:
+		xmin, xmax, dataX, dataY = praat_binary_helper.read_binary_matrix(fileName)
+		### Undefined values (e.g. of silent frames) are None, like in the short text files
+		if (dataY <= -100).any():
+			dataY = numpy.array([val if val > -100 else None for val in dataY])
+	metaData = [str(xmin), str(xmax), str(len(dataX))]
+	dataX, dataY = addJunkDataPoints(dataX, dataY, startTime=startTime, endTime=endTime)
+	return (dataX, dataY, metaData)
+
+######################################################################
+
+def addJunkDataPoints(dataX, dataY, startTime=0.0, endTime=-1):
+	"""
+	add the junk data points of @ref readPraatShortTextFile to data which was
+	not read from a Praat file
+	@param dataX the time offsets of the data values
+	@param dataY the data values
+	@param startTime if specified (> 0), a junk data point is added before it
+	@param endTime if specified (not -1), a junk data point is added after it
+	@return a tuple containing the time offsets and the data values (numpy
+		arrays), with the junk data points
+	"""
+	### If start time for .wav file was specified, add a junk data point
+	##### This is useful to make sure the points fit properly on the x-axis and y-axis
+	if startTime > 0.0:
+		dataX = numpy.concatenate(([startTime-1000000], dataX))
+		dataY = numpy.concatenate(([0], dataY))
+	### If end time for .wav file was specified, add a junk data point
+	##### This is useful to make sure the points fit properly on the x-axis and y-axis
+	if endTime != -1.0:
+		dataX = numpy.concatenate((dataX, [endTime+1000000]))
+		dataY = numpy.concatenate((dataY, [0]))
+	return (dataX, dataY)
+
+######################################################################
+
 class PraatFormants:
 	"""
 	a class to store/process Praat formants
@@ -391,6 +500,94 @@ class PraatFormants:
 		return isShortTextFile
 	# ---------------------------------------------------------------------- #
 	
+	def read_binary_formant_file(self, file_name):
+		"""
+		internally used ("pseudo-private") function to read a Praat Formant
+		saved as 'binary file' (see praat_binary_helper), into the same data
+		as a short text file
+		@param file_name
+		"""
+		self.set_formant_data(praat_binary_helper.read_binary_formant(file_name))
+	
+	# ---------------------------------------------------------------------- #
+	
+	def set_formant_data(self, formant):
+		"""
+		internally used ("pseudo-private") function to store the data of a
+		Praat Formant, as read by praat_binary_helper.read_binary_formant or
+		calculated by praat_formant_helper.calculate_formants
+		@param formant a dict with xmin, xmax, nx, dx, x1, maxnFormants,
+			intensities and formants (an array of (frequency, bandwidth) rows
+			per frame)
+		"""
+		self.xmin = formant['xmin']
+		self.xmax = formant['xmax']
+		self.nx = formant['nx']
+		self.dx = formant['dx']
+		self.x1 = formant['x1']
+		self.maxnFormants = formant['maxnFormants']
+		#Pref is the reference value of sound pressure. Typically, it is assumed to be equal to 0.00002 Pa.
+		reference_sound_pressure = 0.00002#Pascal (Pa)
+		for frameIdx in range(self.nx):
+			intensity = float(formant['intensities'][frameIdx])
+			intensity_dB = 0 if intensity == 0 else 20*numpy.log10(numpy.divide(numpy.sqrt(intensity), reference_sound_pressure))#20 * log (P/Pref)
+			self.arrX.append(self.x1 + self.dx * frameIdx)
+			self.arrData.append([{
+				'frequency':frequency,
+				'bandwidth':bandwidth,
+				'intensity':intensity,
+				'intensity_dB':intensity_dB,
+				'frameIdx':frameIdx + 1,
+			} for frequency, bandwidth in formant['formants'][frameIdx].tolist()])
+	
+	# ---------------------------------------------------------------------- #
+	
+	def get_formant_arrays(self):
+		"""
+		internally used ("pseudo-private") function to get the data of the
+		formants as numpy arrays (e.g. for the analysis cache, see
+		@ref set_formant_arrays)
+		@return a dict with 'sampling' (xmin, xmax, nx, dx, x1 and
+			maxnFormants), 'intensities' (one per frame) and 'formants' (the
+			(frequency, bandwidth) rows of each frame, padded with NaN)
+		"""
+		numFormants = max([len(frame) for frame in self.arrData] + [0])
+		formants = numpy.full((self.nx, numFormants, 2), numpy.nan)
+		intensities = numpy.zeros(self.nx)
+		for frameIdx, frame in enumerate(self.arrData):
+			for formantIdx, formant in enumerate(frame):
+				formants[frameIdx, formantIdx] = (formant['frequency'], formant['bandwidth'])
+			if len(frame) > 0 and frame[0].get('intensity') is not None:
+				intensities[frameIdx] = frame[0]['intensity']
+		return {
+			'sampling':numpy.array([self.xmin, self.xmax, self.nx, self.dx, self.x1, self.maxnFormants], dtype=numpy.float64),
+			'intensities':intensities,
+			'formants':formants,
+		}
+	
+	# ---------------------------------------------------------------------- #
+	
+	def set_formant_arrays(self, arrays):
+		"""
+		internally used ("pseudo-private") function to store the data of
+		the formants from numpy arrays
+		@param arrays a dict as returned by @ref get_formant_arrays
+		"""
+		self.clear()
+		xmin, xmax, nx, dx, x1, maxnFormants = arrays['sampling'].tolist()
+		self.set_formant_data({
+			'xmin':xmin,
+			'xmax':xmax,
+			'nx':int(nx),
+			'dx':dx,
+			'x1':x1,
+			'maxnFormants':maxnFormants,
+			'intensities':arrays['intensities'],
+			'formants':[frame[~numpy.isnan(frame[:, 0])] for frame in arrays['formants']],
+		})
+	
+	# ---------------------------------------------------------------------- #
+	
 	def readFile(self, fileName):
 		"""
 		@todo bug when opening a "long text file"
@@ -399,6 +596,10 @@ class PraatFormants:
 		"""
 		self.clear()
 		
+		if praat_binary_helper.is_praat_binary_file(fileName):
+			self.read_binary_formant_file(fileName)
+			return
+		
 		decoded_text, _ , _ = global_path_helper.read_from_file(fileName)
 		
 		if self.read_metadata(decoded_text.splitlines()[:9], fileName):
@@ -416,6 +617,148 @@ class PraatFormants:
 
 ######################################################################
 
+def getExtractPartScript(startTime = 0.0, endTime = -1):
+	"""
+	@param startTime beginning point of the sound to extract [s]
+	@param endTime ending point of the sound to extract [s] (-1 means "end of
+		the sound")
+	@return the Praat script lines which replace the selected Sound by the
+		specified part of it (with its original times), or an empty string if
+		the whole Sound is analyzed
+	"""
+	script = ''
+	if startTime > 0 and endTime != -1:
+		script += "Extract part... {:.7f} {:.7f} rectangular 1 yes\n".format(startTime, endTime)
+	elif startTime > 0:
+		script += "endTime = Get end time\n"
+		script += "Extract part... {:.7f} endTime rectangular 1 yes\n".format(startTime)
+	elif endTime != -1:
+		script += "Extract part... 0 {:.7f} rectangular 1 yes\n".format(endTime)
+	return script
+
+######################################################################
+
+def getSaveScript(fileName):
+	"""
+	@param fileName the file the selected object is saved to
+	@return the Praat script line which saves the selected object as binary
+		file (if global_values.praat_binary_output) or as short text file
+	"""
+	if global_values.praat_binary_output:
+		return "Save as binary file... %s\n" % fileName
+	return "Save as short text file... %s\n" % fileName
+
+######################################################################
+
+def getPitchScript(pitchTierFileName,
+					timeStep = 0.0,#Praat default is 0.0
+					fMin = 60,
+					fMax = 600,
+					veryAccurate = False,#Praat default is False
+					silenceThreshold = 0.0295,#Praat default is 0.03
+					voicingThreshold = 0.45,#Praat default is 0.45
+					octaveCost = 0.01,#Praat default is 0.01
+					octaveJumpCost = 0.25,#Praat default is 0.35
+					voicedUnvoicedCost = 0.26):#Praat default is 0.14
+	"""
+	@param pitchTierFileName the file the PitchTier is saved to
+	@param timeStep etc. see @ref calculatePitch
+	@return the Praat script lines which analyze the selected Sound with
+		<a href="http://www.fon.hum.uva.nl/praat/manual/Sound__To_Pitch__ac____.html">
+		To Pitch (ac)...</a> and save its PitchTier (see @ref getSaveScript)
+	"""
+	txtAccurate = 'no'
+	if veryAccurate: txtAccurate = 'yes'
+	
+	script = ''
+	script += "To Pitch (ac)... %f %f 15 %s %f %f %f %f %f %f\n" % (timeStep,
+																	fMin,
+																	txtAccurate,
+																	silenceThreshold,
+																	voicingThreshold,
+																	octaveCost,
+																	octaveJumpCost,
+																	voicedUnvoicedCost,
+																	fMax)
+	script += "Down to PitchTier\n"
+	script += getSaveScript(pitchTierFileName)
+	return script
+
+######################################################################
+
+def getIntensityScript(intensityTierFileName,
+						fMin = 100,
+						timeStep = 0,
+						subtractMean = True):
+	"""
+	@param intensityTierFileName the file the IntensityTier is saved to
+	@param fMin etc. see @ref calculateIntensity
+	@return the Praat script lines which analyze the selected Sound with
+		<a href="http://www.fon.hum.uva.nl/praat/manual/Sound__To_Intensity___.html">
+		To Intensity...</a> and save its IntensityTier (see @ref getSaveScript)
+	"""
+	sSubtractMean = 'no'
+	if subtractMean: sSubtractMean = 'yes'
+	script = ''
+	script += "To Intensity: %f, %f, \"%s\"\n" % (fMin, timeStep, sSubtractMean)
+	script += "Down to IntensityTier\n"
+	script += getSaveScript(intensityTierFileName)
+	return script
+
+######################################################################
+
+def getFormantScript(formantFileName,
+						maxFormantFrequency = 5500):#Praat default is 5500 Hz
+	"""
+	@param formantFileName the file the Formant object is saved to
+	@param maxFormantFrequency see @ref calculateFormants
+	@return the Praat script lines which analyze the selected Sound with
+		<a href="http://www.fon.hum.uva.nl/praat/manual/Sound__To_Formant__burg____.html">
+		To Formant (burg)...</a> and save the result (see @ref getSaveScript)
+	"""
+	script = ''
+	#five arguments: 
+	##### the time step,
+	##### the maximum number of formants,
+	##### the maximum hertz,
+	##### the window length,
+	##### Pre-emphasis from (Hz) 
+	script += 'do ("To Formant (burg)...", 0, 5, '+'{:.2f},'.format(maxFormantFrequency)+' 0.025, 50)\n'
+	script += getSaveScript(formantFileName)
+	return script
+
+######################################################################
+
+def getAnalysisCacheParameters(analysis, parameters, startTime = None, endTime = None):
+	"""
+	internally used ("pseudo-private") function to get the parameters which
+	identify an analysis in the analysis cache (see analysis_cache_helper)
+	@param analysis 'pitch', 'intensity' or 'formants'
+	@param parameters a dict of the keyword arguments of @ref getPitchScript,
+		@ref getIntensityScript or @ref getFormantScript (the missing ones
+		have their default values)
+	@param startTime beginning point of the analyzed part [s] (None for the
+		formants, which are calculated for the whole file)
+	@param endTime ending point of the analyzed part [s]
+	@return a dict of every parameter of the analysis, its engine and the
+		analyzed part
+	"""
+	scriptFunction, engine = {'pitch':(getPitchScript, global_values.pitch_engine),
+								'intensity':(getIntensityScript, global_values.intensity_engine),
+								'formants':(getFormantScript, global_values.formant_engine)}[analysis]
+	cacheParameters = {}
+	for name, parameter in inspect.signature(scriptFunction).parameters.items():
+		if parameter.default is not inspect.Parameter.empty:
+			cacheParameters[name] = parameter.default
+	cacheParameters.update(parameters)
+	cacheParameters['engine'] = engine
+	if startTime is not None:
+		cacheParameters['startTime'] = startTime
+		cacheParameters['endTime'] = endTime
+	return cacheParameters
+
+######################################################################
+
 def calculatePitch(wav_file_path,
 					startTime = 0.0,
 					endTime = -1,
@@ -433,7 +776,8 @@ def calculatePitch(wav_file_path,
 	Utility function to calculate the time-varying fundamental frequency of
 	the specified wave file using Praat's 
 	<a href="http://www.fon.hum.uva.nl/praat/manual/Sound__To_Pitch__ac____.html">
-	To Pitch (ac)...</a> method
+	To Pitch (ac)...</a> method, run by Praat or (if global_values.pitch_engine
+	is 'native') in this process by praat_pitch_helper
 	@param wav_file_path input file name
 	@param timeStep see Praat's manual
 	@param fMin see Praat's manual
@@ -444,36 +788,78 @@ def calculatePitch(wav_file_path,
 	@param keepPraatScriptFile if False, we'll remove the temporary Praat
 		script file
 	
+	@note the results are cached (see analysis_cache_helper), so the pitch
+		of an unchanged file is only calculated once
 	@todo refactor so that this function uses the new @ref runPraatScript(...) 
 		function
 	@todo add tmpDataPath parameter
 	"""
+	pitchParameters = {'timeStep':timeStep,
+						'fMin':fMin,
+						'fMax':fMax,
+						'veryAccurate':veryAccurate,
+						'silenceThreshold':silenceThreshold,
+						'voicingThreshold':voicingThreshold,
+						'octaveCost':octaveCost,
+						'octaveJumpCost':octaveJumpCost,
+						'voicedUnvoicedCost':voicedUnvoicedCost}
+	calculate = lambda: dict(zip(('times', 'values'), calculatePitchWithoutCache(wav_file_path, startTime=startTime, endTime=endTime, keepPraatScriptFile=keepPraatScriptFile, **pitchParameters)))
+	pitch = analysis_cache_helper.get_cached_analysis(wav_file_path, 'pitch',
+														getAnalysisCacheParameters('pitch', pitchParameters, startTime=startTime, endTime=endTime),
+														calculate)
+	return pitch['times'], pitch['values']
+
+######################################################################
+
+def calculatePitchWithoutCache(wav_file_path,
+								startTime = 0.0,
+								endTime = -1,
+								timeStep = 0.0,#Praat default is 0.0
+								fMin = 60,
+								fMax = 600,
+								veryAccurate = False,#Praat default is False
+								silenceThreshold = 0.0295,#Praat default is 0.03
+								voicingThreshold = 0.45,#Praat default is 0.45
+								octaveCost = 0.01,#Praat default is 0.01
+								octaveJumpCost = 0.25,#Praat default is 0.35
+								voicedUnvoicedCost = 0.26,#Praat default is 0.14
+								keepPraatScriptFile = False):
+	"""
+	calculate the pitch like @ref calculatePitch, without the analysis cache
+	"""
+	if global_values.pitch_engine == 'native':
+		dataT, dataP = praat_pitch_helper.calculate_pitch_tier(wav_file_path,
+																start_time=startTime,
+																end_time=endTime,
+																time_step=timeStep,
+																min_pitch=fMin,
+																max_pitch=fMax,
+																very_accurate=veryAccurate,
+																silence_threshold=silenceThreshold,
+																voicing_threshold=voicingThreshold,
+																octave_cost=octaveCost,
+																octave_jump_cost=octaveJumpCost,
+																voiced_unvoiced_cost=voicedUnvoicedCost)
+		return addJunkDataPoints(dataT, dataP, startTime=startTime, endTime=endTime)
+	elif global_values.pitch_engine != 'praat':
+		raise Exception("unknown pitch engine '" + str(global_values.pitch_engine) + "' (expected 'praat' or 'native')")
+
 	wav_dir, filename_only, _ = global_path_helper.split_path_filename_extension(wav_file_path)
 	pitchTierFileName = wav_dir + filename_only + '.PitchTier'
 
-	txtAccurate = 'no'
-	if veryAccurate: txtAccurate = 'yes'
-	
 	script = ''
 	script += "Read from file... %s\n" % wav_file_path
-	if startTime > 0 and endTime != -1:
-		script += "Extract part... {:.7f} {:.7f} rectangular 1 yes\n".format(startTime, endTime)
-	elif startTime > 0:
-		script += "endTime = Get end time\n"
-		script += "Extract part... {:.7f} endTime rectangular 1 yes\n".format(startTime)
-	elif endTime != -1:
-		script += "Extract part... 0 {:.7f} rectangular 1 yes\n".format(endTime)
-	script += "To Pitch (ac)... %f %f 15 %s %f %f %f %f %f %f\n" % (timeStep,
-																	fMin,
-																	txtAccurate,
-																	silenceThreshold,
-																	voicingThreshold,
-																	octaveCost,
-																	octaveJumpCost,
-																	voicedUnvoicedCost,
-																	fMax)
-	script += "Down to PitchTier\n"
-	script += "Save as short text file... %s\n" % pitchTierFileName
+	script += getExtractPartScript(startTime, endTime)
+	script += getPitchScript(pitchTierFileName,
+								timeStep = timeStep,
+								fMin = fMin,
+								fMax = fMax,
+								veryAccurate = veryAccurate,
+								silenceThreshold = silenceThreshold,
+								voicingThreshold = voicingThreshold,
+								octaveCost = octaveCost,
+								octaveJumpCost = octaveJumpCost,
+								voicedUnvoicedCost = voicedUnvoicedCost)
 	scriptFileName = 'tmp_pitch.praat'
 	
 	runPraatScript(script, scriptFileName)
@@ -493,7 +879,8 @@ def calculateIntensity(wav_file_path,
 	call Praat's 
 	<a href="http://www.fon.hum.uva.nl/praat/manual/Sound__To_Intensity___.html">
 	To Intensity...</a> function to calculate the specified file's
-	intensity.
+	intensity (or, if global_values.intensity_engine is 'native', calculate
+	it in this process with praat_intensity_helper).
 	@param wav_file_path the name of the input file. needs to have a full path
 		name if we should keep the IntensityTier file
 	@param fMin [Hz] - see Praat's manual
@@ -506,38 +893,247 @@ def calculateIntensity(wav_file_path,
 		script file
 	@return temporal and intensity information as returned by 
 		@ref readIntensityTier()
+	@note the results are cached (see analysis_cache_helper), so the
+		intensity of an unchanged file is only calculated once
 	"""
+	intensityParameters = {'fMin':fMin, 'timeStep':timeStep, 'subtractMean':subtractMean}
+	calculate = lambda: dict(zip(('times', 'values'), calculateIntensityWithoutCache(wav_file_path, startTime=startTime, endTime=endTime, keepPraatScriptFile=keepPraatScriptFile, **intensityParameters)))
+	intensity = analysis_cache_helper.get_cached_analysis(wav_file_path, 'intensity',
+															getAnalysisCacheParameters('intensity', intensityParameters, startTime=startTime, endTime=endTime),
+															calculate)
+	return intensity['times'], intensity['values']
+
+######################################################################
+
+def calculateIntensityWithoutCache(wav_file_path,
+									startTime = 0.0,
+									endTime = -1,
+									fMin = 100,
+									timeStep = 0,
+									subtractMean = True,
+									keepPraatScriptFile = False):
+	"""
+	calculate the intensity like @ref calculateIntensity, without the
+	analysis cache
+	"""
+	if global_values.intensity_engine == 'native':
+		dataT, dataI = praat_intensity_helper.calculate_intensity_tier(wav_file_path,
+																		start_time=startTime,
+																		end_time=endTime,
+																		min_pitch=fMin,
+																		time_step=timeStep,
+																		subtract_mean=subtractMean)
+		return addJunkDataPoints(dataT, dataI, startTime=startTime, endTime=endTime)
+	elif global_values.intensity_engine != 'praat':
+		raise Exception("unknown intensity engine '" + str(global_values.intensity_engine) + "' (expected 'praat' or 'native')")
+
 	wav_dir, filename_only, _ = global_path_helper.split_path_filename_extension(wav_file_path)
-	sSubtractMean = 'no'
-	if subtractMean: sSubtractMean = 'yes'
 	intensityTierFileName = wav_dir + filename_only + '.IntensityTier'
 	script = ''
 	script += "Read from file... %s\n" % wav_file_path
-	if startTime > 0 and endTime != -1:
-		script += "Extract part... {:.7f} {:.7f} rectangular 1 yes\n".format(startTime, endTime)
-	elif startTime > 0:
-		script += "endTime = Get end time\n"
-		script += "Extract part... {:.7f} endTime rectangular 1 yes\n".format(startTime)
-	elif endTime != -1:
-		script += "Extract part... 0 {:.7f} rectangular 1 yes\n".format(endTime)
-	script += "To Intensity: %f, %f, \"%s\"\n" % (fMin, timeStep, sSubtractMean)
-	script += "Down to IntensityTier\n"
-	script += "Save as short text file... %s\n" % intensityTierFileName
+	script += getExtractPartScript(startTime, endTime)
+	script += getIntensityScript(intensityTierFileName, fMin = fMin, timeStep = timeStep, subtractMean = subtractMean)
 	scriptFileName = 'tmp_intensity.praat'
 	
 	runPraatScript(script, scriptFileName)
 	dataT, dataI = readIntensityTier(intensityTierFileName, startTime=startTime, endTime=endTime)
 	return dataT, dataI
 
+######################################################################
+
+def calculateFormants(wav_file_path,
+						maxFormantFrequency = 5500,#Praat default is 5500 Hz
+						keepPraatScriptFile = False):
+	"""
+	call Praat's
+	<a href="http://www.fon.hum.uva.nl/praat/manual/Sound__To_Formant__burg____.html">
+	To Formant (burg)...</a> function to calculate the formants of the
+	whole specified file (or, if global_values.formant_engine is 'native',
+	calculate them in this process with praat_formant_helper)
+	@param wav_file_path the name of the input file. needs to have a full path
+		name, since the Formant file is saved next to it
+	@param maxFormantFrequency [Hz] - see Praat's manual
+	@param keepPraatScriptFile if False, we'll remove the temporary Praat
+		script file
+	@return a @ref PraatFormants object holding the formants
+	@note the results are cached (see analysis_cache_helper), so the
+		formants of an unchanged file are only calculated once
+	"""
+	calculate = lambda: calculateFormantsWithoutCache(wav_file_path, maxFormantFrequency=maxFormantFrequency, keepPraatScriptFile=keepPraatScriptFile).get_formant_arrays()
+	formantArrays = analysis_cache_helper.get_cached_analysis(wav_file_path, 'formants',
+																getAnalysisCacheParameters('formants', {'maxFormantFrequency':maxFormantFrequency}),
+																calculate)
+	formants = PraatFormants()
+	formants.set_formant_arrays(formantArrays)
+	return formants
+
+######################################################################
+
+def calculateFormantsWithoutCache(wav_file_path,
+									maxFormantFrequency = 5500,#Praat default is 5500 Hz
+									keepPraatScriptFile = False):
+	"""
+	calculate the formants like @ref calculateFormants, without the
+	analysis cache
+	"""
+	if global_values.formant_engine == 'native':
+		formants = PraatFormants()
+		formants.set_formant_data(praat_formant_helper.calculate_formants(wav_file_path, max_formant_frequency=maxFormantFrequency))
+		return formants
+	elif global_values.formant_engine != 'praat':
+		raise Exception("unknown formant engine '" + str(global_values.formant_engine) + "' (expected 'praat' or 'native')")
+
+	wav_dir, filename_only, _ = global_path_helper.split_path_filename_extension(wav_file_path)
+	formantFileName = wav_dir + filename_only + '.Formant'
+	script = ''
+	script += 'do ("Read from file...", "' +  wav_file_path + '")\n'
+	script += getFormantScript(formantFileName, maxFormantFrequency = maxFormantFrequency)
+	scriptFileName = 'tmp_formants.praat'
+
+	runPraatScript(script, scriptFileName, keepPraatScriptFile=keepPraatScriptFile)
+	formants = PraatFormants()
+	formants.readFile(formantFileName)
+	return formants
+
+######################################################################
+
+def calculatePitchIntensityFormants(wav_file_path,
+									startTime = 0.0,
+									endTime = -1,
+									pitchParameters = None,
+									intensityParameters = None,
+									formantParameters = None,
+									keepPraatScriptFile = False):
+	"""
+	calculate the pitch, intensity and/or formants of the specified file in
+	a single Praat script, which reads (and extracts the part of) the sound
+	only once. the results are the same as those of @ref calculatePitch,
+	@ref calculateIntensity and @ref calculateFormants (like the latter,
+	the formants are calculated for the whole file). the analyses whose
+	engine (global_values.pitch_engine, intensity_engine or formant_engine)
+	is 'native', or which are in the analysis cache, are calculated by
+	@ref calculatePitch, @ref calculateIntensity or @ref calculateFormants
+	instead (without Praat), and the results of Praat are cached like theirs.
+	@param wav_file_path the name of the input file. needs to have a full path
+		name, since the result files are saved next to it
+	@param startTime beginning point of the pitch and intensity analysis [s]
+	@param endTime ending point of the pitch and intensity analysis [s]
+	@param pitchParameters a dict of the keyword arguments of
+		@ref getPitchScript (e.g. {'fMin':75.0}), or None to skip the pitch
+	@param intensityParameters a dict of the keyword arguments of
+		@ref getIntensityScript, or None to skip the intensity
+	@param formantParameters a dict of the keyword arguments of
+		@ref getFormantScript, or None to skip the formants
+	@param keepPraatScriptFile if False, we'll remove the temporary Praat
+		script file
+	@return a dict with the results: 'pitch' and 'intensity' (tuples as
+		returned by @ref calculatePitch and @ref calculateIntensity) and
+		'formants' (a @ref PraatFormants object), each None if skipped
+	"""
+	results = {'pitch':None, 'intensity':None, 'formants':None}
+	pitchCacheParameters = getAnalysisCacheParameters('pitch', pitchParameters or {}, startTime=startTime, endTime=endTime)
+	intensityCacheParameters = getAnalysisCacheParameters('intensity', intensityParameters or {}, startTime=startTime, endTime=endTime)
+	formantCacheParameters = getAnalysisCacheParameters('formants', formantParameters or {})
+	### The native engines calculate their analyses without Praat, and cached
+	##### analyses are not calculated again
+	if pitchParameters is not None and (global_values.pitch_engine != 'praat' or analysis_cache_helper.is_analysis_cached(wav_file_path, 'pitch', pitchCacheParameters)):
+		results['pitch'] = calculatePitch(wav_file_path, startTime=startTime, endTime=endTime, **pitchParameters)
+		pitchParameters = None
+	if intensityParameters is not None and (global_values.intensity_engine != 'praat' or analysis_cache_helper.is_analysis_cached(wav_file_path, 'intensity', intensityCacheParameters)):
+		results['intensity'] = calculateIntensity(wav_file_path, startTime=startTime, endTime=endTime, **intensityParameters)
+		intensityParameters = None
+	if formantParameters is not None and (global_values.formant_engine != 'praat' or analysis_cache_helper.is_analysis_cached(wav_file_path, 'formants', formantCacheParameters)):
+		results['formants'] = calculateFormants(wav_file_path, **formantParameters)
+		formantParameters = None
+	if pitchParameters is None and intensityParameters is None and formantParameters is None:
+		return results
+
+	wav_dir, filename_only, _ = global_path_helper.split_path_filename_extension(wav_file_path)
+	pitchTierFileName = wav_dir + filename_only + '.PitchTier'
+	intensityTierFileName = wav_dir + filename_only + '.IntensityTier'
+	formantFileName = wav_dir + filename_only + '.Formant'
+
+	script = ''
+	script += "Read from file... %s\n" % wav_file_path
+	script += "sound = selected (\"Sound\")\n"
+	if formantParameters is not None:
+		script += getFormantScript(formantFileName, **formantParameters)
+		script += "selectObject: sound\n"
+	script += getExtractPartScript(startTime, endTime)
+	script += "part = selected (\"Sound\")\n"
+	if pitchParameters is not None:
+		script += getPitchScript(pitchTierFileName, **pitchParameters)
+		script += "selectObject: part\n"
+	if intensityParameters is not None:
+		script += getIntensityScript(intensityTierFileName, **intensityParameters)
+	scriptFileName = 'tmp_analysis.praat'
+
+	runPraatScript(script, scriptFileName, keepPraatScriptFile=keepPraatScriptFile)
+	if pitchParameters is not None:
+		results['pitch'] = readPitchTier(pitchTierFileName, startTime=startTime, endTime=endTime)
+		analysis_cache_helper.save_cached_analysis(wav_file_path, 'pitch', pitchCacheParameters, dict(zip(('times', 'values'), results['pitch'])))
+	if intensityParameters is not None:
+		results['intensity'] = readIntensityTier(intensityTierFileName, startTime=startTime, endTime=endTime)
+		analysis_cache_helper.save_cached_analysis(wav_file_path, 'intensity', intensityCacheParameters, dict(zip(('times', 'values'), results['intensity'])))
+	if formantParameters is not None:
+		results['formants'] = PraatFormants()
+		results['formants'].readFile(formantFileName)
+		analysis_cache_helper.save_cached_analysis(wav_file_path, 'formants', formantCacheParameters, results['formants'].get_formant_arrays())
+	return results
+
+######################################################################
+
+def calculateSpectrogram(wav_file_path,
+							startTime = 0.0,
+							endTime = -1,
+							windowLength = 0.005,#Praat default is 0.005
+							maxFrequency = 5000,#Praat default is 5000
+							timeStep = 0.002,#Praat default is 0.002
+							frequencyStep = 20,#Praat default is 20
+							windowShape = 'Gaussian',#Praat default is Gaussian
+							keepPraatScriptFile = False):
+	"""
+	call Praat's
+	<a href="http://www.fon.hum.uva.nl/praat/manual/Sound__To_Spectrogram___.html">
+	To Spectrogram...</a> function to calculate the specified file's
+	spectrogram (e.g. as a reference for
+	praat_spectrogram_helper.compare_to_praat_spectrogram)
+	@param wav_file_path the name of the input file. needs to have a full path
+		name, since the Spectrogram file is saved next to it
+	@param windowLength [s] - see Praat's manual
+	@param maxFrequency [Hz] - see Praat's manual
+	@param timeStep [s] - see Praat's manual
+	@param frequencyStep [Hz] - see Praat's manual
+	@param windowShape see Praat's manual
+	@param keepPraatScriptFile if False, we'll remove the temporary Praat
+		script file
+	@return the file name of the saved Spectrogram (a Praat text file, see
+		@ref readPraatSpectrogram)
+	"""
+	wav_dir, filename_only, _ = global_path_helper.split_path_filename_extension(wav_file_path)
+	spectrogramFileName = wav_dir + filename_only + '.Spectrogram'
+	script = ''
+	script += "Read from file... %s\n" % wav_file_path
+	script += getExtractPartScript(startTime, endTime)
+	script += "To Spectrogram: %f, %f, %f, %f, \"%s\"\n" % (windowLength, maxFrequency, timeStep, frequencyStep, windowShape)
+	script += "Save as text file... %s\n" % spectrogramFileName
+	scriptFileName = 'tmp_spectrogram.praat'
+
+	runPraatScript(script, scriptFileName, keepPraatScriptFile=keepPraatScriptFile)
+	return spectrogramFileName
+
 ##############################################################################
 
 def runPraatScript(script, 
 					scriptFileName = 'tmp.praat', 
 					keepPraatScriptFile = False,
 					tmpDataPath = global_values.python_build_dir,
-					output_runtime = False):
+					output_runtime = False,
+					timeout = None):
 	"""
-	write the specified Praat script to a (temporary) script file and execute
+	execute the specified Praat script on the next idle worker of the Praat
+	worker pool (see praat_worker_pool_helper), or - if the pool is switched
+	off or unavailable - write it to a (temporary) script file and execute
 	that script within Praat by making a system call. In order for this to 
 	work properly, Praat must be installed and available at the command line.
 
@@ -550,25 +1146,36 @@ def runPraatScript(script,
 	@param tmpDataPath where the temporary script file is saved. If None, Python
 		will look for the current user's path and append 'tmp' (and if that 
 		resulting path is not found, it will be created automatically)
-	@throw throws an error if the script execution fails
+	@param timeout the longest time [s] the script may run on a worker (None
+		means global_values.praat_job_timeout)
+	@throw throws an error if the script execution fails (or times out)
 	@return the time (milliseconds) it took to execute the Praat script
 	"""
 	if tmpDataPath is None:
 		tmpDataPath = global_values.python_build_dir
 	
-	global_path_helper.verify_or_make_dirs_for(tmpDataPath + scriptFileName)
-	global_path_helper.write_to_file(tmpDataPath + scriptFileName, script)
-	
-	args = ['Praat', tmpDataPath + scriptFileName]
-	
 	start_time = time.perf_counter()
 	
-	msg = generalUtility.makeSystemCall(args)
-	if msg != '':
-		raise Exception("Error executing Praat script: " + str(msg))
-	if not keepPraatScriptFile:
-		os.remove(tmpDataPath + scriptFileName)
-		os.rmdir(tmpDataPath)
+	global_path_helper.verify_or_make_dirs_for(tmpDataPath + scriptFileName)
+	praat_worker_pool = praat_worker_pool_helper.get_praat_worker_pool()
+	if praat_worker_pool is not None and praat_worker_pool.run_script(script, timeout):
+		if keepPraatScriptFile:
+			global_path_helper.write_to_file(tmpDataPath + scriptFileName, script)
+	else:
+		global_path_helper.write_to_file(tmpDataPath + scriptFileName, script)
+		
+		args = ['Praat', tmpDataPath + scriptFileName]
+		
+		msg = generalUtility.makeSystemCall(args)
+		if msg != '':
+			raise Exception("Error executing Praat script: " + str(msg))
+		if not keepPraatScriptFile:
+			os.remove(tmpDataPath + scriptFileName)
+			### (the directory also holds the build caches and the workers' job directories)
+			try:
+				os.rmdir(tmpDataPath)
+			except OSError:
+				pass
 	
 	if output_runtime:
 		runtimes_output = '------------------------------------\n'
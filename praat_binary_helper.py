@@ -0,0 +1,382 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python3
+#%############################################################
+#%Regular package imports here
+#%############################################################
+import numpy
+import struct
+
+######################################################################
+# constants
+######################################################################
+
+### First bytes of every file saved by Praat's "Save as binary file..."
+PRAAT_BINARY_FILE_HEADER = b'ooBinaryFile'
+
+### Praat's binary files are big-endian (numbers and string lengths)
+BINARY_DOUBLE = numpy.dtype('>f8')
+
+### Classes (and versions) whose binary layout is known
+##### PitchTier, IntensityTier: xmin, xmax, number of points, (time, value) per point
+##### Intensity 2, Harmonicity 2: xmin, xmax, nx, dx, x1, ymin, ymax, ny, dy, y1, z (ny x nx)
+##### Pitch 1: xmin, xmax, nx, dx, x1, ceiling, maxnCandidates (16 bits), then
+#####		per frame: intensity, nCandidates, (frequency, strength) per candidate
+##### Formant 2: xmin, xmax, nx, dx, x1, maxnFormants (16 bits), then per frame:
+#####		intensity, nFormants (16 bits), (frequency, bandwidth) per formant
+##### TextGrid: xmin, xmax, <exists>, number of tiers, then per tier: class name,
+#####		name, xmin, xmax, number of items, (xmin, xmax, text) per interval or
+#####		(time, mark) per point
+PRAAT_TIER_CLASSES = ('PitchTier', 'IntensityTier')
+PRAAT_MATRIX_CLASSES = ('Intensity 2', 'Harmonicity 2')
+
+######################################################################
+
+class PraatBinaryReader:
+	"""
+	a class to decode the contents of a Praat binary file (as saved by
+	"Save as binary file...") from a bytes buffer. numbers are decoded with
+	numpy.frombuffer, so a whole array of them costs a single call.
+	"""
+
+	# ---------------------------------------------------------------------- #
+
+	def __init__(self, buffer, file_path=''):
+		"""
+		@param buffer the contents of the file
+		@param file_path the name of the file (only used for reporting errors)
+		"""
+		self.buffer = buffer
+		self.file_path = file_path
+		self.offset = 0
+
+	# ---------------------------------------------------------------------- #
+
+	def read_bytes(self, num_bytes):
+		"""
+		@param num_bytes
+		@return the next num_bytes bytes of the buffer
+		"""
+		if self.offset + num_bytes > len(self.buffer):
+			raise Exception("file '" + self.file_path + "' ends unexpectedly (at byte " + str(len(self.buffer)) + ", while reading " + str(num_bytes) + " bytes at byte " + str(self.offset) + ")")
+		data = self.buffer[self.offset:self.offset + num_bytes]
+		self.offset += num_bytes
+		return data
+
+	# ---------------------------------------------------------------------- #
+
+	def read_doubles(self, count):
+		"""
+		@param count
+		@return a (float64) numpy array of the next count doubles
+		"""
+		return numpy.frombuffer(self.read_bytes(count * BINARY_DOUBLE.itemsize), dtype=BINARY_DOUBLE).astype(numpy.float64)
+
+	# ---------------------------------------------------------------------- #
+
+	def read_double(self):
+		"""
+		@return the next double
+		"""
+		return struct.unpack('>d', self.read_bytes(8))[0]
+
+	# ---------------------------------------------------------------------- #
+
+	def read_integer(self):
+		"""
+		@return the next (32-bit) integer
+		"""
+		return struct.unpack('>i', self.read_bytes(4))[0]
+
+	# ---------------------------------------------------------------------- #
+
+	def read_short(self):
+		"""
+		@return the next (16-bit) integer, e.g. a number of candidates or formants
+		"""
+		return struct.unpack('>h', self.read_bytes(2))[0]
+
+	# ---------------------------------------------------------------------- #
+
+	def read_bool(self):
+		"""
+		@return the next (8-bit) boolean, e.g. whether an object exists
+		"""
+		return self.read_bytes(1) != b'\x00'
+
+	# ---------------------------------------------------------------------- #
+
+	def read_string(self, length_size):
+		"""
+		internally used ("pseudo-private") function to read a string: its
+		length, followed by its ASCII characters, or a marker (all length
+		bits set), followed by its length and its UTF-16 code units
+		@param length_size the number of bytes of the length (1 or 2)
+		@return the string
+		"""
+		length_format = '>B' if length_size == 1 else '>H'
+		length = struct.unpack(length_format, self.read_bytes(length_size))[0]
+		if length != 2**(8 * length_size) - 1:
+			return self.read_bytes(length).decode('ascii')
+		length = struct.unpack(length_format, self.read_bytes(length_size))[0]
+		return self.read_bytes(2 * length).decode('utf-16-be')
+
+	# ---------------------------------------------------------------------- #
+
+	def read_string8(self):
+		"""
+		@return the next string with an 8-bit length (e.g. a class name)
+		"""
+		return self.read_string(1)
+
+	# ---------------------------------------------------------------------- #
+
+	def read_string16(self):
+		"""
+		@return the next string with a 16-bit length (e.g. a label)
+		"""
+		return self.read_string(2)
+
+######################################################################
+######################################################################
+### Check whether a file was saved by Praat's "Save as binary file..."
+#####
+#####
+### Arguments:
+##### file_path			- the full path of the file
+#####
+### Returns:
+##### bool				- True for a binary file, False otherwise (e.g. a text file)
+######################################################################
+######################################################################
+def is_praat_binary_file(file_path):
+	with open(file_path, 'rb') as f:
+		return f.read(len(PRAAT_BINARY_FILE_HEADER)) == PRAAT_BINARY_FILE_HEADER
+
+######################################################################
+######################################################################
+### Get the class of the object in a Praat binary file
+#####
+#####
+### Arguments:
+##### file_path			- the full path of the file
+#####
+### Returns:
+##### string			- the class (with its version, e.g. 'Formant 2')
+######################################################################
+######################################################################
+def get_praat_binary_class_name(file_path):
+	with open(file_path, 'rb') as f:
+		### (the header is followed by the class name, at most 255 characters)
+		reader = PraatBinaryReader(f.read(len(PRAAT_BINARY_FILE_HEADER) + 256), file_path)
+	if reader.read_bytes(len(PRAAT_BINARY_FILE_HEADER)) != PRAAT_BINARY_FILE_HEADER:
+		raise Exception("file '" + file_path + "' is not a Praat binary file")
+	return reader.read_string8()
+
+######################################################################
+######################################################################
+### Open a Praat binary file
+#####
+#####
+### Arguments:
+##### file_path			- the full path of the file
+##### class_names		- the classes (with versions, e.g. 'Formant 2') the file may hold
+#####
+### Returns:
+##### string			- the class of the object in the file
+##### PraatBinaryReader	- a reader positioned at the start of the object's data
+######################################################################
+######################################################################
+def open_praat_binary_file(file_path, class_names):
+	with open(file_path, 'rb') as f:
+		reader = PraatBinaryReader(f.read(), file_path)
+	if reader.read_bytes(len(PRAAT_BINARY_FILE_HEADER)) != PRAAT_BINARY_FILE_HEADER:
+		raise Exception("file '" + file_path + "' is not a Praat binary file")
+	class_name = reader.read_string8()
+	if class_name not in class_names:
+		raise Exception("file '" + file_path + "' holds a Praat '" + class_name + "', not one of " + str(class_names))
+	return class_name, reader
+
+######################################################################
+######################################################################
+### Read the sampling of a Praat Sampled object (e.g. a Pitch or Formant)
+#####
+#####
+### Arguments:
+##### reader			- a PraatBinaryReader, positioned at the start of the object
+#####
+### Returns:
+##### dict				- xmin, xmax, nx, dx, x1
+######################################################################
+######################################################################
+def read_binary_sampling(reader):
+	return {
+		'xmin':reader.read_double(),
+		'xmax':reader.read_double(),
+		'nx':reader.read_integer(),
+		'dx':reader.read_double(),
+		'x1':reader.read_double(),
+	}
+
+######################################################################
+######################################################################
+### Read a Praat PitchTier or IntensityTier binary file
+#####
+#####
+### Arguments:
+##### file_path			- the full path of the file
+#####
+### Returns:
+##### xmin				- the start time of the tier [s]
+##### xmax				- the end time of the tier [s]
+##### times				- (float64) numpy array of the time of each point [s]
+##### values			- (float64) numpy array of the value of each point
+######################################################################
+######################################################################
+def read_binary_tier(file_path):
+	_, reader = open_praat_binary_file(file_path, PRAAT_TIER_CLASSES)
+	xmin = reader.read_double()
+	xmax = reader.read_double()
+	points = reader.read_doubles(2 * reader.read_integer()).reshape(-1, 2)
+	return xmin, xmax, points[:, 0], points[:, 1]
+
+######################################################################
+######################################################################
+### Read a Praat Intensity or Harmonicity binary file
+#####
+#####
+### Arguments:
+##### file_path			- the full path of the file
+#####
+### Returns:
+##### xmin				- the start time of the matrix [s]
+##### xmax				- the end time of the matrix [s]
+##### times				- (float64) numpy array of the time of each frame [s]
+##### values			- (float64) numpy array of the value of each frame
+######################################################################
+######################################################################
+def read_binary_matrix(file_path):
+	_, reader = open_praat_binary_file(file_path, PRAAT_MATRIX_CLASSES)
+	sampling = read_binary_sampling(reader)
+	reader.read_double()#ymin
+	reader.read_double()#ymax
+	ny = reader.read_integer()
+	reader.read_double()#dy
+	reader.read_double()#y1
+	z = reader.read_doubles(ny * sampling['nx']).reshape(ny, sampling['nx'])
+	return sampling['xmin'], sampling['xmax'], sampling['x1'] + numpy.arange(sampling['nx']) * sampling['dx'], z[0]
+
+######################################################################
+######################################################################
+### Read the frames of a Praat Pitch or Formant binary file, each an
+##### intensity followed by a variable number of pairs of doubles
+#####
+#####
+### Arguments:
+##### reader			- a PraatBinaryReader, positioned at the first frame
+##### num_frames		- the number of frames
+##### count_size		- the number of bytes of the number of pairs of a frame
+#####						(4, or 2 in Formant files)
+#####
+### Returns:
+##### intensities		- (float64) numpy array of the intensity of each frame
+##### pairs				- list of one (float64) numpy array of shape (pairs, 2) per frame
+######################################################################
+######################################################################
+def read_binary_frames(reader, num_frames, count_size=4):
+	intensities = numpy.empty(num_frames)
+	pairs = []
+	for frame_index in range(num_frames):
+		intensities[frame_index] = reader.read_double()
+		num_pairs = reader.read_integer() if count_size == 4 else reader.read_short()
+		pairs.append(reader.read_doubles(2 * num_pairs).reshape(-1, 2))
+	return intensities, pairs
+
+######################################################################
+######################################################################
+### Read a Praat Pitch binary file
+#####
+#####
+### Arguments:
+##### file_path			- the full path of the file
+#####
+### Returns:
+##### dict				- the sampling (see read_binary_sampling), ceiling, and (float64)
+#####						numpy arrays of the time, intensity, frequency and strength
+#####						of each frame (the frequency and strength of its best candidate,
+#####						which is 0 Hz in unvoiced frames)
+######################################################################
+######################################################################
+def read_binary_pitch(file_path):
+	_, reader = open_praat_binary_file(file_path, ('Pitch 1',))
+	pitch = read_binary_sampling(reader)
+	pitch['ceiling'] = reader.read_double()
+	reader.read_short()#maxnCandidates
+	pitch['intensities'], candidates = read_binary_frames(reader, pitch['nx'])
+	pitch['times'] = pitch['x1'] + numpy.arange(pitch['nx']) * pitch['dx']
+	pitch['frequencies'] = numpy.array([frame_candidates[0, 0] if len(frame_candidates) > 0 else 0. for frame_candidates in candidates])
+	pitch['strengths'] = numpy.array([frame_candidates[0, 1] if len(frame_candidates) > 0 else 0. for frame_candidates in candidates])
+	return pitch
+
+######################################################################
+######################################################################
+### Read a Praat Formant binary file
+#####
+#####
+### Arguments:
+##### file_path			- the full path of the file
+#####
+### Returns:
+##### dict				- the sampling (see read_binary_sampling), maxnFormants, and
+#####						per frame: its intensity ('intensities', a numpy array) and
+#####						its formants ('formants', a list of numpy arrays of shape
+#####						(formants, 2) holding frequency and bandwidth)
+######################################################################
+######################################################################
+def read_binary_formant(file_path):
+	_, reader = open_praat_binary_file(file_path, ('Formant 2',))
+	formant = read_binary_sampling(reader)
+	formant['maxnFormants'] = reader.read_short()
+	formant['intensities'], formant['formants'] = read_binary_frames(reader, formant['nx'], count_size=2)
+	return formant
+
+######################################################################
+######################################################################
+### Read a Praat TextGrid binary file
+#####
+#####
+### Arguments:
+##### file_path			- the full path of the file
+#####
+### Returns:
+##### xmin				- the start time of the TextGrid [s]
+##### xmax				- the end time of the TextGrid [s]
+##### tiers				- list of one dict per tier: class ('IntervalTier' or 'TextTier'),
+#####						name, xmin, xmax, and its items: a list of (xmin, xmax, text)
+#####						per interval, or of (time, mark) per point
+######################################################################
+######################################################################
+def read_binary_text_grid(file_path):
+	_, reader = open_praat_binary_file(file_path, ('TextGrid',))
+	xmin = reader.read_double()
+	xmax = reader.read_double()
+	tiers = []
+	if not reader.read_bool():
+		return xmin, xmax, tiers
+	for tier_index in range(reader.read_integer()):
+		tier = {
+			'class':reader.read_string8(),
+			'name':reader.read_string16(),
+			'xmin':reader.read_double(),
+			'xmax':reader.read_double(),
+			'items':[],
+		}
+		if tier['class'] == 'IntervalTier':
+			for item_index in range(reader.read_integer()):
+				tier['items'].append((reader.read_double(), reader.read_double(), reader.read_string16()))
+		elif tier['class'] == 'TextTier':
+			for item_index in range(reader.read_integer()):
+				tier['items'].append((reader.read_double(), reader.read_string16()))
+		else:
+			raise Exception("file '" + file_path + "' holds a tier of the unsupported class '" + tier['class'] + "'")
+		tiers.append(tier)
+	return xmin, xmax, tiers
@@ -0,0 +1,397 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python3
+#%############################################################
+#%Regular package imports here
+#%############################################################
+import fractions
+import math
+import numpy
+#%############################################################
+#% Local file imports here
+#%############################################################
+import audio_file_helper
+import praat_pitch_helper
+import wav_file_helper
+
+######################################################################
+# constants
+######################################################################
+
+### Depth of Praat's sin(x)/x interpolation when resampling a sound (the
+##### precision of "Resample...", as used by "To Formant (burg)...")
+FORMANT_RESAMPLE_DEPTH = 50
+
+### Number of zeros on each side of a sound before its (anti-aliasing) FFT
+FORMANT_RESAMPLE_ANTI_TURN_AROUND = 1000
+
+### Lowest formant frequency, and the smallest distance of a formant
+##### frequency to the Nyquist frequency [Hz] (Praat's safety margin)
+FORMANT_SAFETY_MARGIN = 50.0
+
+### Maximum number of Newton steps to polish a root (like Praat's
+##### Roots_Polynomial_polish)
+FORMANT_ROOT_MAX_ITERATIONS = 80
+
+### Largest number of distinct interpolation phases (the denominator of the
+##### ratio of the sample rates) for which resample computes the sin(x)/x
+##### weights of each phase once, instead of for every new sample
+FORMANT_RESAMPLE_MAX_PHASES = 4096
+
+### Number of samples resampled at once, and number of frames analyzed at once
+FORMANT_RESAMPLE_BLOCK_SIZE = 16384
+FORMANT_BLOCK_SIZE = 1024
+
+######################################################################
+######################################################################
+### Resample audio data exactly like Praat's "Sound: Resample..." (a sin(x)/x
+##### interpolation; when downsampling, the frequencies above the new
+##### Nyquist frequency are first removed by an FFT filter; doubling the
+##### sample rate is done in the frequency domain, like Sound_upsample)
+#####
+#####
+### Arguments:
+##### data				- the (mono) audio data
+##### Fs				- the sample rate of the data
+##### new_Fs			- the new sample rate
+##### start_time		- the time of the start of the data [s]
+##### precision			- the depth of the sin(x)/x interpolation [samples]
+#####
+### Returns:
+##### data				- the resampled data
+##### x1				- the time of the first resampled sample [s]
+######################################################################
+######################################################################
+def resample(data, Fs, new_Fs, start_time=0.0, precision=FORMANT_RESAMPLE_DEPTH):
+	data = numpy.asarray(data, dtype=numpy.float64)
+	dx = 1. / Fs
+	nx = len(data)
+	x1 = start_time + 0.5 * dx
+	upfactor = new_Fs * dx
+	if abs(upfactor - 1.0) < 1e-6:
+		return data.copy(), x1
+
+	### The spectrum of the data padded with zeros (to a power of two), as
+	##### Praat's array: the DC and Nyquist components, then the real and
+	##### imaginary part of each frequency (index 0 is unused, as in Praat)
+	anti_turn_around = FORMANT_RESAMPLE_ANTI_TURN_AROUND
+	nfft = 1
+	while nfft < nx + 2 * anti_turn_around:
+		nfft *= 2
+	padded = numpy.zeros(nfft)
+	padded[anti_turn_around:anti_turn_around + nx] = data
+	spectrum = numpy.fft.rfft(padded)
+	array = numpy.zeros(nfft + 1)
+	array[1], array[2] = spectrum[0].real, spectrum[-1].real
+	array[3::2], array[4::2] = spectrum[1:-1].real, spectrum[1:-1].imag
+	def array_to_spectrum(array):
+		return numpy.concatenate(([array[1]], array[3::2] + 1j * array[4::2], [array[2]]))
+
+	if abs(upfactor - 2.0) < 1e-6:
+		### A linear taper over the top 5 percent of the array, without the
+		##### Nyquist component, back at twice the length
+		imin = int(nfft * 0.95)
+		array[imin + 1:] *= (nfft - numpy.arange(imin + 1, nfft + 1)) / float(nfft - imin)
+		array[2] = 0.0
+		upsampled = numpy.fft.irfft(array_to_spectrum(array), 2 * nfft) * 2.0
+		return upsampled[2 * anti_turn_around:2 * anti_turn_around + 2 * nx], x1 - 0.25 * dx
+
+	if upfactor < 1.0:
+		### The anti-aliasing filter: zeros from the new Nyquist frequency on
+		array[int(math.floor(upfactor * nfft)):] = 0.0
+		array[2] = 0.0
+		data = numpy.fft.irfft(array_to_spectrum(array), nfft)[anti_turn_around:anti_turn_around + nx]
+
+	### Interpolate the new samples (centred within the duration of the data)
+	num_samples = int(round(nx * dx * new_Fs))
+	if num_samples < 1:
+		raise Exception("the sound is too short (" + str(nx * dx) + " s) to resample it to " + str(new_Fs) + " Hz")
+	new_x1 = 0.5 * (start_time + (start_time + nx * dx) - (num_samples - 1) / float(new_Fs))
+	def get_positions(indices):
+		return (new_x1 + indices / float(new_Fs) - x1) / dx
+	resampled = numpy.empty(num_samples)
+	is_interpolated = numpy.zeros(num_samples, dtype=bool)
+
+	### If the new samples step by num_steps old samples every num_phases new
+	##### samples, the samples of a phase share their weights, and are the
+	##### dot products of these weights with strided windows of the data
+	##### (except close to the edges, where the interpolation is shallower)
+	step = fractions.Fraction(Fs / float(new_Fs)).limit_denominator(FORMANT_RESAMPLE_MAX_PHASES)
+	num_steps, num_phases = step.numerator, step.denominator
+	if abs(float(step) * new_Fs - Fs) < 1e-9 * Fs and num_samples > num_phases:
+		windows = numpy.lib.stride_tricks.sliding_window_view(data, 2 * precision)
+		impulses = numpy.eye(2 * precision)
+		for phase in range(num_phases):
+			position = get_positions(numpy.array([phase]))[0]
+			first_window = int(math.floor(position)) - precision + 1
+			fraction = position - math.floor(position)
+			### (the weights of the taps are the interpolations of unit impulses)
+			weights = praat_pitch_helper.interpolate_sinc(impulses, numpy.arange(2 * precision), numpy.full(2 * precision, precision - 1 + fraction), precision)
+			first = 0 if first_window >= 0 else -(first_window // num_steps)
+			last = min((num_samples - 1 - phase) // num_phases, (len(windows) - 1 - first_window) // num_steps)
+			if last >= first:
+				resampled[phase + num_phases * first:phase + num_phases * last + 1:num_phases] = windows[first_window + num_steps * first:first_window + num_steps * last + 1:num_steps] @ weights
+				is_interpolated[phase + num_phases * first:phase + num_phases * last + 1:num_phases] = True
+
+	remaining = numpy.flatnonzero(~is_interpolated)
+	for block_start in range(0, len(remaining), FORMANT_RESAMPLE_BLOCK_SIZE):
+		indices = remaining[block_start:block_start + FORMANT_RESAMPLE_BLOCK_SIZE]
+		resampled[indices] = praat_pitch_helper.interpolate_sinc(data[None, :], numpy.zeros(len(indices), dtype=numpy.int64), get_positions(indices), precision)
+	return resampled, new_x1
+
+######################################################################
+######################################################################
+### Compute the linear prediction coefficients of many frames at once with
+##### Burg's method, exactly like Praat's NUMburg (which fits the all-pole
+##### model x[j] = a[1] x[j-1] + ... + a[m] x[j-m])
+#####
+#####
+### Arguments:
+##### frames			- 2-D array, each row holding the samples of one frame
+##### num_coefficients	- the order m of the model
+#####
+### Returns:
+##### coefficients		- array (frames x m) of the coefficients a[1] ... a[m]
+######################################################################
+######################################################################
+def burg_coefficients(frames, num_coefficients):
+	num_frames, n = frames.shape
+	coefficients = numpy.zeros((num_frames, num_coefficients))
+	previous = numpy.zeros((num_frames, num_coefficients))
+	b1 = frames[:, :-1].copy()
+	b2 = frames[:, 1:].copy()
+	### (like Praat, a frame without power, or whose recursion becomes
+	##### ill-conditioned, keeps the coefficients it has so far)
+	is_active = (frames * frames).sum(axis=1) > 0.0
+	for i in range(1, num_coefficients + 1):
+		num = numpy.einsum('ij,ij->i', b1[:, :n - i], b2[:, :n - i])
+		denum = numpy.einsum('ij,ij->i', b1[:, :n - i], b1[:, :n - i]) + numpy.einsum('ij,ij->i', b2[:, :n - i], b2[:, :n - i])
+		is_active &= denum > 0.0
+		if not is_active.any():
+			break
+		reflection = numpy.where(is_active, 2.0 * num / numpy.where(is_active, denum, 1.0), 0.0)
+		updated = previous[:, :i - 1] - reflection[:, None] * previous[:, i - 2::-1] if i > 1 else previous[:, :0]
+		coefficients[is_active, :i - 1] = updated[is_active]
+		coefficients[is_active, i - 1] = reflection[is_active]
+		if i < num_coefficients:
+			previous = coefficients.copy()
+			b1_next = b1[:, 1:n - i].copy()
+			b1[:, :n - i - 1] -= reflection[:, None] * b2[:, :n - i - 1]
+			b2[:, :n - i - 1] = b2[:, 1:n - i] - reflection[:, None] * b1_next
+	return coefficients
+
+######################################################################
+######################################################################
+### Find the formants of many frames at once from their linear prediction
+##### coefficients, like Praat: the roots of the polynomial
+##### z^m - a[1] z^(m-1) - ... - a[m] (the eigenvalues of its companion
+##### matrix, polished by Newton's method and reflected into the unit
+##### circle) above the real axis, within the safety margin
+#####
+#####
+### Arguments:
+##### coefficients		- array (frames x m) of the coefficients (see burg_coefficients)
+##### nyquist			- the Nyquist frequency of the frames [Hz]
+##### max_num_formants	- the number of formant columns of the results
+##### safety_margin		- see FORMANT_SAFETY_MARGIN
+#####
+### Returns:
+##### frequencies		- array (frames x max_num_formants) of the formant
+#####						frequencies, in increasing order [Hz] (NaN if absent)
+##### bandwidths		- array (frames x max_num_formants) of the bandwidths [Hz]
+##### num_formants		- the number of formants of each frame
+######################################################################
+######################################################################
+def get_formants_from_coefficients(coefficients, nyquist, max_num_formants, safety_margin=FORMANT_SAFETY_MARGIN):
+	num_frames, order = coefficients.shape
+	companion = numpy.zeros((num_frames, order, order))
+	companion[:, 0, :] = coefficients
+	companion[:, numpy.arange(1, order), numpy.arange(order - 1)] = 1.0
+	roots = numpy.linalg.eigvals(companion).astype(numpy.complex128)
+
+	### Polish the roots above the real axis (their conjugates are mirrored),
+	##### stopping each root where its polynomial value stops decreasing
+	polynomial = numpy.concatenate((numpy.ones((num_frames, 1)), -coefficients), axis=1)
+	polynomial = numpy.repeat(polynomial, order, axis=0)
+	roots = roots.reshape(-1)
+	best_roots = roots.copy()
+	smallest = numpy.full(len(roots), numpy.inf)
+	is_active = numpy.isfinite(roots) & (roots.imag > 0.0)
+	for iteration in range(FORMANT_ROOT_MAX_ITERATIONS):
+		if not is_active.any():
+			break
+		value = numpy.zeros(len(roots), dtype=numpy.complex128)
+		derivative = numpy.zeros(len(roots), dtype=numpy.complex128)
+		for coefficient_index in range(order + 1):
+			derivative = derivative * roots + value
+			value = value * roots + polynomial[:, coefficient_index]
+		magnitude = numpy.abs(value)
+		is_worse = (magnitude > smallest) | (numpy.abs(magnitude - smallest) < numpy.finfo(numpy.float64).eps / 2.0)
+		roots = numpy.where(is_active & is_worse, best_roots, roots)
+		is_active &= ~is_worse
+		smallest = numpy.where(is_active, magnitude, smallest)
+		best_roots = numpy.where(is_active, roots, best_roots)
+		is_active &= derivative != 0.0
+		with numpy.errstate(divide='ignore', invalid='ignore'):
+			roots = numpy.where(is_active, roots - value / derivative, roots)
+	roots = roots.reshape(num_frames, order)
+	with numpy.errstate(divide='ignore', invalid='ignore'):
+		roots = numpy.where(numpy.abs(roots) > 1.0, 1.0 / numpy.conj(roots), roots)
+
+	frequencies = numpy.abs(numpy.arctan2(roots.imag, roots.real)) * nyquist / numpy.pi
+	is_formant = (roots.imag >= 0.0) & (frequencies >= safety_margin) & (frequencies <= nyquist - safety_margin)
+	with numpy.errstate(divide='ignore'):
+		bandwidths = -numpy.log(roots.real * roots.real + roots.imag * roots.imag) * nyquist / numpy.pi
+	frequencies = numpy.where(is_formant, frequencies, numpy.inf)
+	order_by_frequency = numpy.argsort(frequencies, axis=1, kind='stable')[:, :max_num_formants]
+	frequencies = numpy.take_along_axis(frequencies, order_by_frequency, axis=1)
+	bandwidths = numpy.take_along_axis(bandwidths, order_by_frequency, axis=1)
+	is_formant = numpy.isfinite(frequencies)
+	return numpy.where(is_formant, frequencies, numpy.nan), numpy.where(is_formant, bandwidths, numpy.nan), is_formant.sum(axis=1)
+
+######################################################################
+######################################################################
+### Compute the formants of audio data exactly like Praat's
+##### "Sound: To Formant (burg)..."
+#####
+##### Like Praat, the data is resampled to twice the maximum formant
+##### frequency and pre-emphasized; each frame (twice the window length long)
+##### is multiplied by a Gaussian window, its linear prediction coefficients
+##### (twice as many as formants) are computed with Burg's method, and the
+##### roots of their polynomial are the formants. The frames are analyzed in
+##### blocks, and the coefficients and roots of all frames of a block are
+##### computed at once.
+#####
+#####
+### Arguments:
+##### data				- the (mono) audio data (in Pascal, i.e. -1...1 for
+#####						full scale, since the intensities depend on it)
+##### Fs				- the sample rate of the data
+##### time_step			- the time step [s] (0 means window_length / 4)
+##### max_number_of_formants - the number of formants to look for (the
+#####						number of coefficients is twice this, rounded)
+##### max_formant_frequency - the ceiling of the formant search range [Hz]
+##### window_length		- the effective window length [s] (the Gaussian
+#####						window is twice as long)
+##### pre_emphasis_frequency - the frequency above which the spectrum is
+#####						boosted by 6 dB per octave [Hz]
+##### start_time		- the time of the start of the data [s] (the first
+#####						sample lies half a sample period later, like in Praat)
+##### block_size		- the number of frames analyzed at once
+#####
+### Returns:
+##### times				- the time of each frame [s]
+##### frequencies		- array (frames x formants) of the formant frequencies
+#####						of each frame, in increasing order [Hz] (NaN if absent)
+##### bandwidths		- array (frames x formants) of the formant bandwidths [Hz]
+##### intensities		- the intensity (the largest squared sample) of each
+#####						frame [Pa^2]
+##### num_formants		- the number of formants of each frame
+######################################################################
+######################################################################
+def compute_praat_formants(data, Fs, time_step=0.0, max_number_of_formants=5, max_formant_frequency=5500., window_length=0.025, pre_emphasis_frequency=50., start_time=0.0, block_size=FORMANT_BLOCK_SIZE):
+	num_coefficients = int(math.floor(2.0 * max_number_of_formants + 0.5))
+	max_num_formants = (num_coefficients + 1) // 2
+	nyquist = 0.5 * Fs
+	if max_formant_frequency <= 0.0 or abs(max_formant_frequency / nyquist - 1.0) < 1e-12:
+		data = numpy.array(data, dtype=numpy.float64)
+		x1 = start_time + 0.5 / Fs
+	else:
+		data, x1 = resample(data, Fs, 2.0 * max_formant_frequency, start_time=start_time)
+		Fs = 2.0 * max_formant_frequency
+	dx = 1. / Fs
+	nx = len(data)
+	duration = nx * dx
+	if time_step <= 0.0:
+		time_step = window_length / 4.0
+
+	### Frames (Praat's arithmetic, since the frames are rounded to samples)
+	window_duration = 2.0 * window_length
+	num_frames = 1 + int(math.floor((duration - window_duration) / time_step))
+	nsamp_window = int(math.floor(window_duration / dx))
+	half_nsamp_window = nsamp_window // 2
+	if nsamp_window < num_coefficients + 1:
+		raise Exception("the analysis window (" + str(window_length) + " s) is too short for " + str(max_number_of_formants) + " formants at a sample rate of " + str(Fs) + " Hz")
+	t1 = x1 + 0.5 * (duration - dx - (num_frames - 1) * time_step)
+	if num_frames < 1:
+		num_frames = 1
+		t1 = x1 + 0.5 * duration
+		nsamp_window = nx
+	times = t1 + numpy.arange(num_frames) * time_step
+
+	### Pre-emphasis
+	if pre_emphasis_frequency < 0.5 / dx:
+		data[1:] -= math.exp(-2.0 * math.pi * pre_emphasis_frequency * dx) * data[:-1]
+
+	### The Gaussian window
+	imid = 0.5 * (nsamp_window + 1)
+	edge = math.exp(-12.0)
+	window = (numpy.exp(-48.0 * (numpy.arange(1, nsamp_window + 1) - imid) ** 2 / (nsamp_window + 1) / (nsamp_window + 1)) - edge) / (1.0 - edge)
+
+	### (zeros after the data, for frames beyond its end)
+	padded = numpy.concatenate((data, numpy.zeros(nsamp_window)))
+	frequencies = numpy.full((num_frames, max_num_formants), numpy.nan)
+	bandwidths = numpy.full((num_frames, max_num_formants), numpy.nan)
+	intensities = numpy.zeros(num_frames)
+	num_formants = numpy.zeros(num_frames, dtype=numpy.int64)
+	offsets = numpy.arange(nsamp_window)
+	for block_start in range(0, num_frames, block_size):
+		block_end = min(block_start + block_size, num_frames)
+		left_samples = numpy.floor((times[block_start:block_end] - x1) / dx).astype(numpy.int64)
+		### (like Praat, a frame starts at the first sample at the latest)
+		start_samples = numpy.maximum(left_samples + 1 - half_nsamp_window, 0)
+		end_samples = numpy.minimum(left_samples + half_nsamp_window, nx - 1)
+		frames = padded[start_samples[:, None] + offsets]
+
+		### The intensity: the largest squared sample of the centre of the frame
+		is_within = start_samples[:, None] + offsets <= end_samples[:, None]
+		intensities[block_start:block_end] = numpy.where(is_within, frames * frames, 0.0).max(axis=1)
+		is_analyzed = intensities[block_start:block_end] > 0.0
+		if not is_analyzed.any():
+			continue
+
+		coefficients = burg_coefficients(frames[is_analyzed] * window, num_coefficients)
+		block_frequencies, block_bandwidths, block_num_formants = get_formants_from_coefficients(coefficients, 0.5 / dx, max_num_formants)
+		analyzed_indices = block_start + numpy.flatnonzero(is_analyzed)
+		frequencies[analyzed_indices] = block_frequencies
+		bandwidths[analyzed_indices] = block_bandwidths
+		num_formants[analyzed_indices] = block_num_formants
+	return times, frequencies, bandwidths, intensities, num_formants
+
+######################################################################
+######################################################################
+### Calculate the formants of a whole .wav file in this process, with the
+##### results of praatUtil.calculateFormants (the data of a Praat Formant,
+##### like praat_binary_helper.read_binary_formant)
+#####
+#####
+### Arguments:
+##### wav_file_path		- the full path of the .wav file
+##### time_step ... pre_emphasis_frequency - see compute_praat_formants
+#####
+### Returns:
+##### dict				- xmin, xmax, nx, dx, x1 (the time of the first frame),
+#####						maxnFormants, intensities (of the frames) and formants
+#####						(per frame, an array of one (frequency, bandwidth) row
+#####						per formant)
+######################################################################
+######################################################################
+def calculate_formants(wav_file_path, time_step=0.0, max_number_of_formants=5, max_formant_frequency=5500., window_length=0.025, pre_emphasis_frequency=50.):
+	with wav_file_helper.WavFile(wav_file_path) as wav_file:
+		sample_rate = wav_file.sample_rate
+		data = audio_file_helper.get_mono_data(wav_file) / audio_file_helper.get_full_scale(wav_file.bit_depth)
+	times, frequencies, bandwidths, intensities, num_formants = compute_praat_formants(data, sample_rate,
+																						time_step=time_step,
+																						max_number_of_formants=max_number_of_formants,
+																						max_formant_frequency=max_formant_frequency,
+																						window_length=window_length,
+																						pre_emphasis_frequency=pre_emphasis_frequency)
+	return {
+		'xmin':0.0,
+		'xmax':len(data) / float(sample_rate),
+		'nx':len(times),
+		'dx':time_step if time_step > 0.0 else window_length / 4.0,
+		'x1':times[0],
+		'maxnFormants':frequencies.shape[1],
+		'intensities':intensities,
+		'formants':[numpy.stack((frequencies[frame_index, :count], bandwidths[frame_index, :count]), axis=1) for frame_index, count in enumerate(num_formants)],
+	}
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python3
+#%############################################################
+#%Regular package imports here
+#%############################################################
+import math
+import numpy
+#%############################################################
+#% Local file imports here
+#%############################################################
+import audio_file_helper
+import praat_pitch_helper
+import praatUtil
+import wav_file_helper
+
+######################################################################
+# constants
+######################################################################
+
+### Length of the analysis window, and the default time step, in periods of
+##### the minimum pitch (Praat's "To Intensity...")
+INTENSITY_WINDOW_PERIODS = 6.4
+INTENSITY_TIME_STEP_PERIODS = 0.8
+
+### Reference power of the intensities (the square of 20 micropascal) [Pa^2]
+INTENSITY_REFERENCE_POWER = 4e-10
+
+### Intensity of a frame without power [dB] (like Praat)
+INTENSITY_SILENCE_DB = -300.0
+
+### Number of frames analyzed at once
+INTENSITY_BLOCK_SIZE = 256
+
+######################################################################
+######################################################################
+### Compute the modified Bessel function of order zero with the polynomial
+##### approximations Praat uses (NUMbessel_i0_f: Abramowitz & Stegun 9.8.1
+##### and 9.8.2, accurate to about 2e-7)
+#####
+#####
+### Arguments:
+##### x					- array of arguments
+#####
+### Returns:
+##### values			- I0(x) for each argument
+######################################################################
+######################################################################
+def bessel_i0(x):
+	x = numpy.abs(numpy.asarray(x, dtype=numpy.float64))
+	t = (x / 3.75) ** 2
+	small = 1.0 + t * (3.5156229 + t * (3.0899424 + t * (1.2067492 + t * (0.2659732 + t * (0.0360768 + t * 0.0045813)))))
+	with numpy.errstate(divide='ignore', over='ignore', invalid='ignore'):
+		t = 3.75 / x
+		large = numpy.exp(x) / numpy.sqrt(x) * (0.39894228 + t * (0.01328592 + t * (0.00225319 + t * (-0.00157565 + t * (0.00916281 + t * (-0.02057706 + t * (0.02635537 + t * (-0.01647633 + t * 0.00392377))))))))
+	return numpy.where(x < 3.75, small, large)
+
+######################################################################
+######################################################################
+### Compute the intensity of audio data exactly like Praat's
+##### "Sound: To Intensity..."
+#####
+##### Like Praat, each frame is the mean square of the samples within
+##### 3.2 periods of the minimum pitch to each side of the frame (the sample
+##### nearest to the frame time), weighted by a Kaiser window (and clipped to
+##### the data), after subtracting their (unweighted) mean. The means are
+##### sliding-window sums of a running sum of the data, and the weighted sums
+##### of all frames of a block are computed at once (so the work grows
+##### linearly with the duration, by the window length over the time step).
+##### Multi-channel data is analyzed like Praat: the mean square of all
+##### channels.
+#####
+#####
+### Arguments:
+##### data				- the audio data (in Pascal, i.e. -1...1 for full scale),
+#####						shape (samples,) or (samples, channels)
+##### Fs				- the sample rate of the data
+##### min_pitch			- the minimum pitch [Hz] (sets the window length)
+##### time_step			- the time step [s] (0 means 0.8 / min_pitch)
+##### subtract_mean		- whether the mean of each window is subtracted
+##### start_time		- the time of the start of the data [s] (the first
+#####						sample lies half a sample period later, like in Praat)
+##### block_size		- the number of frames analyzed at once
+#####
+### Returns:
+##### times				- the time of each frame [s]
+##### intensities		- the intensity of each frame [dB re 20 micropascal]
+######################################################################
+######################################################################
+def compute_praat_intensity(data, Fs, min_pitch=100., time_step=0.0, subtract_mean=True, start_time=0.0, block_size=INTENSITY_BLOCK_SIZE):
+	data = numpy.asarray(data, dtype=numpy.float64)
+	if data.ndim == 1:
+		data = data[:, None]
+	nx, num_channels = data.shape
+	if min_pitch <= 0.0:
+		raise Exception("the minimum pitch (" + str(min_pitch) + " Hz) should be positive")
+	if time_step <= 0.0:
+		time_step = INTENSITY_TIME_STEP_PERIODS / min_pitch
+	dx = 1. / Fs
+	duration = dx * nx
+	window_duration = INTENSITY_WINDOW_PERIODS / min_pitch
+	if window_duration > duration:
+		raise Exception("the sound is too short (" + str(duration) + " s) for a minimum pitch of " + str(min_pitch) + " Hz (the window is " + str(window_duration) + " s long)")
+	half_window_duration = 0.5 * window_duration
+	half_window_samples = int(math.floor(half_window_duration / dx))
+
+	### The Kaiser window
+	window_x = numpy.arange(-half_window_samples, half_window_samples + 1) * dx / half_window_duration
+	root = 1.0 - window_x * window_x
+	window = numpy.where(root <= 0.0, 0.0, bessel_i0((2.0 * numpy.pi * numpy.pi + 0.5) * numpy.sqrt(numpy.maximum(root, 0.0))))
+
+	### Time sampling (Praat's Sampled_shortTermAnalysis)
+	num_frames = int(math.floor((duration - window_duration) / time_step)) + 1
+	x1 = start_time + 0.5 * dx
+	t1 = x1 - 0.5 * dx + 0.5 * duration - 0.5 * num_frames * time_step + 0.5 * time_step
+	times = t1 + numpy.arange(num_frames) * time_step
+
+	### (zeros around the data, for windows beyond its edges, and the running
+	##### sum of each channel, for the means)
+	padded = numpy.concatenate((numpy.zeros((half_window_samples, num_channels)), data, numpy.zeros((half_window_samples, num_channels))))
+	running_sums = numpy.concatenate((numpy.zeros((1, num_channels)), numpy.cumsum(data, axis=0)))
+	offsets = numpy.arange(-half_window_samples, half_window_samples + 1)
+	intensities = numpy.empty(num_frames)
+	for block_start in range(0, num_frames, block_size):
+		block_end = min(block_start + block_size, num_frames)
+		mid_samples = numpy.floor((times[block_start:block_end] - x1) / dx + 1.5).astype(numpy.int64) - 1
+		left_samples = numpy.maximum(mid_samples - half_window_samples, 0)
+		right_samples = numpy.minimum(mid_samples + half_window_samples, nx - 1)
+		indices = mid_samples[:, None] + offsets
+		weights = numpy.where((indices >= left_samples[:, None]) & (indices <= right_samples[:, None]), window, 0.0)
+		sum_xw = numpy.zeros(block_end - block_start)
+		for channel in range(num_channels):
+			amplitudes = padded[indices + half_window_samples, channel]
+			if subtract_mean:
+				amplitudes = amplitudes - ((running_sums[right_samples + 1, channel] - running_sums[left_samples, channel]) / (right_samples - left_samples + 1))[:, None]
+			sum_xw += numpy.einsum('ij,ij,ij->i', amplitudes, amplitudes, weights)
+		intensity = sum_xw / (num_channels * weights.sum(axis=1)) / INTENSITY_REFERENCE_POWER
+		with numpy.errstate(divide='ignore'):
+			intensities[block_start:block_end] = numpy.where(intensity < 1e-30, INTENSITY_SILENCE_DB, 10.0 * numpy.log10(intensity))
+	return times, intensities
+
+######################################################################
+######################################################################
+### Calculate the intensity of (a part of) a .wav file in this process,
+##### with the results of praatUtil.calculateIntensity (the IntensityTier
+##### of all frames, see compute_praat_intensity)
+#####
+#####
+### Arguments:
+##### wav_file_path		- the full path of the .wav file
+##### start_time		- the beginning of the part [s]
+##### end_time			- the end of the part [s] (-1 means "end of the file")
+##### min_pitch ... subtract_mean - see compute_praat_intensity
+#####
+### Returns:
+##### times				- the time of each frame [s]
+##### intensities		- the intensity of each frame [dB]
+######################################################################
+######################################################################
+def calculate_intensity_tier(wav_file_path, start_time=0.0, end_time=-1, min_pitch=100., time_step=0.0, subtract_mean=True):
+	with wav_file_helper.WavFile(wav_file_path) as wav_file:
+		sample_rate = wav_file.sample_rate
+		start_frame, end_frame = praat_pitch_helper.get_praat_part_frames(sample_rate, wav_file.num_frames, start_time, end_time)
+		read_start = min(max(start_frame, 0), wav_file.num_frames)
+		read_end = min(max(end_frame, read_start), wav_file.num_frames)
+		data = audio_file_helper.get_channel_data(wav_file, read_start, read_end)
+	### (zeros before and after the file)
+	num_zeros_before = min(max(-start_frame, 0), end_frame - start_frame)
+	data = numpy.pad(data, ((num_zeros_before, end_frame - start_frame - num_zeros_before - len(data)), (0, 0)))
+	return compute_praat_intensity(data, sample_rate,
+									min_pitch=min_pitch,
+									time_step=time_step,
+									subtract_mean=subtract_mean,
+									start_time=start_frame * (1. / sample_rate))
+
+######################################################################
+######################################################################
+### Compare the intensity computed by calculate_intensity_tier with the
+##### one computed by Praat itself (praatUtil.calculateIntensity with
+##### global_values.intensity_engine 'praat', or an IntensityTier saved by
+##### Praat with the same parameters)
+#####
+##### Only frames which Praat finds louder than silence_threshold are
+##### compared (the intensity of (nearly) silent frames is dominated by
+##### rounding).
+#####
+#####
+### Arguments:
+##### wav_file_path		- the full path of the .wav file
+##### praat_intensity_tier_file_path - the IntensityTier saved by Praat
+##### start_time ... subtract_mean - see calculate_intensity_tier
+##### silence_threshold	- the lowest compared intensity [dB]
+#####
+### Returns:
+##### dict				- max_abs_dB_difference, mean_abs_dB_difference,
+#####						max_abs_time_difference [s], num_compared
+######################################################################
+######################################################################
+def compare_to_praat_intensity(wav_file_path, praat_intensity_tier_file_path, start_time=0.0, end_time=-1, min_pitch=100., time_step=0.0, subtract_mean=True, silence_threshold=0.0):
+	praat_times, praat_intensities = praatUtil.readIntensityTier(praat_intensity_tier_file_path)
+	times, intensities = calculate_intensity_tier(wav_file_path,
+													start_time=start_time,
+													end_time=end_time,
+													min_pitch=min_pitch,
+													time_step=time_step,
+													subtract_mean=subtract_mean)
+	if len(times) != len(praat_times):
+		raise Exception("the intensity has " + str(len(times)) + " frames, but the Praat intensity has " + str(len(praat_times)))
+
+	praat_intensities = numpy.asarray(praat_intensities, dtype=numpy.float64)
+	compared = praat_intensities >= silence_threshold
+	differences = numpy.abs(intensities[compared] - praat_intensities[compared])
+	return {
+		'max_abs_dB_difference':float(differences.max(initial=0.0)),
+		'mean_abs_dB_difference':float(differences.mean()) if len(differences) > 0 else 0.0,
+		'max_abs_time_difference':float(numpy.abs(times - numpy.asarray(praat_times, dtype=numpy.float64)).max(initial=0.0)),
+		'num_compared':int(numpy.count_nonzero(compared)),
+	}
@@ -0,0 +1,466 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python3
+#%############################################################
+#%Regular package imports here
+#%############################################################
+import math
+import numpy
+#%############################################################
+#% Local file imports here
+#%############################################################
+import audio_file_helper
+import wav_file_helper
+
+######################################################################
+# constants
+######################################################################
+
+### Maximum number of candidates per frame (including the unvoiced candidate),
+##### like the "To Pitch (ac)..." script of praatUtil.getPitchScript
+PITCH_MAX_CANDIDATES = 15
+
+### Depths of Praat's sin(x)/x interpolation of the autocorrelation: for the
+##### strength of the (parabolic) first estimate of a peak, and for refining
+##### a peak (Praat's NUM_PEAK_INTERPOLATE_SINC70 and ..._SINC700)
+PITCH_STRENGTH_INTERPOLATION_DEPTH = 30
+PITCH_SINC70_DEPTH = 70
+PITCH_SINC700_DEPTH = 700
+
+### Precision of the refined peak lags (in samples), and the maximum number
+##### of steps to refine them (like Praat's NUMminimize_brent)
+PITCH_PEAK_TOLERANCE = 1e-10
+PITCH_PEAK_MAX_ITERATIONS = 60
+
+### Number of frames whose autocorrelations are computed at once
+PITCH_BLOCK_SIZE = 256
+
+######################################################################
+######################################################################
+### Interpolate rows of an array at fractional positions exactly like
+##### Praat's NUMinterpolate_sinc (a sin(x)/x interpolation, tapered by a
+##### raised cosine, over at most max_depth samples to each side; nearest,
+##### linear or cubic interpolation close to the edges of the rows)
+#####
+#####
+### Arguments:
+##### y					- 2-D array, each row holding the values of one signal
+##### rows				- the row of each position
+##### x					- the (fractional, zero-based) positions
+##### max_depth			- the number of samples to each side of a position
+#####
+### Returns:
+##### values			- the interpolated value at each position
+######################################################################
+######################################################################
+def interpolate_sinc(y, rows, x, max_depth):
+	x = numpy.asarray(x, dtype=numpy.float64)
+	size = y.shape[1]
+	midleft = numpy.floor(x).astype(numpy.int64)
+	midright = midleft + 1
+	depth = numpy.minimum(numpy.minimum(max_depth, midright), size - 1 - midleft)
+	def values_at(index):
+		return y[rows, numpy.clip(index, 0, size - 1)]
+
+	### The tapered sin(x)/x kernel, to the left and to the right of each position
+	offsets = numpy.arange(max(int(depth.max(initial=0)), 1))
+	signs = numpy.where(offsets % 2 == 0, 1.0, -1.0)
+	result = numpy.zeros(len(x))
+	with numpy.errstate(divide='ignore', invalid='ignore'):
+		for phase, width, index in ((numpy.pi * (x - midleft), x - (midright - depth) + 1, midleft[:, None] - offsets),
+									(numpy.pi * (midright - x), (midleft + depth) - x + 1, midright[:, None] + offsets)):
+			angles = phase[:, None] + numpy.pi * offsets
+			kernel = 0.5 * numpy.sin(phase)[:, None] * signs / angles * (1.0 + numpy.cos(angles / width[:, None]))
+			result += numpy.where(offsets < depth[:, None], kernel * y[rows[:, None], numpy.clip(index, 0, size - 1)], 0.0).sum(axis=1)
+
+	### Close to the edges of the rows
+	left_value, right_value = values_at(midleft), values_at(midright)
+	left_slope = 0.5 * (right_value - values_at(midleft - 1))
+	right_slope = 0.5 * (values_at(midright + 1) - left_value)
+	fraction_left, fraction_right = x - midleft, midright - x
+	cubic = left_value * fraction_right + right_value * fraction_left - fraction_left * fraction_right * (0.5 * (right_slope - left_slope) + (fraction_left - 0.5) * (left_slope + right_slope - 2.0 * (right_value - left_value)))
+	result = numpy.where(depth == 2, cubic, result)
+	result = numpy.where(depth == 1, left_value + fraction_left * (right_value - left_value), result)
+	result = numpy.where(depth <= 0, values_at(numpy.floor(x + 0.5).astype(numpy.int64)), result)
+	result = numpy.where(x == midleft, left_value, result)
+	result = numpy.where(x < 0, values_at(numpy.zeros_like(midleft)), result)
+	result = numpy.where(x > size - 1, values_at(numpy.full_like(midleft, size - 1)), result)
+	return result
+
+######################################################################
+######################################################################
+### Find the maxima of the sin(x)/x interpolation (see interpolate_sinc)
+##### of rows of an array, each within one sample of a sample position,
+##### exactly like Praat's NUMimproveMaximum (Brent's minimization of the
+##### negative interpolation, with golden-section and parabolic steps), for
+##### all the maxima at once
+#####
+#####
+### Arguments:
+##### y					- 2-D array, each row holding the values of one signal
+##### rows				- the row of each maximum
+##### positions			- the (zero-based) sample position of each maximum
+##### max_depth			- see interpolate_sinc
+##### tolerance			- the absolute part of the precision of the positions
+#####						(in samples; the relative part is sqrt(epsilon))
+#####
+### Returns:
+##### x					- the fractional position of each maximum
+##### values			- the interpolated value of each maximum
+######################################################################
+######################################################################
+def improve_maxima(y, rows, positions, max_depth, tolerance=PITCH_PEAK_TOLERANCE):
+	golden = 1. - 0.5 * (math.sqrt(5.) - 1.)
+	### (the square root of the unit roundoff, like Praat)
+	sqrt_epsilon = math.sqrt(0.5 * numpy.finfo(numpy.float64).eps)
+	a = numpy.asarray(positions, dtype=numpy.float64) - 1.
+	b = a + 2.
+	x = a + golden * (b - a)
+	fx = -interpolate_sinc(y, rows, x, max_depth)
+	v, w, fv, fw = x, x, fx, fx
+	is_active = numpy.ones(len(x), dtype=bool)
+	for iteration in range(PITCH_PEAK_MAX_ITERATIONS):
+		middle = 0.5 * (a + b)
+		tolerance_x = sqrt_epsilon * numpy.abs(x) + tolerance / 3.
+		is_active &= numpy.abs(x - middle) + 0.5 * (b - a) > 2. * tolerance_x
+		if not is_active.any():
+			break
+
+		### A golden-section step, or a parabolic step (if it falls well within [a, b])
+		step = golden * numpy.where(x < middle, b - x, a - x)
+		r = (x - w) * (fx - fv)
+		q = (x - v) * (fx - fw)
+		p = (x - v) * q - (x - w) * r
+		q = 2. * (q - r)
+		p = numpy.where(q > 0., -p, p)
+		q = numpy.abs(q)
+		is_parabolic = (numpy.abs(x - w) >= tolerance_x) & (numpy.abs(p) < numpy.abs(step * q)) & (p > q * (a - x + 2. * tolerance_x)) & (p < q * (b - x - 2. * tolerance_x))
+		with numpy.errstate(divide='ignore', invalid='ignore'):
+			step = numpy.where(is_parabolic, p / q, step)
+		step = numpy.where(numpy.abs(step) < tolerance_x, numpy.where(step > 0., tolerance_x, -tolerance_x), step)
+		t = x + step
+		ft = fx.copy()
+		ft[is_active] = -interpolate_sinc(y, rows[is_active], t[is_active], max_depth)
+
+		### Reduce the range [a, b] around the best point so far
+		is_better = is_active & (ft <= fx)
+		is_worse = is_active & ~(ft <= fx)
+		is_below = t < x
+		a = numpy.where(is_better & ~is_below, x, numpy.where(is_worse & is_below, t, a))
+		b = numpy.where(is_better & is_below, x, numpy.where(is_worse & ~is_below, t, b))
+		is_second = is_worse & ((ft <= fw) | (w == x))
+		is_third = is_worse & ~is_second & ((ft <= fv) | (v == x) | (v == w))
+		v, fv = numpy.where(is_better | is_second, w, numpy.where(is_third, t, v)), numpy.where(is_better | is_second, fw, numpy.where(is_third, ft, fv))
+		w, fw = numpy.where(is_better, x, numpy.where(is_second, t, w)), numpy.where(is_better, fx, numpy.where(is_second, ft, fw))
+		x, fx = numpy.where(is_better, t, x), numpy.where(is_better, ft, fx)
+	return x, -fx
+
+######################################################################
+######################################################################
+### Find the most probable path through the pitch candidates of all frames
+##### (Praat's Pitch_pathFinder, a Viterbi search over the candidates of
+##### consecutive frames, vectorized over the candidates)
+#####
+#####
+### Arguments:
+##### frequencies		- array (frames x candidates) of candidate frequencies
+#####						[Hz] (0 is the unvoiced candidate)
+##### strengths			- array (frames x candidates) of candidate strengths
+##### num_candidates	- the number of candidates of each frame
+##### intensities		- the relative intensity (0...1) of each frame
+##### time_step			- the time step of the frames [s]
+##### ceiling			- the pitch ceiling [Hz]
+##### silence_threshold, voicing_threshold, octave_cost, octave_jump_cost,
+##### voiced_unvoiced_cost - see compute_praat_pitch
+#####
+### Returns:
+##### path				- the index of the chosen candidate of each frame
+######################################################################
+######################################################################
+def find_pitch_path(frequencies, strengths, num_candidates, intensities, time_step, ceiling, silence_threshold=0.03, voicing_threshold=0.45, octave_cost=0.01, octave_jump_cost=0.35, voiced_unvoiced_cost=0.14):
+	num_frames, max_candidates = frequencies.shape
+	### The costs of transitions are defined for a time step of 10 ms
+	time_step_correction = 0.01 / time_step
+	octave_jump_cost *= time_step_correction
+	voiced_unvoiced_cost *= time_step_correction
+
+	is_candidate = numpy.arange(max_candidates) < num_candidates[:, None]
+	is_voiced = (frequencies > 0.0) & (frequencies <= ceiling)
+	voiced_frequencies = numpy.where(is_voiced, frequencies, ceiling)
+	if silence_threshold <= 0:
+		unvoiced_strengths = numpy.zeros(num_frames)
+	else:
+		unvoiced_strengths = 2.0 - intensities / (silence_threshold / (1.0 + voicing_threshold))
+	unvoiced_strengths = voicing_threshold + numpy.maximum(unvoiced_strengths, 0.0)
+	delta = numpy.where(is_voiced, strengths - octave_cost * numpy.log2(ceiling / voiced_frequencies), unvoiced_strengths[:, None])
+	delta = numpy.where(is_candidate, delta, -numpy.inf)
+
+	psi = numpy.zeros((num_frames, max_candidates), dtype=numpy.int64)
+	candidates = numpy.arange(max_candidates)
+	for iframe in range(1, num_frames):
+		previous_voiced, current_voiced = is_voiced[iframe - 1][:, None], is_voiced[iframe][None, :]
+		octave_jumps = numpy.abs(numpy.log2(voiced_frequencies[iframe - 1][:, None] / voiced_frequencies[iframe][None, :]))
+		transition_costs = numpy.where(previous_voiced & current_voiced, octave_jump_cost * octave_jumps, numpy.where(previous_voiced != current_voiced, voiced_unvoiced_cost, 0.0))
+		values = delta[iframe - 1][:, None] - transition_costs + delta[iframe][None, :]
+		psi[iframe] = numpy.argmax(values, axis=0)
+		delta[iframe] = numpy.where(is_candidate[iframe], values[psi[iframe], candidates], -numpy.inf)
+
+	### Backtracking (from the most probable end of the path)
+	path = numpy.zeros(num_frames, dtype=numpy.int64)
+	if num_frames > 0:
+		place = numpy.argmax(delta[-1])
+		for iframe in range(num_frames - 1, -1, -1):
+			path[iframe] = place
+			place = psi[iframe, place]
+	return path
+
+######################################################################
+######################################################################
+### Compute the pitch of audio data exactly like Praat's
+##### "Sound: To Pitch (ac)..." (Boersma's autocorrelation method)
+#####
+##### Like Praat, each frame (3 periods of the pitch floor long, or 6 if
+##### very accurate) has its local mean subtracted and is multiplied by a
+##### Hanning window (or a Gaussian window, if very accurate); its
+##### autocorrelation (from the power spectrum of a power-of-two FFT) is
+##### divided by the autocorrelation of the window. The maxima of the
+##### autocorrelation are the candidates (the strongest, favouring high
+##### frequencies by the octave cost), refined by sin(x)/x interpolation,
+##### and the path through the candidates is found by find_pitch_path.
+##### The frames are analyzed in blocks, and the candidates of all frames
+##### of a block are found and refined at once.
+#####
+##### Like Praat, the channels of multi-channel audio are analyzed together:
+##### each channel has its own local mean, the local and global peaks are
+##### those of the loudest channel, and the power spectra of the channels
+##### are summed into one autocorrelation.
+#####
+#####
+### Arguments:
+##### data				- the audio data (in any units), of shape (samples,) or
+#####						(samples, channels)
+##### Fs				- the sample rate of the data
+##### time_step			- the time step [s] (0 means 0.75 / min_pitch)
+##### min_pitch			- the pitch floor [Hz]
+##### max_pitch			- the pitch ceiling [Hz]
+##### very_accurate		- whether the longer Gaussian window is used
+##### silence_threshold	- frames quieter than this (relative to the global
+#####						peak) are probably silent
+##### voicing_threshold	- the strength of the unvoiced candidate
+##### octave_cost		- how much high frequencies are favoured [per octave]
+##### octave_jump_cost	- how much frequency jumps are disfavoured [per octave]
+##### voiced_unvoiced_cost - how much voiced/unvoiced transitions are disfavoured
+##### max_candidates	- the maximum number of candidates per frame
+##### start_time		- the time of the start of the data [s] (the first
+#####						sample lies half a sample period later, like in Praat)
+##### block_size		- the number of frames analyzed at once
+#####
+### Returns:
+##### times				- the time of each frame [s]
+##### frequencies		- the pitch of each frame [Hz] (0 if unvoiced)
+##### strengths			- the strength (0...1) of the pitch of each frame
+######################################################################
+######################################################################
+def compute_praat_pitch(data, Fs, time_step=0.0, min_pitch=75., max_pitch=600., very_accurate=False, silence_threshold=0.03, voicing_threshold=0.45, octave_cost=0.01, octave_jump_cost=0.35, voiced_unvoiced_cost=0.14, max_candidates=PITCH_MAX_CANDIDATES, start_time=0.0, block_size=PITCH_BLOCK_SIZE):
+	data = numpy.asarray(data, dtype=numpy.float64)
+	if data.ndim == 1:
+		data = data[:, None]
+	dx = 1. / Fs
+	duration = dx * len(data)
+	periods_per_window = 3.0
+	if min_pitch < periods_per_window / duration:
+		raise Exception("the sound is too short (" + str(duration) + " s) for a pitch floor of " + str(min_pitch) + " Hz (" + str(periods_per_window) + " periods must fit)")
+	if time_step <= 0.0:
+		time_step = periods_per_window / min_pitch / 4.0
+	### (the Gaussian window is twice as long)
+	if very_accurate:
+		periods_per_window, interpolation_depth, refine_depth = 6.0, 0.25, PITCH_SINC700_DEPTH
+	else:
+		interpolation_depth, refine_depth = 0.5, PITCH_SINC70_DEPTH
+	ceiling = min(max_pitch, 0.5 / dx)
+	nsamp_period = int(math.floor(1.0 / dx / min_pitch))
+	half_nsamp_period = nsamp_period // 2 + 1
+
+	### Window length and lags
+	half_nsamp_window = int(math.floor(periods_per_window / min_pitch / dx)) // 2 - 1
+	if half_nsamp_window < 2:
+		raise Exception("the analysis window is too short: the pitch floor (" + str(min_pitch) + " Hz) is too high for a sample rate of " + str(Fs) + " Hz")
+	nsamp_window = half_nsamp_window * 2
+	maximum_lag = min(int(math.floor(nsamp_window / periods_per_window)) + 2, nsamp_window)
+	brent_ixmax = int(math.floor(nsamp_window * interpolation_depth))
+	lag_end = min(maximum_lag, brent_ixmax)
+
+	### Time sampling (Praat's Sampled_shortTermAnalysis)
+	num_frames = int(math.floor((duration - periods_per_window / min_pitch) / time_step)) + 1
+	### (with Praat's arithmetic, since the frames are rounded to samples)
+	x1 = start_time + 0.5 * dx
+	t1 = x1 - 0.5 * dx + 0.5 * duration - 0.5 * num_frames * time_step + 0.5 * time_step
+	times = t1 + numpy.arange(num_frames) * time_step
+
+	frequencies = numpy.zeros((num_frames, max_candidates))
+	strengths = numpy.zeros((num_frames, max_candidates))
+	num_candidates = numpy.ones(num_frames, dtype=numpy.int64)
+	intensities = numpy.zeros(num_frames)
+	global_peak = numpy.abs(data - data.mean(axis=0)).max()
+	if global_peak == 0.0:
+		return times, numpy.zeros(num_frames), numpy.zeros(num_frames)
+
+	### The window, and its normalized autocorrelation
+	nsamp_FFT = 1
+	while nsamp_FFT < nsamp_window * (1 + interpolation_depth):
+		nsamp_FFT *= 2
+	sample_indices = numpy.arange(1, nsamp_window + 1)
+	if very_accurate:
+		edge = math.exp(-12.)
+		phase = (sample_indices - 0.5 * (nsamp_window + 1)) / (nsamp_window + 1)
+		window = (numpy.exp(-48. * phase * phase) - edge) / (1. - edge)
+	else:
+		window = 0.5 - 0.5 * numpy.cos(sample_indices * 2 * math.pi / (nsamp_window + 1))
+	window_r = numpy.fft.irfft(numpy.square(numpy.abs(numpy.fft.rfft(window, nsamp_FFT))), nsamp_FFT)[:brent_ixmax + 1]
+	window_r = window_r / window_r[0]
+
+	### The local mean of each channel (over a longest period to both sides) and the window of each frame
+	left_samples = numpy.floor((times - x1) / dx).astype(numpy.int64)
+	cumulative = numpy.concatenate((numpy.zeros((1, data.shape[1])), numpy.cumsum(data, axis=0)))
+	local_means = (cumulative[numpy.clip(left_samples + nsamp_period + 1, 0, len(data))] - cumulative[numpy.clip(left_samples + 1 - nsamp_period, 0, len(data))]) / (2 * nsamp_period)
+	frame_starts = numpy.clip(left_samples + 1 - half_nsamp_window, 0, len(data) - nsamp_window)
+	### (of shape (frame starts, channels, nsamp_window))
+	frames = numpy.lib.stride_tricks.sliding_window_view(data, nsamp_window, axis=0)
+	peak_start = max(half_nsamp_window - half_nsamp_period, 0)
+	peak_end = min(half_nsamp_window + half_nsamp_period, nsamp_window)
+
+	for block_start in range(0, num_frames, block_size):
+		block_end = min(block_start + block_size, num_frames)
+		windowed = (frames[frame_starts[block_start:block_end]] - local_means[block_start:block_end, :, None]) * window
+		### The local peak (over half a longest period to both sides of the middle)
+		local_peaks = numpy.abs(windowed[:, :, peak_start:peak_end]).max(axis=(1, 2))
+		intensities[block_start:block_end] = numpy.minimum(local_peaks / global_peak, 1.0)
+
+		### The autocorrelation (the inverse FFT of the power spectrum, summed over
+		##### the channels), normalized and divided by that of the window, for the
+		##### lags -brent_ixmax...brent_ixmax
+		ac = numpy.fft.irfft(numpy.square(numpy.abs(numpy.fft.rfft(windowed, nsamp_FFT, axis=2))).sum(axis=1), nsamp_FFT, axis=1)[:, :brent_ixmax + 1]
+		with numpy.errstate(divide='ignore', invalid='ignore'):
+			r = ac / (ac[:, :1] * window_r)
+		r[:, 0] = 1.0
+		r = numpy.concatenate((r[:, :0:-1], r), axis=1)
+
+		### The maxima (not too unvoiced) of the autocorrelation of each (non-silent) frame
+		r_previous, r_middle, r_next = r[:, brent_ixmax + 1:brent_ixmax + lag_end - 1], r[:, brent_ixmax + 2:brent_ixmax + lag_end], r[:, brent_ixmax + 3:brent_ixmax + lag_end + 1]
+		is_maximum = (r_middle > 0.5 * voicing_threshold) & (r_middle > r_previous) & (r_middle >= r_next) & (local_peaks > 0.0)[:, None]
+		rows, columns = numpy.nonzero(is_maximum)
+		lags = columns + 2
+		dr = 0.5 * (r_next[rows, columns] - r_previous[rows, columns])
+		d2r = 2.0 * r_middle[rows, columns] - r_previous[rows, columns] - r_next[rows, columns]
+		maximum_frequencies = 1.0 / dx / (lags + dr / d2r)
+		maximum_strengths = interpolate_sinc(r, rows, 1.0 / dx / maximum_frequencies + brent_ixmax, PITCH_STRENGTH_INTERPOLATION_DEPTH)
+		maximum_strengths = numpy.where(maximum_strengths > 1.0, 1.0 / maximum_strengths, maximum_strengths)
+
+		### The candidates: all maxima of a frame (in the order of their lags), or
+		##### (if there are too many) the strongest, favouring high frequencies
+		counts = numpy.bincount(rows, minlength=block_end - block_start)
+		row_starts = numpy.concatenate(([0], numpy.cumsum(counts)[:-1]))
+		places = numpy.arange(len(rows)) - row_starts[rows] + 1
+		is_kept = counts[rows] < max_candidates
+		local_strengths = maximum_strengths - octave_cost * numpy.log2(min_pitch / maximum_frequencies)
+		for row in numpy.nonzero(counts >= max_candidates)[0]:
+			kept = list(range(row_starts[row], row_starts[row] + max_candidates - 1))
+			for index in range(row_starts[row] + max_candidates - 1, row_starts[row] + counts[row]):
+				weakest = int(numpy.argmin(local_strengths[kept]))
+				if local_strengths[index] > local_strengths[kept[weakest]]:
+					kept[weakest] = index
+			is_kept[kept] = True
+			places[kept] = numpy.arange(1, max_candidates)
+		rows, lags, places, maximum_frequencies = rows[is_kept], lags[is_kept], places[is_kept], maximum_frequencies[is_kept]
+
+		### Refine the candidates (by maximizing the sin(x)/x interpolation)
+		refine_depths = numpy.where(maximum_frequencies > 0.3 / dx, PITCH_SINC700_DEPTH, refine_depth)
+		for depth in numpy.unique(refine_depths):
+			is_depth = refine_depths == depth
+			x, values = improve_maxima(r, rows[is_depth], lags[is_depth] + brent_ixmax, int(depth))
+			frequencies[block_start + rows[is_depth], places[is_depth]] = 1.0 / dx / (x - brent_ixmax)
+			strengths[block_start + rows[is_depth], places[is_depth]] = numpy.where(values > 1.0, 1.0 / values, values)
+		num_candidates[block_start:block_end] = 1 + numpy.minimum(counts, max_candidates - 1)
+
+	path = find_pitch_path(frequencies, strengths, num_candidates, intensities, time_step, ceiling,
+							silence_threshold=silence_threshold,
+							voicing_threshold=voicing_threshold,
+							octave_cost=octave_cost,
+							octave_jump_cost=octave_jump_cost,
+							voiced_unvoiced_cost=voiced_unvoiced_cost)
+	frame_indices = numpy.arange(num_frames)
+	pitches = frequencies[frame_indices, path]
+	is_voiced = (pitches > 0.0) & (pitches <= ceiling)
+	return times, numpy.where(is_voiced, pitches, 0.0), numpy.where(is_voiced, strengths[frame_indices, path], 0.0)
+
+######################################################################
+######################################################################
+### Get the frames of a .wav file in the part Praat extracts
+##### ("Extract part..." of praatUtil.getExtractPartScript: every sample
+##### within the part, with zeros outside of the file)
+#####
+#####
+### Arguments:
+##### sample_rate		- the sample rate of the .wav file
+##### num_frames		- the number of frames of the .wav file
+##### start_time		- the beginning of the part [s]
+##### end_time			- the end of the part [s] (-1 means "end of the file")
+#####
+### Returns:
+##### start_frame		- the first frame of the part (may be negative)
+##### end_frame			- the frame after the part (may be beyond the file)
+######################################################################
+######################################################################
+def get_praat_part_frames(sample_rate, num_frames, start_time=0.0, end_time=-1):
+	if start_time <= 0 and end_time == -1:
+		return 0, num_frames
+	dx = 1. / sample_rate
+	### (the script passes the times with 7 decimals)
+	start_time = float('{:.7f}'.format(start_time)) if start_time > 0 else 0.0
+	end_time = float('{:.7f}'.format(end_time)) if end_time != -1 else num_frames * dx
+	start_frame = int(math.ceil((start_time - 0.5 * dx) / dx))
+	end_frame = int(math.floor((end_time - 0.5 * dx) / dx)) + 1
+	if end_frame <= start_frame:
+		raise Exception("the part from " + str(start_time) + " s to " + str(end_time) + " s contains no samples")
+	return start_frame, end_frame
+
+######################################################################
+######################################################################
+### Calculate the pitch of (a part of) a .wav file in this process, with
+##### the results of praatUtil.calculatePitch (the PitchTier of the voiced
+##### frames, see compute_praat_pitch)
+#####
+#####
+### Arguments:
+##### wav_file_path		- the full path of the .wav file
+##### start_time		- the beginning of the part [s]
+##### end_time			- the end of the part [s] (-1 means "end of the file")
+##### time_step ... voiced_unvoiced_cost - see compute_praat_pitch
+#####
+### Returns:
+##### times				- the time of each voiced frame [s]
+##### pitches			- the pitch of each voiced frame [Hz]
+######################################################################
+######################################################################
+def calculate_pitch_tier(wav_file_path, start_time=0.0, end_time=-1, time_step=0.0, min_pitch=75., max_pitch=600., very_accurate=False, silence_threshold=0.03, voicing_threshold=0.45, octave_cost=0.01, octave_jump_cost=0.35, voiced_unvoiced_cost=0.14):
+	with wav_file_helper.WavFile(wav_file_path) as wav_file:
+		sample_rate = wav_file.sample_rate
+		start_frame, end_frame = get_praat_part_frames(sample_rate, wav_file.num_frames, start_time, end_time)
+		read_start = min(max(start_frame, 0), wav_file.num_frames)
+		read_end = min(max(end_frame, read_start), wav_file.num_frames)
+		data = audio_file_helper.get_channel_data(wav_file, read_start, read_end)
+	### (zeros before and after the file)
+	num_zeros_before = min(max(-start_frame, 0), end_frame - start_frame)
+	data = numpy.pad(data, ((num_zeros_before, end_frame - start_frame - num_zeros_before - len(data)), (0, 0)))
+	times, pitches, _ = compute_praat_pitch(data, sample_rate,
+											time_step=time_step,
+											min_pitch=min_pitch,
+											max_pitch=max_pitch,
+											very_accurate=very_accurate,
+											silence_threshold=silence_threshold,
+											voicing_threshold=voicing_threshold,
+											octave_cost=octave_cost,
+											octave_jump_cost=octave_jump_cost,
+											voiced_unvoiced_cost=voiced_unvoiced_cost,
+											start_time=start_frame * (1. / sample_rate))
+	is_voiced = pitches > 0.0
+	return times[is_voiced], pitches[is_voiced]
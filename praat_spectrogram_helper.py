@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python3
+#%############################################################
+#%Regular package imports here
+#%############################################################
+import math
+import numpy
+#%############################################################
+#% Local file imports here
+#%############################################################
+import praatUtil
+import spectrogram_helper
+
+######################################################################
+# constants
+######################################################################
+
+### Reference power of Praat's dB scale ((2e-5 Pa)^2, i.e. 0 dB SPL)
+PRAAT_REFERENCE_POWER = 4.0e-10
+
+### How finely Praat samples time and frequency at most, relative to the
+##### effective time and frequency widths of the analysis window
+PRAAT_MAXIMUM_TIME_OVERSAMPLING = 8.0
+PRAAT_MAXIMUM_FREQUENCY_OVERSAMPLING = 8.0
+
+######################################################################
+######################################################################
+### Compute the spectrogram of audio data exactly like Praat's
+##### "Sound: To Spectrogram..." (with a Gaussian window)
+#####
+##### Like Praat, the physical window is twice the effective window length,
+##### frames are centred on the (evenly spaced) frame times, the power
+##### spectrum of each frame is computed by a power-of-two FFT, and runs of
+##### FFT bins are summed into bands of (about) frequency_step Hz, normalized
+##### by the window energy and the number of bins per band (power spectral
+##### density). The frames are gathered, windowed and transformed in blocks
+##### (see spectrogram_helper.make_transform), so only the bins up to
+##### max_frequency are computed.
+#####
+#####
+### Arguments:
+##### data				- the (mono) audio data, in Praat's units (full scale = 1)
+##### Fs				- the sample rate of the data
+##### window_length		- the effective window length [s] (Praat's "window length")
+##### max_frequency		- the highest frequency [Hz] (0 or above Nyquist means Nyquist)
+##### time_step			- the (minimum) time step [s]
+##### frequency_step	- the (minimum) frequency step [Hz]
+##### start_time		- the time of the start of the data [s] (the first
+#####						sample lies half a sample period later, like in Praat)
+##### block_size		- the number of frames per batched FFT
+#####
+### Returns:
+##### power				- (float32) power spectral density, array of shape (len(freqs), len(times))
+##### freqs				- the (centre) frequency of each row [Hz]
+##### times				- the (centre) time of each column [s]
+######################################################################
+######################################################################
+def compute_praat_spectrogram(data, Fs, window_length=0.005, max_frequency=5000., time_step=0.002, frequency_step=20., start_time=0.0, block_size=spectrogram_helper.STFT_BLOCK_SIZE):
+	data = numpy.asarray(data, dtype=numpy.float32)
+	dx = 1. / Fs
+	nyquist = 0.5 * Fs
+	physical_window_length = 2. * window_length
+	effective_time_width = window_length / math.sqrt(math.pi)
+	effective_frequency_width = 1. / effective_time_width
+	time_step = max(time_step, effective_time_width / PRAAT_MAXIMUM_TIME_OVERSAMPLING)
+	frequency_step = max(frequency_step, effective_frequency_width / PRAAT_MAXIMUM_FREQUENCY_OVERSAMPLING)
+	duration = dx * len(data)
+
+	### Time sampling (Praat's Sampled_shortTermAnalysis)
+	nsamp_window = int(math.floor(physical_window_length / dx))
+	half_nsamp_window = nsamp_window // 2 - 1
+	nsamp_window = half_nsamp_window * 2
+	if nsamp_window < 1:
+		raise Exception("the analysis window is too short: less than two samples")
+	if physical_window_length > duration:
+		raise Exception("the sound is too short (" + str(duration) + " s) for a window of " + str(physical_window_length) + " s (twice the window length)")
+	num_times = int(math.floor((duration - physical_window_length) / time_step)) + 1
+	t1 = 0.5 * duration - 0.5 * num_times * time_step + 0.5 * time_step
+
+	### Frequency sampling (a power-of-two FFT, whose bins are summed into bands)
+	if max_frequency <= 0 or max_frequency > nyquist:
+		max_frequency = nyquist
+	num_freqs = int(math.floor(max_frequency / frequency_step))
+	if num_freqs < 1:
+		raise Exception("the maximum frequency (" + str(max_frequency) + " Hz) is below the frequency step (" + str(frequency_step) + " Hz)")
+	nsamp_FFT = 1
+	while nsamp_FFT < nsamp_window or nsamp_FFT < 2 * num_freqs * (nyquist / max_frequency):
+		nsamp_FFT *= 2
+	bin_width_samples = max(int(math.floor(frequency_step * dx * nsamp_FFT)), 1)
+	bin_width_hertz = 1. / (dx * nsamp_FFT)
+	frequency_step = bin_width_samples * bin_width_hertz
+	num_freqs = int(math.floor(max_frequency / frequency_step))
+	if num_freqs < 1:
+		raise Exception("the maximum frequency (" + str(max_frequency) + " Hz) is below the frequency step (" + str(frequency_step) + " Hz)")
+
+	### Praat's Gaussian window (which reaches zero at its edges)
+	edge = math.exp(-12.)
+	phase = (numpy.arange(1, nsamp_window + 1) - 0.5 * (nsamp_window + 1)) / (physical_window_length / dx)
+	window = ((numpy.exp(-48. * phase * phase) - edge) / (1. - edge)).astype(numpy.float32)
+	power_scale = numpy.float32(1. / float(numpy.dot(window.astype(numpy.float64), window)) / bin_width_samples)
+
+	### The first sample of each frame (the frame time lies between the two middle samples)
+	frame_times = t1 + numpy.arange(num_times) * time_step
+	frame_starts = numpy.floor((frame_times - 0.5 * dx) / dx).astype(numpy.int64) + 1 - half_nsamp_window
+	frame_starts = numpy.clip(frame_starts, 0, len(data) - nsamp_window)
+	frames = numpy.lib.stride_tricks.sliding_window_view(data, nsamp_window)
+
+	num_bins = num_freqs * bin_width_samples
+	transform = spectrogram_helper.make_transform(nsamp_window, num_bins, nsamp_FFT)
+	power = numpy.empty((num_times, num_freqs), dtype=numpy.float32)
+	for block_start in range(0, num_times, block_size):
+		block_end = min(block_start + block_size, num_times)
+		spectra = transform(frames[frame_starts[block_start:block_end]] * window)
+		bin_power = numpy.square(numpy.abs(spectra))
+		power[block_start:block_end] = bin_power.reshape(block_end - block_start, num_freqs, bin_width_samples).sum(axis=2) * power_scale
+
+	freqs = 0.5 * (frequency_step - bin_width_hertz) + numpy.arange(num_freqs) * frequency_step
+	### Rows are frequencies and columns are times (a transposed view)
+	return power.T, freqs, start_time + frame_times
+
+######################################################################
+######################################################################
+### Convert a Praat spectrogram to the dB values Praat paints
+##### (Praat's "Spectrogram: Paint...", with autoscaling)
+#####
+#####
+### Arguments:
+##### power				- the power spectral density, see compute_praat_spectrogram
+##### freqs				- the frequency of each row [Hz]
+##### pre_emphasis		- [dB/octave], relative to 1000 Hz
+##### dynamic_compression - 0 (none) ... 1 (every frame gets the same maximum)
+##### maximum			- the maximum [dB/Hz] (only used by dynamic compression, if autoscaling)
+##### autoscaling		- whether the maximum is the largest painted value
+#####
+### Returns:
+##### power_dB			- (float32) array of the same shape as power [dB/Hz]
+##### maximum			- the maximum [dB/Hz] (the image spans maximum - dynamic range ... maximum)
+######################################################################
+######################################################################
+def get_praat_spectrogram_dB(power, freqs, pre_emphasis=6.0, dynamic_compression=0.0, maximum=100.0, autoscaling=True):
+	power_dB = 10. * numpy.log10((numpy.asarray(power, dtype=numpy.float64) + 1e-30) / PRAAT_REFERENCE_POWER)
+	### Pre-emphasis (Praat takes the frequency of row i, counted from 1, as i * frequency step)
+	frequency_step = freqs[1] - freqs[0] if len(freqs) > 1 else 2. * freqs[0]
+	power_dB += ((pre_emphasis / math.log(2.)) * numpy.log(numpy.arange(1, len(freqs) + 1) * frequency_step / 1000.))[:, numpy.newaxis]
+	if dynamic_compression != 0:
+		local_maximum = numpy.maximum(power_dB.max(axis=0), 0.)
+		power_dB += dynamic_compression * (maximum - local_maximum)[numpy.newaxis, :]
+	if autoscaling:
+		maximum = float(power_dB.max())
+	return power_dB.astype(numpy.float32), maximum
+
+######################################################################
+######################################################################
+### Compare a spectrogram computed by compute_praat_spectrogram with one
+##### computed by Praat itself (e.g. by praatUtil.calculateSpectrogram)
+#####
+##### The time step and maximum frequency are taken from the Praat file. Only
+##### values within dynamic_range of Praat's maximum are compared (below, both
+##### are painted white anyway, and rounding dominates).
+#####
+#####
+### Arguments:
+##### data				- the (mono) audio data, in Praat's units (full scale = 1)
+##### Fs				- the sample rate of the data
+##### praat_spectrogram_file_path - a Spectrogram saved as (short) text file by Praat
+##### window_length		- the effective window length [s] used by Praat
+##### frequency_step	- the frequency step [Hz] used by Praat
+##### dynamic_range		- the range of compared values [dB]
+#####
+### Returns:
+##### dict				- max_abs_dB_difference, mean_abs_dB_difference, num_compared
+######################################################################
+######################################################################
+def compare_to_praat_spectrogram(data, Fs, praat_spectrogram_file_path, window_length=0.005, frequency_step=20., dynamic_range=50.):
+	praat_power, praat_sampling = praatUtil.readPraatSpectrogram(praat_spectrogram_file_path)
+	power, freqs, times = compute_praat_spectrogram(data,
+													Fs,
+													window_length=window_length,
+													max_frequency=praat_sampling['ymax'],
+													time_step=praat_sampling['dx'],
+													frequency_step=frequency_step,
+													start_time=praat_sampling['xmin'])
+	if power.shape != praat_power.shape:
+		raise Exception("the spectrogram has " + str(power.shape) + " (frequencies, times), but the Praat spectrogram has " + str(praat_power.shape))
+
+	praat_power_dB = 10. * numpy.log10((praat_power + 1e-30) / PRAAT_REFERENCE_POWER)
+	power_dB = 10. * numpy.log10((power.astype(numpy.float64) + 1e-30) / PRAAT_REFERENCE_POWER)
+	compared = praat_power_dB >= praat_power_dB.max() - dynamic_range
+	differences = numpy.abs(power_dB[compared] - praat_power_dB[compared])
+	return {
+		'max_abs_dB_difference':float(differences.max()),
+		'mean_abs_dB_difference':float(differences.mean()),
+		'num_compared':int(numpy.count_nonzero(compared)),
+	}
+
+######################################################################
+######################################################################
+### Get the extent of a Praat spectrogram image (Praat paints each value
+##### as a cell centred on its frame time and band frequency)
+#####
+#####
+### Arguments:
+##### freqs				- the frequency of each row [Hz], see compute_praat_spectrogram
+##### times				- the time of each column [s], see compute_praat_spectrogram
+#####
+### Returns:
+##### tuple				- left, right, bottom and top of the image (for imshow)
+######################################################################
+######################################################################
+def get_praat_spectrogram_extent(freqs, times):
+	time_step = times[1] - times[0] if len(times) > 1 else 0.
+	frequency_step = freqs[1] - freqs[0] if len(freqs) > 1 else 2. * freqs[0]
+	return (times[0] - 0.5 * time_step, times[-1] + 0.5 * time_step, freqs[0] - 0.5 * frequency_step, freqs[-1] + 0.5 * frequency_step)
@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python3
+#%############################################################
+#%Regular package imports here
+#%############################################################
+import atexit
+import os
+import queue
+import shutil
+import subprocess
+import time
+#%############################################################
+#% Local file imports here
+#%############################################################
+import global_values
+import global_path_helper
+
+######################################################################
+# constants
+######################################################################
+
+### The Praat executable (as called by praatUtil.runPraatScript)
+PRAAT_EXECUTABLE = 'Praat'
+
+### Sub-directory (of python_build_dir) of the workers' job directories
+PRAAT_WORKERS_SUBDIR = 'praat_workers/'
+
+### Files inside the job directory of a worker
+WORKER_SCRIPT_FILENAME = 'worker.praat'
+WORKER_LOG_FILENAME = 'worker.log'
+JOB_FILENAME = 'job.praat'
+READY_FILENAME = 'ready'
+DONE_FILENAME = 'done'
+STOP_FILENAME = 'stop'
+
+### Longest time a worker may take to start or to stop (in seconds)
+WORKER_START_TIMEOUT = 30.0
+WORKER_STOP_TIMEOUT = 2.0
+
+### The Praat script a worker runs: it signals that it is ready, then runs
+##### every script that appears in its job directory (removing all objects
+##### the script created), until it is told to stop. Praat stops at the
+##### first error of a script, so a failed script also ends its worker.
+WORKER_SCRIPT = """jobDir$ = "{job_dir}"
+sleep (0)
+writeFileLine: jobDir$ + "{ready}", "ready"
+while not fileReadable (jobDir$ + "{stop}")
+	if fileReadable (jobDir$ + "{job}")
+		runScript: jobDir$ + "{job}"
+		nocheck select all
+		nocheck Remove
+		deleteFile: jobDir$ + "{job}"
+		writeFileLine: jobDir$ + "{done}", "done"
+	else
+		sleep ({poll_interval})
+	endif
+endwhile
+"""
+
+### The pool of this process (see get_praat_worker_pool)
+_praat_worker_pool = None
+
+######################################################################
+
+class PraatWorker:
+	"""
+	a class to run Praat scripts in a single long-lived Praat process, which
+	watches its own job directory for the next script (instead of starting a
+	new Praat process for every script). the process is started on the first
+	script, and restarted on the next script after it failed or timed out.
+	"""
+
+	# ---------------------------------------------------------------------- #
+
+	def __init__(self, job_dir, poll_interval=0.005):
+		"""
+		@param job_dir the (full path of the) job directory of the worker
+		@param poll_interval how often the worker looks for a new script [s]
+		"""
+		self.job_dir = job_dir
+		self.poll_interval = poll_interval
+		self.process = None
+		self.log_file = None
+
+	# ---------------------------------------------------------------------- #
+
+	def is_alive(self):
+		"""
+		@return whether the Praat process is running
+		"""
+		return self.process is not None and self.process.poll() is None
+
+	# ---------------------------------------------------------------------- #
+
+	def start(self):
+		"""
+		start the Praat process, and wait until it runs the worker script
+		@throw throws an error if Praat exits (e.g. since it does not support
+			the worker script) or does not start within WORKER_START_TIMEOUT
+		"""
+		self.stop()
+		global_path_helper.verify_or_make_dirs_for(self.job_dir)
+		global_path_helper.write_to_file(self.job_dir + WORKER_SCRIPT_FILENAME, WORKER_SCRIPT.format(job_dir=self.job_dir.replace('"', '""'),
+																									ready=READY_FILENAME,
+																									stop=STOP_FILENAME,
+																									job=JOB_FILENAME,
+																									done=DONE_FILENAME,
+																									poll_interval=self.poll_interval))
+		### (the output goes to a file, so a chatty script can never fill up a pipe and block)
+		self.log_file = open(self.job_dir + WORKER_LOG_FILENAME, 'wb')
+		self.process = subprocess.Popen([PRAAT_EXECUTABLE, self.job_dir + WORKER_SCRIPT_FILENAME], stdin=subprocess.DEVNULL, stdout=self.log_file, stderr=subprocess.STDOUT)
+		self.wait_for(READY_FILENAME, WORKER_START_TIMEOUT, "start")
+
+	# ---------------------------------------------------------------------- #
+
+	def run_script(self, script, timeout):
+		"""
+		run a Praat script in the worker (starting it, if necessary)
+		@param script a valid Praat script. lines are separated by newline
+			characters (backslash n)
+		@param timeout the longest time the script may run [s]
+		@throw throws an error if the script fails or times out (the worker is
+			stopped, and restarted by the next script)
+		"""
+		if not self.is_alive():
+			self.start()
+		if os.path.isfile(self.job_dir + DONE_FILENAME):
+			os.remove(self.job_dir + DONE_FILENAME)
+		### (written next to the job file, then renamed, so the worker never reads a partial script)
+		global_path_helper.write_to_file(self.job_dir + JOB_FILENAME + '.tmp', script)
+		os.replace(self.job_dir + JOB_FILENAME + '.tmp', self.job_dir + JOB_FILENAME)
+		self.wait_for(DONE_FILENAME, timeout, "run the script")
+		os.remove(self.job_dir + DONE_FILENAME)
+
+	# ---------------------------------------------------------------------- #
+
+	def wait_for(self, filename, timeout, action):
+		"""
+		internally used ("pseudo-private") function to wait until the worker
+		writes a file into its job directory
+		@param filename the name of the file
+		@param timeout the longest time to wait [s]
+		@param action what the worker is doing (only used for reporting errors)
+		@throw throws an error (and stops the worker) if the Praat process
+			exits or the time runs out
+		"""
+		deadline = time.perf_counter() + timeout
+		while not os.path.isfile(self.job_dir + filename):
+			if self.process.poll() is not None:
+				msg = self.read_log()
+				self.stop()
+				raise Exception("Error executing Praat script: Praat worker exited while trying to " + action + ": " + msg)
+			if time.perf_counter() > deadline:
+				self.stop()
+				raise Exception("Error executing Praat script: Praat worker did not " + action + " within " + str(timeout) + " s")
+			time.sleep(self.poll_interval)
+
+	# ---------------------------------------------------------------------- #
+
+	def read_log(self):
+		"""
+		@return the output of the Praat process (e.g. its error message)
+		"""
+		try:
+			with open(self.job_dir + WORKER_LOG_FILENAME, 'rb') as f:
+				return f.read().decode('utf-8', 'replace').strip()
+		except OSError:
+			return ''
+
+	# ---------------------------------------------------------------------- #
+
+	def stop(self):
+		"""
+		stop the Praat process (asking it first, killing it if it does not
+		stop within WORKER_STOP_TIMEOUT), and remove the job directory
+		"""
+		if self.is_alive():
+			try:
+				global_path_helper.write_to_file(self.job_dir + STOP_FILENAME, 'stop')
+				self.process.wait(WORKER_STOP_TIMEOUT)
+			except (OSError, subprocess.TimeoutExpired):
+				self.process.kill()
+				self.process.wait()
+		self.process = None
+		if self.log_file is not None:
+			self.log_file.close()
+			self.log_file = None
+		shutil.rmtree(self.job_dir, ignore_errors=True)
+
+######################################################################
+
+class PraatWorkerPool:
+	"""
+	a class to run Praat scripts on a fixed number of PraatWorkers. a script
+	waits for the next idle worker, so scripts may be run by several threads
+	at once. if no worker can be started (e.g. since the installed Praat does
+	not support the worker script), the pool is disabled and the scripts are
+	run by praatUtil.runPraatScript in a new Praat process each.
+	"""
+
+	# ---------------------------------------------------------------------- #
+
+	def __init__(self, pool_size, job_timeout=120.0, poll_interval=0.005):
+		"""
+		@param pool_size the number of workers
+		@param job_timeout the longest time a single script may run [s]
+		@param poll_interval how often idle workers look for a new script [s]
+		"""
+		self.job_timeout = job_timeout
+		self.is_disabled = False
+		self.workers = []
+		self.idle_workers = queue.Queue()
+		self.workers_dir = global_values.python_build_dir + PRAAT_WORKERS_SUBDIR + str(os.getpid()) + '/'
+		for worker_index in range(pool_size):
+			worker = PraatWorker(self.workers_dir + 'worker' + str(worker_index) + '/', poll_interval)
+			self.workers.append(worker)
+			self.idle_workers.put(worker)
+
+	# ---------------------------------------------------------------------- #
+
+	def run_script(self, script, timeout=None):
+		"""
+		run a Praat script on the next idle worker
+		@param script a valid Praat script. lines are separated by newline
+			characters (backslash n)
+		@param timeout the longest time the script may run [s] (None means
+			the job timeout of the pool)
+		@throw throws an error if the script fails or times out
+		@return True if the script was run, False if the pool is disabled
+		"""
+		if self.is_disabled:
+			return False
+		worker = self.idle_workers.get()
+		try:
+			if not worker.is_alive():
+				try:
+					worker.start()
+				except Exception:
+					self.is_disabled = True
+					return False
+			worker.run_script(script, self.job_timeout if timeout is None else timeout)
+			return True
+		finally:
+			self.idle_workers.put(worker)
+
+	# ---------------------------------------------------------------------- #
+
+	def shutdown(self):
+		"""
+		stop all workers (and remove their job directories)
+		"""
+		for worker in self.workers:
+			worker.stop()
+		shutil.rmtree(self.workers_dir, ignore_errors=True)
+
+######################################################################
+######################################################################
+### Get the Praat worker pool of this process (created on the first call,
+##### with the "Praat worker values" of global_values, and shut down when
+##### the process exits)
+#####
+#####
+### Arguments:
+##### (nothing)
+#####
+### Returns:
+##### PraatWorkerPool	- the pool, or None if it is switched off or disabled
+######################################################################
+######################################################################
+def get_praat_worker_pool():
+	global _praat_worker_pool
+	if global_values.praat_worker_pool_size <= 0:
+		return None
+	if _praat_worker_pool is None:
+		_praat_worker_pool = PraatWorkerPool(global_values.praat_worker_pool_size,
+												job_timeout=global_values.praat_job_timeout,
+												poll_interval=global_values.praat_worker_poll_interval)
+		atexit.register(_praat_worker_pool.shutdown)
+	if _praat_worker_pool.is_disabled:
+		return None
+	return _praat_worker_pool
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python3
+#%############################################################
+#%Regular package imports here
+#%############################################################
+import argparse
+import concurrent.futures
+import csv
+import numpy
+import os
+import sys
+import time
+#%############################################################
+#% Local file imports here
+#%############################################################
+import global_path_helper
+import global_values
+import audio_file_helper
+import audio_buffer_helper
+import build_cache_helper
+import praat_spectrogram_helper
+import spectrogram_helper
+
+######################################################################
+# constants
+######################################################################
+
+### Spectrogram methods of a job: the STFT of create_spectrogram_from_wav_file,
+##### or Praat's "To Spectrogram..." (see praat_spectrogram_helper)
+BATCH_METHODS = ('stft', 'praat')
+
+### Highest frequency of a job without maxFrequency [Hz] (the default of
+##### plotWaveformSpectrogram.create_spectrogram_from_wav_file, so default jobs
+##### match the figures and share their spectrogram cache entries)
+BATCH_DEFAULT_MAX_FREQUENCY = 5500.0
+
+### Name of the file (inside the output directory) which lists every job
+##### and the .npz file holding its spectrogram
+BATCH_MANIFEST_FILENAME = 'manifest.csv'
+
+### Columns of the manifest
+BATCH_MANIFEST_COLUMNS = ('index', 'wav', 'startTime', 'endTime', 'maxFrequency', 'method', 'file', 'num_freqs', 'num_times', 'duration', 'runtime')
+
+######################################################################
+######################################################################
+### Compute the spectrogram of a single batch job and save it as a .npz file
+##### (runs in a worker process of run_spectrogram_batch)
+#####
+##### The 'stft' method uses the parameters and the (decimating, blocked) STFT
+##### of create_spectrogram_from_wav_file, at full resolution (one column per
+##### frame); the 'praat' method uses the "Praat spectrogram values" of
+##### global_values. The .npz file holds the spectrogram in dB ('spectrogram',
+##### float32, frequencies x times), 'freqs' [Hz] and 'times' [s, relative to
+##### the start of the file].
+#####
+#####
+### Arguments:
+##### job				- dict with 'wav' (a path, or a filename within the Tex audio
+#####						subdirectory), 'startTime', 'endTime', 'maxFrequency' and 'method'
+##### output_file_path	- the full path of the .npz file to write
+##### compressed		- whether the .npz file is compressed
+#####
+### Returns:
+##### dict				- file, num_freqs, num_times, duration (of the audio) and runtime [s]
+######################################################################
+######################################################################
+def run_spectrogram_job(job, output_file_path, compressed=False):
+	start = time.time()
+	if os.path.isfile(job['wav']):
+		audio_buffer = audio_buffer_helper.AudioBuffer(job['wav'], job['startTime'], job['endTime'])
+	else:
+		audio_buffer = audio_buffer_helper.AudioBuffer.from_wav_filename(job['wav'], job['startTime'], job['endTime'])
+	sample_rate = audio_buffer.sample_rate
+
+	if job['method'] == 'praat':
+		power, freqs, times = praat_spectrogram_helper.compute_praat_spectrogram(audio_buffer.get_data() / audio_file_helper.get_full_scale(audio_buffer.bit_depth),
+																					sample_rate,
+																					window_length=global_values.praat_spectrogram_window_length,
+																					max_frequency=job['maxFrequency'],
+																					time_step=global_values.praat_spectrogram_time_step,
+																					frequency_step=global_values.praat_spectrogram_frequency_step,
+																					start_time=audio_buffer.start_frame / float(sample_rate))
+		magnitude_dB, _ = praat_spectrogram_helper.get_praat_spectrogram_dB(power, freqs, pre_emphasis=global_values.praat_spectrogram_pre_emphasis)
+	else:
+		decimation_factor, Fs, NFFT, noverlap, pad_to = spectrogram_helper.get_spectrogram_parameters(sample_rate, job['maxFrequency'])
+		magnitude_dB, freqs, times = spectrogram_helper.compute_spectrogram(spectrogram_helper.decimate(audio_buffer.get_data(), decimation_factor),
+																			NFFT=NFFT,
+																			Fs=Fs,
+																			noverlap=noverlap,
+																			pad_to=pad_to,
+																			max_frequency=job['maxFrequency'])
+		times = times + audio_buffer.start_frame / float(sample_rate)
+
+	tmp_file_path = build_cache_helper.get_temporary_file_path(output_file_path)
+	with open(tmp_file_path, 'wb') as f:
+		(numpy.savez_compressed if compressed else numpy.savez)(f, spectrogram=numpy.ascontiguousarray(magnitude_dB), freqs=freqs, times=times)
+	os.replace(tmp_file_path, output_file_path)
+	return {
+		'file':os.path.basename(output_file_path),
+		'num_freqs':magnitude_dB.shape[0],
+		'num_times':magnitude_dB.shape[1],
+		'duration':audio_buffer.get_num_samples() / float(sample_rate),
+		'runtime':time.time() - start,
+	}
+
+######################################################################
+######################################################################
+### Compute the spectrograms of many excerpts on a pool of processes
+##### (each job is transformed by a single thread, so the processes scale
+##### with the number of CPUs). One .npz file per job is written to the output
+##### directory (see run_spectrogram_job), plus a manifest listing every job.
+#####
+#####
+### Arguments:
+##### jobs				- list of dicts with 'wav', and optionally 'startTime' (default 0),
+#####						'endTime' (default -1, "end of file"), 'maxFrequency'
+#####						(default BATCH_DEFAULT_MAX_FREQUENCY) and 'method' (default 'stft')
+##### output_dir		- the directory of the .npz files and the manifest
+##### num_processes		- the number of worker processes (None means "one per CPU")
+##### compressed		- whether the .npz files are compressed
+##### verbose			- whether progress and a throughput summary are printed
+#####
+### Returns:
+##### list				- one dict per job (in order), see BATCH_MANIFEST_COLUMNS
+######################################################################
+######################################################################
+def run_spectrogram_batch(jobs, output_dir, num_processes=None, compressed=False, verbose=True):
+	output_dir = os.path.join(output_dir, '')
+	global_path_helper.verify_or_make_dirs_for(output_dir)
+	jobs = [{
+		'wav':job['wav'],
+		'startTime':float(job.get('startTime', 0.0)),
+		'endTime':float(job.get('endTime', -1)),
+		'maxFrequency':float(job.get('maxFrequency', BATCH_DEFAULT_MAX_FREQUENCY)),
+		'method':job.get('method', 'stft'),
+	} for job in jobs]
+	for job in jobs:
+		if job['method'] not in BATCH_METHODS:
+			raise Exception("unknown spectrogram method '" + job['method'] + "' (expected one of " + str(BATCH_METHODS) + ")")
+
+	start = time.time()
+	results = [None] * len(jobs)
+	num_failed = 0
+	with concurrent.futures.ProcessPoolExecutor(max_workers=num_processes) as executor:
+		futures = {}
+		for index, job in enumerate(jobs):
+			output_filename = '{:05d}_'.format(index) + os.path.splitext(os.path.basename(job['wav']))[0] + '.npz'
+			futures[executor.submit(run_spectrogram_job, job, output_dir + output_filename, compressed)] = index
+		for num_done, future in enumerate(concurrent.futures.as_completed(futures), 1):
+			index = futures[future]
+			results[index] = dict(jobs[index], index=index)
+			try:
+				results[index].update(future.result())
+				status = '{:.2f} s'.format(results[index]['runtime'])
+			except Exception as e:
+				num_failed += 1
+				status = 'FAILED: ' + str(e)
+			if verbose:
+				print('[' + str(num_done) + '/' + str(len(jobs)) + '] ' + jobs[index]['wav'] + ' (' + status + ')', flush=True)
+	elapsed = time.time() - start
+
+	with open(output_dir + BATCH_MANIFEST_FILENAME, 'w', newline='') as f:
+		writer = csv.DictWriter(f, fieldnames=BATCH_MANIFEST_COLUMNS, restval='')
+		writer.writeheader()
+		writer.writerows(results)
+
+	if verbose:
+		total_duration = sum(result.get('duration', 0.0) for result in results)
+		print(str(len(jobs) - num_failed) + ' spectrograms (' + str(num_failed) + ' failed) of ' + '{:.1f}'.format(total_duration) + ' s of audio in ' + '{:.2f}'.format(elapsed) + ' s: ' \
+				+ '{:.2f}'.format(len(jobs) / max(elapsed, 1e-9)) + ' jobs/s, ' + '{:.1f}'.format(total_duration / max(elapsed, 1e-9)) + ' s of audio/s', flush=True)
+	return results
+
+######################################################################
+######################################################################
+### Read a batch job list from a .csv file, whose header names the
+##### columns: wav, and optionally startTime, endTime, maxFrequency, method
+#####
+#####
+### Arguments:
+##### job_file_path		- the full path of the .csv file
+#####
+### Returns:
+##### list				- one dict per (non-empty) row
+######################################################################
+######################################################################
+def read_spectrogram_jobs(job_file_path):
+	global_path_helper.verify_file_exists(job_file_path)
+	with open(job_file_path, 'r', newline='') as f:
+		return [{key:value for key, value in row.items() if value not in (None, '')} for row in csv.DictReader(f) if row.get('wav')]
+
+######################################################################
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Compute the spectrograms of a list of .wav excerpts on a pool of processes.')
+	parser.add_argument('job_file', help='.csv file with the columns wav[,startTime,endTime,maxFrequency,method]')
+	parser.add_argument('output_dir', help='directory of the .npz files and the manifest')
+	parser.add_argument('-j', '--processes', type=int, default=None, help='number of worker processes (default: one per CPU)')
+	parser.add_argument('-z', '--compressed', action='store_true', help='compress the .npz files')
+	args = parser.parse_args()
+	batch_results = run_spectrogram_batch(read_spectrogram_jobs(args.job_file), args.output_dir, num_processes=args.processes, compressed=args.compressed)
+	sys.exit(1 if any('file' not in result for result in batch_results) else 0)
@@ -0,0 +1,502 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python3
+#%############################################################
+#%Regular package imports here
+#%############################################################
+import concurrent.futures
+import math
+import numpy
+import os
+import scipy.fft
+import scipy.signal
+#%############################################################
+#% Local file imports here
+#%############################################################
+import global_values
+import build_cache_helper
+
+######################################################################
+# constants
+######################################################################
+
+### How far above the highest displayed frequency the Nyquist frequency of
+##### the decimated signal must stay, so that the transition band of the
+##### anti-aliasing filter lies entirely above the displayed frequencies
+DECIMATION_HEADROOM = 1.1
+
+### Number of frames transformed at a time by one batched FFT
+##### (bounds the memory of the windowed frames and their spectra)
+STFT_BLOCK_SIZE = 2048
+
+### Smallest number of frames for which the blocks are transformed by
+##### several threads (below it, starting the threads costs more than it saves)
+PARALLEL_STFT_MIN_FRAMES = 4 * STFT_BLOCK_SIZE
+
+### If fewer than this fraction of the (zero-padded) FFT's bins lie in the
+##### requested frequency range, the zoom FFT (chirp-z transform), which
+##### evaluates only those bins, is faster than a full real FFT
+ZOOM_FFT_MAX_FRACTION = 0.4
+
+### Number of spectrogram columns (rows) computed per pixel column (row) of the
+##### output in adaptive resolution mode (see get_adaptive_resolution), so the
+##### image is still slightly downsampled (i.e. antialiased) when it is drawn
+ADAPTIVE_RESOLUTION_OVERSAMPLING = 2
+
+### Cache namespace of the spectrogram matrices (see get_cached_spectrogram)
+SPECTROGRAM_CACHE_NAMESPACE = 'spectrograms'
+
+### Part of every spectrogram cache key; increase it whenever
+##### compute_spectrogram changes its results, so older entries are not used
+SPECTROGRAM_CACHE_VERSION = 1
+
+######################################################################
+######################################################################
+### Get the largest integer decimation factor which keeps every frequency
+##### up to max_frequency (plus headroom) below the new Nyquist frequency
+#####
+#####
+### Arguments:
+##### sample_rate		- the sample rate of the audio data
+##### max_frequency		- the highest frequency that will be displayed
+#####
+### Returns:
+##### int				- the decimation factor (1 means "do not decimate")
+######################################################################
+######################################################################
+def get_decimation_factor(sample_rate, max_frequency):
+	if max_frequency is None or max_frequency <= 0:
+		return 1
+	return max(int(sample_rate // (2. * max_frequency * DECIMATION_HEADROOM)), 1)
+
+######################################################################
+######################################################################
+### Get the STFT parameters of the project's spectrograms
+##### (those of create_spectrogram_from_wav_file, also used for batches)
+#####
+##### Nothing above max_frequency is shown, so the data is first decimated
+##### (anti-aliased, by an integer factor) to just above twice max_frequency,
+##### and the window length, overlap and padding are derived from the
+##### decimated sample rate, so the window duration, hop duration and
+##### frequency spacing stay the same.
+#####
+#####
+### Arguments:
+##### sample_rate		- the sample rate of the audio data
+##### max_frequency		- the highest frequency that will be displayed
+#####
+### Returns:
+##### decimation_factor	- see get_decimation_factor
+##### Fs				- the sample rate of the decimated data
+##### NFFT				- the number of samples per frame
+##### noverlap			- the number of samples by which frames overlap
+##### pad_to			- the (zero-padded) FFT length
+######################################################################
+######################################################################
+def get_spectrogram_parameters(sample_rate, max_frequency):
+	decimation_factor = get_decimation_factor(sample_rate, max_frequency)
+	Fs = sample_rate / float(decimation_factor)
+	NFFT = int(float(Fs) * 0.01066666666666666666666666666667)
+	# Number of overlaps (I really don't understand why, but /2 is good)
+	noverlap = int(NFFT / 1.03)#
+	# Gives more detail, the higher the multiplier
+	pad_to = NFFT * 8#16#64#32#16
+	return decimation_factor, Fs, NFFT, noverlap, pad_to
+
+######################################################################
+######################################################################
+### Decimate audio data by an integer factor (anti-aliased, polyphase)
+#####
+#####
+### Arguments:
+##### data				- the (mono) audio data
+##### decimation_factor	- see get_decimation_factor
+#####
+### Returns:
+##### array				- the (float32) data at 1/decimation_factor of the sample rate
+######################################################################
+######################################################################
+def decimate(data, decimation_factor):
+	if decimation_factor <= 1:
+		return data
+	return scipy.signal.resample_poly(data, 1, decimation_factor).astype(numpy.float32, copy=False)
+
+######################################################################
+######################################################################
+### Get the window (weights) for the frames of a short-time Fourier transform
+#####
+#####
+### Arguments:
+##### window			- None (Hanning window), a function which windows an
+#####						array (like matplotlib.mlab.window_hanning), or the
+#####						window weights themselves
+##### NFFT				- the number of samples per frame
+#####
+### Returns:
+##### array				- the (float32) window weights
+######################################################################
+######################################################################
+def get_window(window, NFFT):
+	if window is None:
+		window = numpy.hanning(NFFT)
+	elif callable(window):
+		window = window(numpy.ones(NFFT))
+	window = numpy.asarray(window, dtype=numpy.float32)
+	if len(window) != NFFT:
+		raise Exception("the window length (" + str(len(window)) + ") must match NFFT (" + str(NFFT) + ")")
+	return window
+
+######################################################################
+######################################################################
+### Compute the magnitude spectrogram (in dB) of audio data
+##### (same results as matplotlib's specgram(..., mode='magnitude', scale='dB'))
+#####
+##### The frames are views onto the data (no copies), and they are
+##### windowed and transformed in blocks of STFT_BLOCK_SIZE frames by one
+##### batched FFT each. If max_frequency is given, only the bins up to (and
+##### just above) it are computed: by a zoom FFT if only a small fraction of
+##### the bins is requested (see make_zoom_fft), otherwise by a real FFT
+##### whose upper bins are dropped before the magnitudes are taken.
+##### With frames_per_column > 1, the magnitudes of each run of that many
+##### consecutive frames are averaged into a single column (area-averaging
+##### onto a coarser time grid, block by block, so the full-resolution
+##### spectrogram is never stored).
+##### With num_workers > 1 (and at least PARALLEL_STFT_MIN_FRAMES frames), the
+##### blocks are transformed by a pool of threads (the FFTs release the GIL);
+##### every block is computed exactly as in the serial case, so the results
+##### are bit-identical.
+#####
+#####
+### Arguments:
+##### data				- the (mono) audio data
+##### NFFT				- the number of samples per frame
+##### Fs				- the sample rate of the data
+##### noverlap			- the number of samples by which frames overlap
+##### pad_to			- the (zero-padded) FFT length (None means NFFT)
+##### window			- see get_window
+##### max_frequency		- the highest frequency needed (None means "up to Nyquist")
+##### use_zoom_fft		- True/False to force/forbid the zoom FFT (None decides
+#####						by ZOOM_FFT_MAX_FRACTION)
+##### block_size		- the number of frames per batched FFT
+##### num_workers		- the number of threads transforming blocks (None means os.cpu_count())
+##### frames_per_column	- the number of consecutive frames averaged into each column
+#####
+### Returns:
+##### magnitude_dB		- (float32) array of shape (len(freqs), len(times))
+##### freqs				- the frequency of each row [Hz]
+##### times				- the time of each column (the mean of its frame midpoints), relative to the first sample [s]
+######################################################################
+######################################################################
+def compute_spectrogram(data, NFFT, Fs, noverlap=0, pad_to=None, window=None, max_frequency=None, use_zoom_fft=None, block_size=STFT_BLOCK_SIZE, num_workers=1, frames_per_column=1):
+	if pad_to is None:
+		pad_to = NFFT
+	if pad_to < NFFT:
+		raise Exception("pad_to (" + str(pad_to) + ") must not be smaller than NFFT (" + str(NFFT) + ")")
+	if noverlap < 0 or noverlap >= NFFT:
+		raise Exception("noverlap (" + str(noverlap) + ") must be between 0 and NFFT (" + str(NFFT) + ")")
+
+	data = numpy.asarray(data, dtype=numpy.float32)
+	### Data shorter than one frame is zero-padded to a single frame
+	if len(data) < NFFT:
+		data = numpy.concatenate((data, numpy.zeros(NFFT - len(data), dtype=numpy.float32)))
+
+	step = NFFT - noverlap
+	frames = numpy.lib.stride_tricks.sliding_window_view(data, NFFT)[::step]
+	num_frames = len(frames)
+	window = get_window(window, NFFT)
+	### Magnitudes are normalized by the window sum (i.e. by its coherent gain)
+	magnitude_scale = numpy.float32(1. / window.sum())
+
+	### The bins (at spacing Fs/pad_to) from 0 Hz up to the first one at or above max_frequency
+	num_all_freqs = pad_to // 2 + 1
+	num_freqs = num_all_freqs
+	if max_frequency is not None:
+		num_freqs = max(min(int(math.ceil(max_frequency * pad_to / float(Fs))) + 1, num_all_freqs), 2)
+	transform = make_transform(NFFT, num_freqs, pad_to, use_zoom_fft)
+
+	### Blocks hold whole columns
+	frames_per_column = max(int(frames_per_column), 1)
+	block_size = max(block_size // frames_per_column, 1) * frames_per_column
+	num_columns = -(-num_frames // frames_per_column)
+	magnitude_dB = numpy.empty((num_columns, num_freqs), dtype=numpy.float32)
+	def transform_block(block_start):
+		block_end = min(block_start + block_size, num_frames)
+		### (the error state is per thread)
+		with numpy.errstate(divide='ignore'):
+			spectra = numpy.abs(transform(frames[block_start:block_end] * window))
+			if frames_per_column > 1:
+				column_starts = numpy.arange(0, block_end - block_start, frames_per_column)
+				frame_counts = numpy.diff(numpy.append(column_starts, block_end - block_start))
+				spectra = numpy.add.reduceat(spectra, column_starts, axis=0)
+				spectra /= frame_counts[:, numpy.newaxis].astype(numpy.float32)
+			spectra *= magnitude_scale
+			numpy.log10(spectra, out=spectra)
+			numpy.multiply(spectra, 20, out=magnitude_dB[block_start // frames_per_column:-(-block_end // frames_per_column)])
+
+	block_starts = range(0, num_frames, block_size)
+	if num_workers is None:
+		num_workers = os.cpu_count() or 1
+	num_workers = min(num_workers, len(block_starts))
+	if num_workers > 1 and num_frames >= PARALLEL_STFT_MIN_FRAMES:
+		### Every block is written to its own rows of magnitude_dB
+		with concurrent.futures.ThreadPoolExecutor(max_workers=num_workers) as executor:
+			for _ in executor.map(transform_block, block_starts):
+				pass
+	else:
+		for block_start in block_starts:
+			transform_block(block_start)
+
+	freqs, times = get_spectrogram_axes(num_freqs, num_frames, NFFT, Fs, noverlap, pad_to, frames_per_column)
+	### Rows are frequencies and columns are times (a transposed view)
+	return magnitude_dB.T, freqs, times
+
+######################################################################
+######################################################################
+### Get the frequencies of the rows and the times of the columns of a
+##### spectrogram (see compute_spectrogram)
+#####
+#####
+### Arguments:
+##### num_freqs			- the number of rows
+##### num_frames		- the number of frames (before averaging them into columns)
+##### NFFT				- the number of samples per frame
+##### Fs				- the sample rate of the data
+##### noverlap			- the number of samples by which frames overlap
+##### pad_to			- the (zero-padded) FFT length
+##### frames_per_column	- the number of consecutive frames averaged into each column
+#####
+### Returns:
+##### freqs				- the frequency of each row [Hz]
+##### times				- the time of each column (the mean of its frame midpoints), relative to the first sample [s]
+######################################################################
+######################################################################
+def get_spectrogram_axes(num_freqs, num_frames, NFFT, Fs, noverlap, pad_to, frames_per_column=1):
+	freqs = numpy.fft.rfftfreq(pad_to, 1. / Fs)[:num_freqs]
+	times = (numpy.arange(num_frames) * (NFFT - noverlap) + NFFT / 2.) / Fs
+	if frames_per_column > 1:
+		column_starts = numpy.arange(0, num_frames, frames_per_column)
+		times = numpy.add.reduceat(times, column_starts) / numpy.diff(numpy.append(column_starts, num_frames))
+	return freqs, times
+
+######################################################################
+######################################################################
+### Get the number of frames of a short-time Fourier transform
+#####
+#####
+### Arguments:
+##### num_samples		- the number of samples of the data
+##### NFFT				- the number of samples per frame
+##### noverlap			- the number of samples by which frames overlap
+#####
+### Returns:
+##### int				- the number of frames (data shorter than one frame is padded to one frame)
+######################################################################
+######################################################################
+def get_num_frames(num_samples, NFFT, noverlap):
+	return (max(num_samples, NFFT) - NFFT) // (NFFT - noverlap) + 1
+
+######################################################################
+######################################################################
+### Derive the STFT parameters from the pixel grid a spectrogram is drawn on
+##### (ADAPTIVE_RESOLUTION_OVERSAMPLING columns/rows per pixel), instead of
+##### from the window length alone
+#####
+##### The hop grows with the number of samples per column, up to half a window
+##### (at which the Hanning windows still weigh every sample equally); if the
+##### frames then still outnumber the columns, runs of frames are averaged into
+##### each column (see compute_spectrogram). The frequency bins are only as
+##### dense as the rows up to max_frequency need. Neither hop nor bin spacing
+##### ever gets finer than the given (non-adaptive) values.
+#####
+#####
+### Arguments:
+##### num_samples		- the number of samples of the data
+##### NFFT				- the number of samples per frame
+##### Fs				- the sample rate of the data
+##### max_frequency		- the highest frequency displayed (None means the Nyquist frequency)
+##### pixel_width		- the width of the spectrogram image [pixels]
+##### pixel_height		- the height of the spectrogram image [pixels]
+##### min_hop			- the smallest hop (i.e. the non-adaptive NFFT - noverlap)
+##### max_pad_to		- the largest (zero-padded) FFT length (i.e. the non-adaptive pad_to)
+#####
+### Returns:
+##### noverlap			- the number of samples by which frames overlap
+##### pad_to			- the (zero-padded) FFT length
+##### frames_per_column	- the number of consecutive frames averaged into each column
+######################################################################
+######################################################################
+def get_adaptive_resolution(num_samples, NFFT, Fs, max_frequency, pixel_width, pixel_height, min_hop, max_pad_to):
+	samples_per_column = num_samples / float(max(pixel_width, 1) * ADAPTIVE_RESOLUTION_OVERSAMPLING)
+	hop = int(max(min(samples_per_column, NFFT // 2), min_hop, 1))
+	frames_per_column = max(int(samples_per_column // hop), 1)
+
+	if max_frequency is None or max_frequency <= 0 or max_frequency > Fs / 2.:
+		max_frequency = Fs / 2.
+	### Bins at spacing Fs/pad_to: enough of them below max_frequency for every row
+	pad_to = int(math.ceil(max(pixel_height, 1) * ADAPTIVE_RESOLUTION_OVERSAMPLING * Fs / float(max_frequency)))
+	pad_to = max(min(scipy.fft.next_fast_len(pad_to, real=True), max_pad_to), NFFT)
+	return NFFT - hop, pad_to, frames_per_column
+
+######################################################################
+######################################################################
+### Get the spectrogram of (the time range of) an audio buffer from the
+##### on-disk cache (computing and storing it first, if it is not cached yet)
+#####
+##### Entries are .npy files (memory-mapped when loaded), keyed by the
+##### content hash of the audio file plus every parameter of the spectrogram,
+##### so a figure that is drawn again (e.g. after a change to its labels)
+##### neither decodes nor transforms the audio. When the entries grow beyond
+##### global_values.spectrogram_cache_max_bytes, the least recently used
+##### ones are removed.
+#####
+#####
+### Arguments:
+##### audio_buffer		- an audio_buffer_helper.AudioBuffer
+##### decimation_factor	- see get_decimation_factor
+##### NFFT				- the number of samples per frame
+##### Fs				- the sample rate of the decimated data
+##### noverlap			- the number of samples by which frames overlap
+##### pad_to			- the (zero-padded) FFT length (None means NFFT)
+##### window			- see get_window
+##### max_frequency		- the highest frequency needed (None means "up to Nyquist")
+##### num_workers		- see compute_spectrogram
+##### frames_per_column	- see compute_spectrogram
+#####
+### Returns:
+##### (same as compute_spectrogram)
+######################################################################
+######################################################################
+def get_cached_spectrogram(audio_buffer, decimation_factor, NFFT, Fs, noverlap=0, pad_to=None, window=None, max_frequency=None, num_workers=1, frames_per_column=1):
+	if pad_to is None:
+		pad_to = NFFT
+	### Key: content hash of the audio file plus the time range and every spectrogram parameter
+	##### (entries of older content are removed by build_cache_helper)
+	content_hash = build_cache_helper.get_file_content_hash(audio_buffer.wav_file_path)
+	cache_key = build_cache_helper.make_cache_key(SPECTROGRAM_CACHE_VERSION,
+													audio_buffer.start_frame,
+													audio_buffer.end_frame,
+													decimation_factor,
+													NFFT,
+													Fs,
+													noverlap,
+													pad_to,
+													None if window is None else get_window(window, NFFT).tobytes(),
+													max_frequency,
+													frames_per_column)
+	spectrogram_file_path = build_cache_helper.get_cache_dir(SPECTROGRAM_CACHE_NAMESPACE) + content_hash + '_' + cache_key + '.npy'
+
+	if os.path.isfile(spectrogram_file_path):
+		try:
+			magnitude_dB = numpy.load(spectrogram_file_path, mmap_mode='r')
+			build_cache_helper.touch_cache_entry(spectrogram_file_path)
+			build_cache_helper.count_cache_access(SPECTROGRAM_CACHE_NAMESPACE, True)
+			### (resample_poly returns ceil(num_samples / decimation_factor) samples)
+			num_frames = get_num_frames(-(-audio_buffer.get_num_samples() // decimation_factor), NFFT, noverlap)
+			freqs, times = get_spectrogram_axes(magnitude_dB.shape[0], num_frames, NFFT, Fs, noverlap, pad_to, frames_per_column)
+			if len(times) != magnitude_dB.shape[1]:
+				raise Exception("file '" + spectrogram_file_path + "' does not match its spectrogram parameters")
+			return magnitude_dB, freqs, times
+		except Exception:
+			### Unreadable entries are recomputed below
+			pass
+	build_cache_helper.count_cache_access(SPECTROGRAM_CACHE_NAMESPACE, False)
+
+	data = decimate(audio_buffer.get_data(), decimation_factor)
+	magnitude_dB, freqs, times = compute_spectrogram(data, NFFT=NFFT, Fs=Fs, noverlap=noverlap, pad_to=pad_to, window=window, max_frequency=max_frequency, num_workers=num_workers, frames_per_column=frames_per_column)
+
+	tmp_file_path = build_cache_helper.get_temporary_file_path(spectrogram_file_path)
+	with open(tmp_file_path, 'wb') as f:
+		numpy.save(f, magnitude_dB)
+	os.replace(tmp_file_path, spectrogram_file_path)
+	build_cache_helper.evict_least_recently_used(SPECTROGRAM_CACHE_NAMESPACE, global_values.spectrogram_cache_max_bytes, spectrogram_file_path)
+	return magnitude_dB, freqs, times
+
+######################################################################
+######################################################################
+### Make the transform which evaluates the first num_freqs bins of the
+##### zero-padded FFT of length pad_to (a zoom FFT if only a small fraction
+##### of the bins is requested, otherwise a real FFT whose upper bins are dropped)
+#####
+#####
+### Arguments:
+##### NFFT				- the number of samples per frame
+##### num_freqs			- the number of bins to evaluate (from 0 Hz upwards)
+##### pad_to			- the (zero-padded) FFT length whose bins are evaluated
+##### use_zoom_fft		- True/False to force/forbid the zoom FFT (None decides
+#####						by ZOOM_FFT_MAX_FRACTION)
+#####
+### Returns:
+##### function			- (windowed frames, shape (frames, NFFT)) -> spectra of shape
+#####						(frames, num_freqs), whose magnitudes are those of the FFT bins
+######################################################################
+######################################################################
+def make_transform(NFFT, num_freqs, pad_to, use_zoom_fft=None):
+	if use_zoom_fft is None:
+		use_zoom_fft = num_freqs < ZOOM_FFT_MAX_FRACTION * (pad_to // 2 + 1)
+	if use_zoom_fft:
+		return make_zoom_fft(NFFT, num_freqs, pad_to)
+	return lambda windowed_frames: scipy.fft.rfft(windowed_frames, n=pad_to, axis=1)[:, :num_freqs]
+
+######################################################################
+######################################################################
+### Make a zoom FFT (a chirp-z transform, computed with Bluestein's
+##### algorithm) which evaluates only the first num_freqs bins of the
+##### zero-padded FFT of length pad_to
+#####
+##### The chirps are computed once (in float64, then stored as complex64), so
+##### transforming a block of frames costs two complex FFTs of length
+##### next_fast_len(NFFT + num_freqs - 1) per frame, instead of a real FFT of
+##### length pad_to. The final chirp multiplication (a phase rotation) is
+##### skipped, so only the magnitudes of the result are meaningful.
+#####
+#####
+### Arguments:
+##### NFFT				- the number of samples per frame
+##### num_freqs			- the number of bins to evaluate (from 0 Hz upwards)
+##### pad_to			- the (zero-padded) FFT length whose bins are evaluated
+#####
+### Returns:
+##### function			- (windowed frames, shape (frames, NFFT)) -> spectra of shape
+#####						(frames, num_freqs), with the magnitudes of the FFT bins
+######################################################################
+######################################################################
+def make_zoom_fft(NFFT, num_freqs, pad_to):
+	fft_length = scipy.fft.next_fast_len(NFFT + num_freqs - 1)
+	### W^(n^2 / 2) with W = exp(-2 pi i / pad_to); n^2 is reduced modulo
+		# 2 * pad_to first, so the phases stay exact for long frames
+	n = numpy.arange(max(NFFT, num_freqs), dtype=numpy.int64)
+	chirp_phases = numpy.pi * ((n * n) % (2 * pad_to)) / pad_to
+	input_chirp = numpy.exp(-1j * chirp_phases[:NFFT]).astype(numpy.complex64)
+	### The (circular) convolution kernel W^(-j^2 / 2) for j = -(NFFT - 1) ... num_freqs - 1
+	kernel = numpy.zeros(fft_length, dtype=numpy.complex128)
+	kernel[:num_freqs] = numpy.exp(1j * chirp_phases[:num_freqs])
+	kernel[fft_length - NFFT + 1:] = numpy.exp(1j * chirp_phases[1:NFFT])[::-1]
+	kernel_spectrum = scipy.fft.fft(kernel).astype(numpy.complex64)
+
+	def zoom_fft(windowed_frames):
+		spectra = scipy.fft.fft(windowed_frames * input_chirp, n=fft_length, axis=1)
+		spectra *= kernel_spectrum
+		return scipy.fft.ifft(spectra, axis=1, overwrite_x=True)[:, :num_freqs]
+	return zoom_fft
+
+######################################################################
+######################################################################
+### Get the frequency extent of a spectrogram image, drawn the way
+##### matplotlib's specgram draws it (the rows of the whole band, from the
+##### lowest frequency to the Nyquist frequency, are stretched over that
+##### range), even if only the lower rows were computed
+#####
+#####
+### Arguments:
+##### freqs				- the frequencies of the computed rows (see compute_spectrogram)
+##### Fs				- the sample rate of the data
+##### pad_to			- the (zero-padded) FFT length
+#####
+### Returns:
+##### tuple				- the bottom and top of the image [Hz]
+######################################################################
+######################################################################
+def get_frequency_extent(freqs, Fs, pad_to):
+	num_all_freqs = pad_to // 2 + 1
+	highest_freq = (num_all_freqs - 1) * Fs / float(pad_to)
+	row_height = (highest_freq - freqs[0]) / num_all_freqs
+	return freqs[0], freqs[0] + len(freqs) * row_height
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python3
+#%############################################################
+#%Regular package imports here
+#%############################################################
+import math
+import numpy
+import os
+#%############################################################
+#% Local file imports here
+#%############################################################
+import audio_file_helper
+import build_cache_helper
+import global_values
+import spectrogram_helper
+
+######################################################################
+# constants
+######################################################################
+
+### Number of (time) columns per tile
+TILE_NUM_COLUMNS = 512
+
+### Largest number of frames transformed at a time while computing a tile
+##### (bounds the memory of the decoded audio, whatever the zoom level)
+TILE_CHUNK_FRAMES = 8192
+
+### Number of extra (decimated) samples read on both sides of a chunk, so the
+##### anti-aliasing filter of the decimation sees the same neighbourhood as it
+##### would in the whole file (and the chunks join without edge effects)
+TILE_DECIMATION_MARGIN = 32
+
+### Cache namespace of the tile sets (one sub-directory per file and parameters,
+##### removed as a whole when the namespace exceeds global_values.spectrogram_tiles_max_bytes)
+SPECTROGRAM_TILES_NAMESPACE = 'spectrogram_tiles'
+
+### Part of every tile set key; increase it whenever the tiles change
+SPECTROGRAM_TILES_VERSION = 1
+
+######################################################################
+
+class SpectrogramTileSet:
+	"""
+	a class to store the spectrogram of a whole .wav file as a pyramid of
+	fixed-size tiles on disk. level 0 has one column per STFT frame (the
+	frames overlap by half a window), and each further level averages twice
+	as many frames into a column (see spectrogram_helper.compute_spectrogram),
+	so a tile of level L spans 2**L times the duration of a tile of level 0.
+	tiles are computed (and stored) the first time they are needed, each
+	directly from the audio it covers, so a view of any time range only costs
+	the tiles covering it, at the level which matches the output resolution.
+	"""
+
+	# ---------------------------------------------------------------------- #
+
+	def __init__(self, wav_file, decimation_factor, NFFT, pad_to, max_frequency=None, num_workers=1):
+		"""
+		@param wav_file a wav_file_helper.WavFile
+		@param decimation_factor see spectrogram_helper.get_decimation_factor
+		@param NFFT the number of (decimated) samples per frame
+		@param pad_to the (zero-padded) FFT length
+		@param max_frequency the highest frequency needed (None means "up to Nyquist")
+		@param num_workers see spectrogram_helper.compute_spectrogram
+		"""
+		self.wav_file = wav_file
+		self.decimation_factor = decimation_factor
+		self.Fs = wav_file.sample_rate / float(decimation_factor)
+		self.NFFT = NFFT
+		self.hop = max(NFFT // 2, 1)
+		self.noverlap = NFFT - self.hop
+		self.pad_to = pad_to
+		self.max_frequency = max_frequency
+		self.num_workers = num_workers
+		### Whether get_tile computed (and stored) any tile, so the size of the
+		##### namespace has to be checked
+		self.has_new_tiles = False
+		### (resample_poly returns ceil(num_frames / decimation_factor) samples)
+		self.num_samples = -(-wav_file.num_frames // decimation_factor)
+		self.num_frames = spectrogram_helper.get_num_frames(self.num_samples, NFFT, self.noverlap)
+
+		### Key: content hash of the audio file plus every spectrogram parameter
+		##### (tile sets of older content are removed by build_cache_helper)
+		content_hash = build_cache_helper.get_file_content_hash(wav_file.wav_file_path)
+		self.tiles_dir = build_cache_helper.get_cache_dir(SPECTROGRAM_TILES_NAMESPACE) + content_hash + '_' \
+							+ build_cache_helper.make_cache_key(SPECTROGRAM_TILES_VERSION,
+																decimation_factor,
+																NFFT,
+																self.hop,
+																pad_to,
+																max_frequency,
+																TILE_NUM_COLUMNS) + '/'
+
+	# ---------------------------------------------------------------------- #
+
+	def get_num_levels(self):
+		"""
+		@return the number of zoom levels (the last one fits the whole file
+			into a single tile)
+		"""
+		return max(int(math.ceil(math.log2(self.num_frames / float(TILE_NUM_COLUMNS)))), 0) + 1
+
+	# ---------------------------------------------------------------------- #
+
+	def select_level(self, num_visible_frames, pixel_width, columns_per_pixel=spectrogram_helper.ADAPTIVE_RESOLUTION_OVERSAMPLING):
+		"""
+		@param num_visible_frames the number of (level 0) frames spanning the output
+		@param pixel_width the width of the output [pixels]
+		@param columns_per_pixel the minimum number of columns per pixel
+		@return the coarsest level which still has at least columns_per_pixel
+			columns per pixel (or level 0)
+		"""
+		max_frames_per_column = num_visible_frames / float(max(pixel_width, 1) * columns_per_pixel)
+		if max_frames_per_column < 2:
+			return 0
+		return min(int(math.floor(math.log2(max_frames_per_column))), self.get_num_levels() - 1)
+
+	# ---------------------------------------------------------------------- #
+
+	def get_tile(self, level, tile_index):
+		"""
+		@param level
+		@param tile_index
+		@return the (memory-mapped) tile, a (float32) array of shape
+			(frequencies, columns) in dB. only the last tile of a level has
+			fewer than TILE_NUM_COLUMNS columns.
+		"""
+		tile_file_path = self.tiles_dir + 'level' + str(level) + '_' + str(tile_index) + '.npy'
+		if os.path.isfile(tile_file_path):
+			try:
+				tile = numpy.load(tile_file_path, mmap_mode='r')
+				build_cache_helper.count_cache_access(SPECTROGRAM_TILES_NAMESPACE, True)
+				return tile
+			except Exception:
+				### Unreadable tiles are recomputed below
+				pass
+
+		build_cache_helper.count_cache_access(SPECTROGRAM_TILES_NAMESPACE, False)
+		tile = self.compute_columns(level, tile_index * TILE_NUM_COLUMNS, (tile_index + 1) * TILE_NUM_COLUMNS)
+		tmp_file_path = build_cache_helper.get_temporary_file_path(tile_file_path)
+		with open(tmp_file_path, 'wb') as f:
+			numpy.save(f, tile)
+		os.replace(tmp_file_path, tile_file_path)
+		self.has_new_tiles = True
+		return tile
+
+	# ---------------------------------------------------------------------- #
+
+	def compute_columns(self, level, start_column, end_column):
+		"""
+		internally used ("pseudo-private") function to compute columns of a
+		level from the audio, in chunks of at most TILE_CHUNK_FRAMES frames
+		(or of a single column, if that is larger)
+		@param level
+		@param start_column the first column
+		@param end_column the column after the last one
+		@return a (float32) array of shape (frequencies, columns) in dB
+		"""
+		frames_per_column = 2**level
+		columns_per_chunk = max(TILE_CHUNK_FRAMES // frames_per_column, 1)
+		end_frame = min(end_column * frames_per_column, self.num_frames)
+		chunks = []
+		for chunk_start_column in range(start_column, end_column, columns_per_chunk):
+			chunk_start_frame = chunk_start_column * frames_per_column
+			chunk_end_frame = min((chunk_start_column + columns_per_chunk) * frames_per_column, end_frame)
+			if chunk_end_frame <= chunk_start_frame:
+				break
+			chunk_magnitude_dB, _, _ = spectrogram_helper.compute_spectrogram(self.read_samples(chunk_start_frame * self.hop, (chunk_end_frame - 1) * self.hop + self.NFFT),
+																				NFFT=self.NFFT,
+																				Fs=self.Fs,
+																				noverlap=self.noverlap,
+																				pad_to=self.pad_to,
+																				max_frequency=self.max_frequency,
+																				num_workers=self.num_workers,
+																				frames_per_column=frames_per_column)
+			chunks.append(chunk_magnitude_dB)
+		return numpy.ascontiguousarray(numpy.concatenate(chunks, axis=1))
+
+	# ---------------------------------------------------------------------- #
+
+	def read_samples(self, start_sample, end_sample):
+		"""
+		internally used ("pseudo-private") function to read and decimate a
+		range of (decimated) samples, with TILE_DECIMATION_MARGIN samples of
+		context on both sides
+		@param start_sample the first (decimated) sample
+		@param end_sample the (decimated) sample after the last one
+		@return the (float32) decimated samples
+		"""
+		end_sample = min(end_sample, self.num_samples)
+		read_start_sample = max(start_sample - TILE_DECIMATION_MARGIN, 0)
+		read_end_sample = min(end_sample + TILE_DECIMATION_MARGIN, self.num_samples)
+		data = audio_file_helper.get_mono_data(self.wav_file, read_start_sample * self.decimation_factor, read_end_sample * self.decimation_factor)
+		data = spectrogram_helper.decimate(data, self.decimation_factor)
+		return data[start_sample - read_start_sample:end_sample - read_start_sample]
+
+	# ---------------------------------------------------------------------- #
+
+	def get_spectrogram(self, start_frame, end_frame, pixel_width):
+		"""
+		assemble the spectrogram of a time range from the tiles covering it
+		@param start_frame the first frame (sample) of the .wav file in the range
+		@param end_frame the frame (sample) of the .wav file after the last one in the range
+		@param pixel_width the width of the output [pixels]
+		@return a tuple containing the spectrogram in dB (a float32 array of
+			shape (frequencies, columns)), the frequency of each row [Hz] and
+			the time of each column (the mean of its frame midpoints),
+			relative to the start of the file [s]
+		"""
+		### The STFT frames whose midpoints lie within the range
+		first_frame = min(max(int(math.ceil((start_frame / float(self.decimation_factor) - self.NFFT / 2.) / self.hop)), 0), self.num_frames - 1)
+		last_frame = min(max(int(math.floor((end_frame / float(self.decimation_factor) - self.NFFT / 2.) / self.hop)), first_frame), self.num_frames - 1)
+
+		level = self.select_level(last_frame - first_frame + 1, pixel_width)
+		frames_per_column = 2**level
+		first_column = first_frame // frames_per_column
+		last_column = last_frame // frames_per_column
+		first_tile = first_column // TILE_NUM_COLUMNS
+		tiles = [self.get_tile(level, tile_index) for tile_index in range(first_tile, last_column // TILE_NUM_COLUMNS + 1)]
+		magnitude_dB = numpy.concatenate(tiles, axis=1)[:, first_column - first_tile * TILE_NUM_COLUMNS:last_column - first_tile * TILE_NUM_COLUMNS + 1]
+
+		### The tile set is one cache entry (a directory), used as a whole: mark it
+		##### as recently used, and remove the least recently used other tile sets
+		##### once new tiles grew the namespace (at most once per view)
+		build_cache_helper.touch_cache_entry(self.tiles_dir)
+		if self.has_new_tiles:
+			self.has_new_tiles = False
+			build_cache_helper.evict_least_recently_used(SPECTROGRAM_TILES_NAMESPACE, global_values.spectrogram_tiles_max_bytes, self.tiles_dir)
+
+		freqs = numpy.fft.rfftfreq(self.pad_to, 1. / self.Fs)[:magnitude_dB.shape[0]]
+		columns = numpy.arange(first_column, last_column + 1)
+		mean_frames = (columns * frames_per_column + numpy.minimum((columns + 1) * frames_per_column, self.num_frames) - 1) / 2.
+		times = (mean_frames * self.hop + self.NFFT / 2.) / self.Fs
+		return magnitude_dB, freqs, times
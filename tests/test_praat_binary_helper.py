@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python3
+#%############################################################
+#%Regular package imports here
+#%############################################################
+import numpy
+import os
+import sys
+import unittest
+#%############################################################
+#% Local file imports here
+#%############################################################
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import praatUtil
+import praat_binary_helper
+
+######################################################################
+# constants
+######################################################################
+
+### Directory of the test files: hand_built.PitchTier, hand_built.Formant and
+##### hand_built.TextGrid, written byte by byte (big-endian numbers, 8-bit and
+##### 16-bit string lengths, and UTF-16 strings behind an all-ones length);
+##### Praat (6.1.38) reads them, and saves them again byte for byte
+TEST_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data') + '/'
+
+######################################################################
+
+class PraatBinaryTest(unittest.TestCase):
+	"""
+	reads the hand-built Praat binary files with praat_binary_helper (and
+	praatUtil), and checks every value in them
+	"""
+
+	# ---------------------------------------------------------------------- #
+
+	def test_reads_pitch_tier(self):
+		self.assertTrue(praat_binary_helper.is_praat_binary_file(TEST_DATA_DIR + 'hand_built.PitchTier'))
+		self.assertEqual(praat_binary_helper.get_praat_binary_class_name(TEST_DATA_DIR + 'hand_built.PitchTier'), 'PitchTier')
+		xmin, xmax, times, values = praat_binary_helper.read_binary_tier(TEST_DATA_DIR + 'hand_built.PitchTier')
+		self.assertEqual((xmin, xmax), (0.0, 0.5))
+		numpy.testing.assert_array_equal(times, [0.1, 0.25, 0.4])
+		numpy.testing.assert_array_equal(values, [120.0, 150.5, 98.25])
+
+	# ---------------------------------------------------------------------- #
+
+	def test_reads_pitch_tier_header_with_praatUtil(self):
+		### (the header holds the times of the tier, not of its first and last points)
+		dataX, dataY, metaData = praatUtil.readPraatShortTextFile(TEST_DATA_DIR + 'hand_built.PitchTier', 'PitchTier')
+		self.assertEqual([float(value) for value in metaData], [0.0, 0.5, 3.0])
+		numpy.testing.assert_array_equal(dataX, [0.1, 0.25, 0.4])
+		numpy.testing.assert_array_equal(dataY, [120.0, 150.5, 98.25])
+
+	# ---------------------------------------------------------------------- #
+
+	def test_reads_formant(self):
+		formant = praat_binary_helper.read_binary_formant(TEST_DATA_DIR + 'hand_built.Formant')
+		self.assertEqual((formant['xmin'], formant['xmax'], formant['nx'], formant['dx'], formant['x1']), (0.0, 0.1, 2, 0.025, 0.0375))
+		self.assertEqual(formant['maxnFormants'], 3)
+		numpy.testing.assert_array_equal(formant['intensities'], [1e-3, 2e-3])
+		self.assertEqual(len(formant['formants']), 2)
+		numpy.testing.assert_array_equal(formant['formants'][0], [[500.0, 80.0], [1500.0, 120.0]])
+		numpy.testing.assert_array_equal(formant['formants'][1], [[700.0, 90.0], [1100.0, 110.0], [2600.0, 150.0]])
+
+	# ---------------------------------------------------------------------- #
+
+	def test_reads_text_grid(self):
+		xmin, xmax, tiers = praat_binary_helper.read_binary_text_grid(TEST_DATA_DIR + 'hand_built.TextGrid')
+		self.assertEqual((xmin, xmax), (0.0, 1.0))
+		self.assertEqual(tiers, [
+			{'class':'IntervalTier', 'name':'vowels', 'xmin':0.0, 'xmax':1.0, 'items':[(0.0, 0.42, 'a'), (0.42, 0.58, ''), (0.58, 1.0, 'əʊ')]},
+			{'class':'TextTier', 'name':'péaks', 'xmin':0.0, 'xmax':1.0, 'items':[(0.5, 'gap')]},
+		])
+
+	# ---------------------------------------------------------------------- #
+
+	def test_rejects_other_classes(self):
+		with self.assertRaises(Exception):
+			praat_binary_helper.read_binary_formant(TEST_DATA_DIR + 'hand_built.PitchTier')
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python3
+#%############################################################
+#%Regular package imports here
+#%############################################################
+import numpy
+import os
+import sys
+import unittest
+#%############################################################
+#% Local file imports here
+#%############################################################
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import praatUtil
+import praat_formant_helper
+
+######################################################################
+# constants
+######################################################################
+
+### Directory of the test files: vowels.wav (1 s of two synthetic vowels,
+##### 16 kHz, 16-bit mono) and the Formant Praat (6.1.38) made of it
+##### ("To Formant (burg)... 0 5 5500 0.025 50", saved as a short text file)
+TEST_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data') + '/'
+
+### Largest accepted differences to Praat's formant frequencies and
+##### bandwidths [Hz], and (relative) to the intensities of the frames
+FORMANT_FREQUENCY_TOLERANCE = 1e-4
+FORMANT_BANDWIDTH_TOLERANCE = 1e-3
+FORMANT_INTENSITY_TOLERANCE = 1e-9
+
+######################################################################
+
+class PraatFormantTest(unittest.TestCase):
+	"""
+	compares praat_formant_helper.calculate_formants with the Formant Praat
+	itself computed (including the frames of the silence between the vowels,
+	whose formants are as erratic in Praat)
+	"""
+
+	# ---------------------------------------------------------------------- #
+
+	def test_matches_praat_formants(self):
+		praat_formants = praatUtil.PraatFormants()
+		praat_formants.readFile(TEST_DATA_DIR + 'vowels.Formant')
+		praat_arrays = praat_formants.get_formant_arrays()
+		formants = praatUtil.PraatFormants()
+		formants.set_formant_data(praat_formant_helper.calculate_formants(TEST_DATA_DIR + 'vowels.wav'))
+		arrays = formants.get_formant_arrays()
+
+		numpy.testing.assert_allclose(arrays['sampling'], praat_arrays['sampling'], rtol=0, atol=1e-12)
+		numpy.testing.assert_allclose(arrays['intensities'], praat_arrays['intensities'], rtol=FORMANT_INTENSITY_TOLERANCE)
+		### (the same number of formants in every frame)
+		self.assertEqual(arrays['formants'].shape, praat_arrays['formants'].shape)
+		numpy.testing.assert_array_equal(numpy.isnan(arrays['formants']), numpy.isnan(praat_arrays['formants']))
+		numpy.testing.assert_allclose(arrays['formants'][:, :, 0], praat_arrays['formants'][:, :, 0], rtol=0, atol=FORMANT_FREQUENCY_TOLERANCE)
+		numpy.testing.assert_allclose(arrays['formants'][:, :, 1], praat_arrays['formants'][:, :, 1], rtol=0, atol=FORMANT_BANDWIDTH_TOLERANCE)
+		self.assertGreater(numpy.count_nonzero(~numpy.isnan(praat_arrays['formants'][:, :, 0])), 500)
+
+if __name__ == '__main__':
+	unittest.main()
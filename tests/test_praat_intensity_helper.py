@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python3
+#%############################################################
+#%Regular package imports here
+#%############################################################
+import os
+import sys
+import unittest
+#%############################################################
+#% Local file imports here
+#%############################################################
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import praat_intensity_helper
+
+######################################################################
+# constants
+######################################################################
+
+### Directory of the test files: vowels.wav (1 s of two synthetic vowels,
+##### 16 kHz, 16-bit mono), vowels_stereo.wav (the same vowels on the left,
+##### two other vowels on the right) and the IntensityTiers Praat (6.1.38)
+##### made of them ("To Intensity: 100, 0, "yes"", "Down to IntensityTier",
+##### saved as short text files)
+TEST_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data') + '/'
+
+### Largest accepted differences to Praat's intensities [dB] and times [s]
+INTENSITY_TOLERANCE_DB = 1e-4
+INTENSITY_TIME_TOLERANCE = 1e-9
+
+######################################################################
+
+class PraatIntensityTest(unittest.TestCase):
+	"""
+	compares praat_intensity_helper.calculate_intensity_tier with the
+	IntensityTiers Praat itself computed
+	"""
+
+	# ---------------------------------------------------------------------- #
+
+	def assert_matches_praat_intensity(self, name):
+		"""
+		@param name the name of the .wav file and IntensityTier (without extension)
+		"""
+		comparison = praat_intensity_helper.compare_to_praat_intensity(TEST_DATA_DIR + name + '.wav', TEST_DATA_DIR + name + '.IntensityTier')
+		self.assertGreater(comparison['num_compared'], 100)
+		self.assertLess(comparison['max_abs_dB_difference'], INTENSITY_TOLERANCE_DB)
+		self.assertLess(comparison['max_abs_time_difference'], INTENSITY_TIME_TOLERANCE)
+
+	# ---------------------------------------------------------------------- #
+
+	def test_matches_praat_intensity(self):
+		self.assert_matches_praat_intensity('vowels')
+
+	# ---------------------------------------------------------------------- #
+
+	def test_matches_praat_intensity_of_stereo_file(self):
+		self.assert_matches_praat_intensity('vowels_stereo')
+
+if __name__ == '__main__':
+	unittest.main()
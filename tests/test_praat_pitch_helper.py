@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python3
+#%############################################################
+#%Regular package imports here
+#%############################################################
+import numpy
+import os
+import sys
+import unittest
+#%############################################################
+#% Local file imports here
+#%############################################################
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import praatUtil
+import praat_pitch_helper
+
+######################################################################
+# constants
+######################################################################
+
+### Directory of the test files: vowels.wav (1 s of two synthetic vowels,
+##### 16 kHz, 16-bit mono), vowels_stereo.wav (the same vowels on the left,
+##### two other vowels on the right) and the PitchTiers Praat (6.1.38) made
+##### of them ("To Pitch (ac)... 0 75 15 no 0.03 0.45 0.01 0.35 0.14 600",
+##### or "yes" for the _very_accurate ones, "Down to PitchTier", saved as
+##### short text files)
+TEST_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data') + '/'
+
+### Largest accepted differences to Praat's pitches [Hz] and times [s]
+PITCH_TOLERANCE = 1e-5
+PITCH_TIME_TOLERANCE = 1e-9
+
+######################################################################
+
+class PraatPitchTest(unittest.TestCase):
+	"""
+	compares praat_pitch_helper.calculate_pitch_tier with the PitchTiers
+	Praat itself computed
+	"""
+
+	# ---------------------------------------------------------------------- #
+
+	def assert_matches_praat_pitch(self, name, very_accurate=False):
+		"""
+		@param name the name of the .wav file (without extension)
+		@param very_accurate whether the Gaussian window is used
+		"""
+		praat_times, praat_pitches = praatUtil.readPitchTier(TEST_DATA_DIR + name + ('_very_accurate' if very_accurate else '') + '.PitchTier')
+		times, pitches = praat_pitch_helper.calculate_pitch_tier(TEST_DATA_DIR + name + '.wav', very_accurate=very_accurate)
+		self.assertGreater(len(praat_times), 50)
+		self.assertEqual(len(times), len(praat_times))
+		self.assertLess(numpy.abs(times - praat_times).max(), PITCH_TIME_TOLERANCE)
+		self.assertLess(numpy.abs(pitches - praat_pitches).max(), PITCH_TOLERANCE)
+
+	# ---------------------------------------------------------------------- #
+
+	def test_matches_praat_pitch(self):
+		self.assert_matches_praat_pitch('vowels')
+
+	# ---------------------------------------------------------------------- #
+
+	def test_matches_very_accurate_praat_pitch(self):
+		self.assert_matches_praat_pitch('vowels', very_accurate=True)
+
+	# ---------------------------------------------------------------------- #
+
+	def test_matches_praat_pitch_of_stereo_file(self):
+		self.assert_matches_praat_pitch('vowels_stereo')
+
+	# ---------------------------------------------------------------------- #
+
+	def test_matches_very_accurate_praat_pitch_of_stereo_file(self):
+		self.assert_matches_praat_pitch('vowels_stereo', very_accurate=True)
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python3
+#%############################################################
+#%Regular package imports here
+#%############################################################
+import os
+import sys
+import unittest
+#%############################################################
+#% Local file imports here
+#%############################################################
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import audio_file_helper
+import praat_spectrogram_helper
+import wav_file_helper
+
+######################################################################
+# constants
+######################################################################
+
+### Directory of the test files: vowels.wav (1 s of two synthetic vowels,
+##### 16 kHz, 16-bit mono) and the Spectrogram Praat (6.1.38) made of it
+##### ("To Spectrogram: 0.005, 5000, 0.02, 100, "Gaussian"", saved as a
+##### short text file)
+TEST_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data') + '/'
+
+### Largest accepted difference to Praat's power [dB] (the power is float32)
+SPECTROGRAM_TOLERANCE_DB = 1e-3
+
+######################################################################
+
+class PraatSpectrogramTest(unittest.TestCase):
+	"""
+	compares praat_spectrogram_helper.compute_praat_spectrogram with the
+	spectrogram Praat itself computed
+	"""
+
+	# ---------------------------------------------------------------------- #
+
+	def test_matches_praat_spectrogram(self):
+		with wav_file_helper.WavFile(TEST_DATA_DIR + 'vowels.wav') as wav_file:
+			data = audio_file_helper.get_channel_data(wav_file)[:, 0]
+			sample_rate = wav_file.sample_rate
+		comparison = praat_spectrogram_helper.compare_to_praat_spectrogram(data,
+																			sample_rate,
+																			TEST_DATA_DIR + 'vowels.Spectrogram',
+																			window_length=0.005,
+																			frequency_step=100.)
+		self.assertGreater(comparison['num_compared'], 1000)
+		self.assertLess(comparison['max_abs_dB_difference'], SPECTROGRAM_TOLERANCE_DB)
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,307 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python3
+#%############################################################
+#%Regular package imports here
+#%############################################################
+import mmap
+import numpy
+import os
+import struct
+
+######################################################################
+# constants
+######################################################################
+
+### Format codes found in the 'fmt ' chunk of a RIFF/WAVE file
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+######################################################################
+
+class WavFile:
+	"""
+	a class to read RIFF/WAVE files without decoding them. The header is
+	parsed once, the data chunk is memory-mapped, and frame ranges are
+	returned as numpy arrays which (for 16-bit and 32-bit PCM and for
+	float data) are zero-copy views into the file.
+	"""
+
+	# ---------------------------------------------------------------------- #
+
+	def __init__(self, wav_file_path):
+		"""
+		@param wav_file_path the full path of the .wav file
+		"""
+		self.wav_file_path = wav_file_path
+		self.audio_format = None
+		self.channels = None
+		self.sample_rate = None
+		self.bit_depth = None
+		self.block_align = None
+		self.data_offset = None
+		self.data_size = None
+		self.num_frames = None
+		self._mmap = None
+		self.read_header()
+
+	# ---------------------------------------------------------------------- #
+
+	def read_header(self):
+		"""
+		parse the RIFF chunk list up to (and including) the position of the
+		'data' chunk. no sample data is read.
+		"""
+		with open(self.wav_file_path, 'rb') as f:
+			riff_header = f.read(12)
+			if len(riff_header) < 12 or riff_header[0:4] != b'RIFF' or riff_header[8:12] != b'WAVE':
+				raise Exception("file '" + self.wav_file_path + "' is not a RIFF/WAVE file")
+			file_size = os.fstat(f.fileno()).st_size
+			while True:
+				chunk_header = f.read(8)
+				if len(chunk_header) < 8:
+					break
+				chunk_id, chunk_size = struct.unpack('<4sI', chunk_header)
+				if chunk_id == b'fmt ':
+					self.decode_fmt_chunk(f.read(chunk_size))
+					### Chunks are word-aligned (odd sizes are followed by a pad byte)
+					if chunk_size % 2 == 1:
+						f.seek(1, os.SEEK_CUR)
+				elif chunk_id == b'data':
+					self.data_offset = f.tell()
+					### Streamed files may leave the data size unset (or too large)
+					self.data_size = min(chunk_size, file_size - self.data_offset)
+					break
+				else:
+					f.seek(chunk_size + (chunk_size % 2), os.SEEK_CUR)
+		if self.audio_format is None:
+			raise Exception("file '" + self.wav_file_path + "' has no 'fmt ' chunk")
+		if self.data_offset is None:
+			raise Exception("file '" + self.wav_file_path + "' has no 'data' chunk")
+		self.num_frames = self.data_size // self.block_align
+
+	# ---------------------------------------------------------------------- #
+
+	def decode_fmt_chunk(self, fmt_chunk):
+		"""
+		internally used ("pseudo-private") function to decode the contents
+		of the 'fmt ' chunk
+		@param fmt_chunk the raw bytes of the 'fmt ' chunk
+		"""
+		if len(fmt_chunk) < 16:
+			raise Exception("file '" + self.wav_file_path + "' has an invalid 'fmt ' chunk")
+		self.audio_format, self.channels, self.sample_rate, _, self.block_align, self.bit_depth = struct.unpack('<HHIIHH', fmt_chunk[:16])
+		### WAVE_FORMAT_EXTENSIBLE stores the real format code in the first
+		##### two bytes of the sub-format GUID
+		if self.audio_format == WAVE_FORMAT_EXTENSIBLE and len(fmt_chunk) >= 26:
+			self.audio_format = struct.unpack('<H', fmt_chunk[24:26])[0]
+		if self.audio_format == WAVE_FORMAT_PCM:
+			if self.bit_depth not in (8, 16, 24, 32):
+				raise Exception("file '" + self.wav_file_path + "' has an unsupported PCM bit depth (" + str(self.bit_depth) + ")")
+		elif self.audio_format == WAVE_FORMAT_IEEE_FLOAT:
+			if self.bit_depth not in (32, 64):
+				raise Exception("file '" + self.wav_file_path + "' has an unsupported float bit depth (" + str(self.bit_depth) + ")")
+		else:
+			raise Exception("file '" + self.wav_file_path + "' has an unsupported format code (" + str(self.audio_format) + ")")
+
+	# ---------------------------------------------------------------------- #
+
+	def is_float(self):
+		"""
+		@return True if the samples are IEEE floats, False if they are PCM
+		"""
+		return self.audio_format == WAVE_FORMAT_IEEE_FLOAT
+
+	# ---------------------------------------------------------------------- #
+
+	def get_duration(self):
+		"""
+		@return the duration of the file [s]
+		"""
+		return self.num_frames / float(self.sample_rate)
+
+	# ---------------------------------------------------------------------- #
+
+	def time_to_frame(self, seconds):
+		"""
+		@param seconds a time offset [s]; negative values mean "end of file"
+		@return the index of the frame at (or just before) that time offset,
+			clipped to the length of the file
+		"""
+		if seconds is None or seconds < 0:
+			return self.num_frames
+		return min(max(int(round(seconds * self.sample_rate)), 0), self.num_frames)
+
+	# ---------------------------------------------------------------------- #
+
+	def get_mmap(self):
+		"""
+		@return the (lazily created, read-only) memory-map of the whole file
+		"""
+		if self._mmap is None:
+			with open(self.wav_file_path, 'rb') as f:
+				self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+		return self._mmap
+
+	# ---------------------------------------------------------------------- #
+
+	def read_raw_frames(self, start_frame=0, end_frame=-1):
+		"""
+		@param start_frame the first frame to read
+		@param end_frame the frame after the last frame to read (-1 means
+			"end of file")
+		@return a zero-copy numpy view of shape (frames, channels) onto the
+			memory-mapped data chunk, in the file's storage type (24-bit PCM
+			is returned as bytes, shape (frames, channels, 3))
+		"""
+		if end_frame is None or end_frame < 0 or end_frame > self.num_frames:
+			end_frame = self.num_frames
+		start_frame = min(max(start_frame, 0), end_frame)
+		num_frames = end_frame - start_frame
+		offset = self.data_offset + start_frame * self.block_align
+		bytes_per_sample = self.bit_depth // 8
+		if self.is_float():
+			dtype = numpy.dtype('<f' + str(bytes_per_sample))
+		elif self.bit_depth == 8:
+			dtype = numpy.dtype('u1')
+		elif self.bit_depth == 24:
+			raw = numpy.frombuffer(self.get_mmap(), dtype='u1', count=num_frames * self.block_align, offset=offset)
+			return raw.reshape(num_frames, self.block_align)[:, :self.channels * 3].reshape(num_frames, self.channels, 3)
+		else:
+			dtype = numpy.dtype('<i' + str(bytes_per_sample))
+		raw = numpy.frombuffer(self.get_mmap(), dtype=dtype, count=num_frames * self.channels, offset=offset)
+		return raw.reshape(num_frames, self.channels)
+
+	# ---------------------------------------------------------------------- #
+
+	def read_frames(self, start_frame=0, end_frame=-1):
+		"""
+		@param start_frame the first frame to read
+		@param end_frame the frame after the last frame to read (-1 means
+			"end of file")
+		@return a numpy array of shape (frames, channels). 16-bit and 32-bit
+			PCM and float data are zero-copy views onto the file. 8-bit PCM is
+			converted to signed int16, and 24-bit PCM is left-justified into
+			int32 (so that full scale matches 32-bit PCM); only the requested
+			range is converted.
+		"""
+		raw = self.read_raw_frames(start_frame, end_frame)
+		if self.is_float():
+			return raw
+		if self.bit_depth == 8:
+			return raw.astype(numpy.int16) - 128
+		if self.bit_depth == 24:
+			data = numpy.left_shift(raw[..., 0], 8, dtype=numpy.int32)
+			data |= numpy.left_shift(raw[..., 1], 16, dtype=numpy.int32)
+			data |= numpy.left_shift(raw[..., 2].astype(numpy.int32), 24)
+			return data
+		return raw
+
+	# ---------------------------------------------------------------------- #
+
+	def read_time_range(self, startTime=0.0, endTime=-1):
+		"""
+		@param startTime [s]
+		@param endTime [s]; negative values mean "end of file"
+		@return the frames between startTime and endTime, see @ref read_frames
+		"""
+		return self.read_frames(self.time_to_frame(startTime), self.time_to_frame(endTime))
+
+	# ---------------------------------------------------------------------- #
+
+	def close(self):
+		"""
+		release the memory-map. views returned earlier keep the map alive
+		until they are garbage-collected, so a map that is still in use is
+		simply dropped instead of closed.
+		"""
+		if self._mmap is not None:
+			try:
+				self._mmap.close()
+			except BufferError:
+				pass
+			self._mmap = None
+
+	# ---------------------------------------------------------------------- #
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+
+######################################################################
+######################################################################
+### Probe a .wav file: read only its header (no sample data)
+#####
+#####
+### Arguments:
+##### wav_file_path		- the full path of the .wav file
+#####
+### Returns:
+##### dict				- channels, sample_rate, bit_depth, is_float,
+#####						num_frames, and duration (in seconds)
+######################################################################
+######################################################################
+def probe_wav_file(wav_file_path):
+	wav_file = WavFile(wav_file_path)
+	return {
+		'channels':wav_file.channels,
+		'sample_rate':wav_file.sample_rate,
+		'bit_depth':wav_file.bit_depth,
+		'is_float':wav_file.is_float(),
+		'num_frames':wav_file.num_frames,
+		'duration':wav_file.get_duration(),
+	}
+
+######################################################################
+######################################################################
+### Write frames to a .wav file
+#####
+#####
+### Arguments:
+##### wav_file_path		- the full path of the new .wav file
+##### frames			- numpy array of shape (frames, channels) or (frames,),
+#####						in the representation returned by WavFile.read_frames
+#####						(signed int16 for 8-bit, left-justified int32 for 24-bit)
+##### sample_rate		- the sample rate of the new .wav file
+##### bit_depth			- the bit depth of the new .wav file
+##### is_float			- whether the samples are IEEE floats (32/64-bit) or PCM
+#####
+### Returns:
+##### (nothing)
+######################################################################
+######################################################################
+def write_wav_file(wav_file_path, frames, sample_rate, bit_depth, is_float=False):
+	frames = numpy.asarray(frames)
+	if frames.ndim == 1:
+		frames = frames.reshape(-1, 1)
+	num_frames, channels = frames.shape
+
+	if is_float:
+		data = frames.astype('<f' + str(bit_depth // 8)).tobytes()
+	elif bit_depth == 8:
+		data = (frames.astype(numpy.int16) + 128).astype(numpy.uint8).tobytes()
+	elif bit_depth == 24:
+		### Keep the three most significant bytes of the left-justified int32 samples
+		data = frames.astype('<i4').reshape(num_frames, channels, 1).view(numpy.uint8)[:, :, 1:].tobytes()
+	elif bit_depth in (16, 32):
+		data = frames.astype('<i' + str(bit_depth // 8)).tobytes()
+	else:
+		raise Exception("unsupported bit depth (" + str(bit_depth) + ")")
+
+	block_align = channels * bit_depth // 8
+	fmt_chunk = struct.pack('<HHIIHH',
+							WAVE_FORMAT_IEEE_FLOAT if is_float else WAVE_FORMAT_PCM,
+							channels,
+							sample_rate,
+							sample_rate * block_align,
+							block_align,
+							bit_depth)
+	with open(wav_file_path, 'wb') as f:
+		f.write(b'RIFF' + struct.pack('<I', 4 + (8 + len(fmt_chunk)) + (8 + len(data) + len(data) % 2)) + b'WAVE')
+		f.write(b'fmt ' + struct.pack('<I', len(fmt_chunk)) + fmt_chunk)
+		f.write(b'data' + struct.pack('<I', len(data)))
+		f.write(data)
+		if len(data) % 2 == 1:
+			f.write(b'\x00')
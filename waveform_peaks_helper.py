@@ -0,0 +1,396 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python3
+#%############################################################
+#%Regular package imports here
+#%############################################################
+import json
+import mmap
+import numpy
+import os
+import struct
+#%############################################################
+#% Local file imports here
+#%############################################################
+import global_values
+import audio_file_helper
+import build_cache_helper
+
+######################################################################
+# constants
+######################################################################
+
+### Number of samples per bucket at the finest level of the pyramid
+DEFAULT_MIN_BUCKET_SIZE = 16
+
+### Number of min/max buckets drawn per output pixel
+##### (at least 2, so the envelope is never coarser than the rendering)
+DEFAULT_BUCKETS_PER_PIXEL = 4
+
+### Number of level-0 buckets reduced at a time while reading a .wav file
+BUCKETS_PER_CHUNK = 65536
+
+### Layout of the .peaks file header (followed by the number of buckets of
+##### each level, and then the float32 minimums and maximums of each level)
+PEAKS_FILE_MAGIC = b'PYPEAKS\x00'
+PEAKS_FILE_VERSION = 1
+PEAKS_FILE_HEADER = struct.Struct('<8sIIQIII')
+
+### Cache namespace of the peak pyramids and level statistics
+##### (see get_cached_peak_pyramid and get_cached_audio_statistics)
+PEAKS_CACHE_NAMESPACE = 'peaks'
+
+######################################################################
+
+class PeakPyramid:
+	"""
+	a class to store the min/max envelope of audio samples at power-of-two
+	decimation levels. level 0 holds one (min, max) pair per
+	min_bucket_size samples, and every further level halves the number of
+	buckets (i.e. doubles the bucket size).
+	"""
+
+	# ---------------------------------------------------------------------- #
+
+	def __init__(self, levels_min, levels_max, num_samples, min_bucket_size=DEFAULT_MIN_BUCKET_SIZE, sample_rate=None, bit_depth=None):
+		"""
+		@param levels_min a list of numpy arrays, the bucket minimums of each level
+		@param levels_max a list of numpy arrays, the bucket maximums of each level
+		@param num_samples the number of samples the pyramid was built from
+		@param min_bucket_size the number of samples per bucket at level 0
+		@param sample_rate the sample rate of the source audio (if known)
+		@param bit_depth the bit depth of the source audio (if known)
+		"""
+		self.levels_min = levels_min
+		self.levels_max = levels_max
+		self.num_samples = num_samples
+		self.min_bucket_size = min_bucket_size
+		self.sample_rate = sample_rate
+		self.bit_depth = bit_depth
+
+	# ---------------------------------------------------------------------- #
+
+	@classmethod
+	def from_samples(cls, samples, min_bucket_size=DEFAULT_MIN_BUCKET_SIZE):
+		"""
+		build a pyramid from (mono) samples
+		@param samples a one-dimensional numpy array
+		@param min_bucket_size the number of samples per bucket at level 0
+			(must be a power of two)
+		@return a new PeakPyramid
+		"""
+		level_min, level_max = cls.reduce_samples(samples, min_bucket_size)
+		return cls.from_level_zero(level_min, level_max, len(samples), min_bucket_size)
+
+	# ---------------------------------------------------------------------- #
+
+	@classmethod
+	def from_wav_file(cls, wav_file, min_bucket_size=DEFAULT_MIN_BUCKET_SIZE):
+		"""
+		build a pyramid of a whole .wav file, reading it in chunks (so that
+		memory use does not depend on the length of the file)
+		@param wav_file a wav_file_helper.WavFile
+		@param min_bucket_size the number of samples per bucket at level 0
+			(must be a power of two)
+		@return a new PeakPyramid
+		"""
+		chunk_size = BUCKETS_PER_CHUNK * min_bucket_size
+		chunks_min = []
+		chunks_max = []
+		for chunk_start in range(0, wav_file.num_frames, chunk_size):
+			chunk_min, chunk_max = cls.reduce_samples(audio_file_helper.get_mono_data(wav_file, chunk_start, chunk_start + chunk_size), min_bucket_size)
+			chunks_min.append(chunk_min)
+			chunks_max.append(chunk_max)
+		if len(chunks_min) == 0:
+			raise Exception("file '" + wav_file.wav_file_path + "' contains no audio data")
+		pyramid = cls.from_level_zero(numpy.concatenate(chunks_min), numpy.concatenate(chunks_max), wav_file.num_frames, min_bucket_size)
+		pyramid.sample_rate = wav_file.sample_rate
+		pyramid.bit_depth = wav_file.bit_depth
+		return pyramid
+
+	# ---------------------------------------------------------------------- #
+
+	@classmethod
+	def from_level_zero(cls, level_min, level_max, num_samples, min_bucket_size=DEFAULT_MIN_BUCKET_SIZE):
+		"""
+		internally used ("pseudo-private") function to build all coarser
+		levels from the bucket minimums and maximums of level 0
+		@return a new PeakPyramid
+		"""
+		levels_min = [level_min]
+		levels_max = [level_max]
+		while len(levels_min[-1]) > 1:
+			levels_min.append(cls.reduce_level(levels_min[-1], numpy.minimum))
+			levels_max.append(cls.reduce_level(levels_max[-1], numpy.maximum))
+		return cls(levels_min, levels_max, num_samples, min_bucket_size)
+
+	# ---------------------------------------------------------------------- #
+
+	@staticmethod
+	def reduce_samples(samples, min_bucket_size=DEFAULT_MIN_BUCKET_SIZE):
+		"""
+		internally used ("pseudo-private") function to reduce samples to the
+		bucket minimums and maximums of level 0
+		@param samples a one-dimensional numpy array
+		@param min_bucket_size the number of samples per bucket
+		@return a tuple containing the (float32) bucket minimums and maximums
+		"""
+		samples = numpy.asarray(samples)
+		num_samples = len(samples)
+		num_full_buckets = num_samples // min_bucket_size
+		full_buckets = samples[:num_full_buckets * min_bucket_size].reshape(num_full_buckets, min_bucket_size)
+		level_min = full_buckets.min(axis=1).astype(numpy.float32)
+		level_max = full_buckets.max(axis=1).astype(numpy.float32)
+		### The last (partial) bucket is reduced on its own
+		if num_samples > num_full_buckets * min_bucket_size:
+			tail = samples[num_full_buckets * min_bucket_size:]
+			level_min = numpy.append(level_min, numpy.float32(tail.min()))
+			level_max = numpy.append(level_max, numpy.float32(tail.max()))
+		return level_min, level_max
+
+	# ---------------------------------------------------------------------- #
+
+	@staticmethod
+	def reduce_level(level, reduce_function):
+		"""
+		internally used ("pseudo-private") function to combine each pair of
+		neighbouring buckets into one bucket
+		@param level the bucket values of the finer level
+		@param reduce_function numpy.minimum or numpy.maximum
+		@return the bucket values of the next (coarser) level
+		"""
+		num_pairs = len(level) // 2
+		reduced = reduce_function(level[0:2 * num_pairs:2], level[1:2 * num_pairs:2])
+		if len(level) % 2 == 1:
+			reduced = numpy.append(reduced, level[-1])
+		return reduced
+
+	# ---------------------------------------------------------------------- #
+
+	def get_num_levels(self):
+		"""
+		@return the number of decimation levels
+		"""
+		return len(self.levels_min)
+
+	# ---------------------------------------------------------------------- #
+
+	def get_bucket_size(self, level):
+		"""
+		@param level
+		@return the number of samples per bucket at that level
+		"""
+		return self.min_bucket_size * 2**level
+
+	# ---------------------------------------------------------------------- #
+
+	def select_level(self, num_visible_samples, pixel_width, buckets_per_pixel=DEFAULT_BUCKETS_PER_PIXEL):
+		"""
+		@param num_visible_samples the number of samples spanning the output
+		@param pixel_width the width of the output [pixels]
+		@param buckets_per_pixel the minimum number of buckets per pixel
+		@return the coarsest level which still has at least buckets_per_pixel
+			buckets per pixel, or None if even level 0 is too coarse (in which
+			case the samples should be drawn directly)
+		"""
+		max_bucket_size = num_visible_samples / float(pixel_width * buckets_per_pixel)
+		if max_bucket_size < self.min_bucket_size:
+			return None
+		level = int(numpy.floor(numpy.log2(max_bucket_size / self.min_bucket_size)))
+		return min(level, self.get_num_levels() - 1)
+
+	# ---------------------------------------------------------------------- #
+
+	def get_envelope(self, level, start_sample=0, end_sample=-1):
+		"""
+		@param level
+		@param start_sample the first sample of the requested range
+		@param end_sample the sample after the last one of the requested
+			range (-1 means "all samples")
+		@return a tuple containing the index of the first sample of the first
+			bucket, and the bucket minimums and maximums covering the range
+		"""
+		if end_sample is None or end_sample < 0 or end_sample > self.num_samples:
+			end_sample = self.num_samples
+		bucket_size = self.get_bucket_size(level)
+		first_bucket = start_sample // bucket_size
+		last_bucket = -(-end_sample // bucket_size)
+		return first_bucket * bucket_size, self.levels_min[level][first_bucket:last_bucket], self.levels_max[level][first_bucket:last_bucket]
+
+	# ---------------------------------------------------------------------- #
+
+	def get_absolute_peak(self, start_sample=0, end_sample=-1, read_samples=None):
+		"""
+		@param start_sample the first sample of the requested range
+		@param end_sample the sample after the last one of the requested
+			range (-1 means "all samples")
+		@param read_samples a function (start_sample, end_sample) -> samples,
+			used to look at the partially covered buckets at both ends of the
+			range. if None, those buckets are used as a whole (which may
+			slightly overestimate the peak)
+		@return the largest absolute sample value within the range
+		"""
+		if end_sample is None or end_sample < 0 or end_sample > self.num_samples:
+			end_sample = self.num_samples
+		if start_sample <= 0 and end_sample == self.num_samples:
+			return max(abs(float(self.levels_min[-1][0])), abs(float(self.levels_max[-1][0])))
+		bucket_size = self.min_bucket_size
+		first_full_bucket = -(-start_sample // bucket_size)
+		last_full_bucket = end_sample // bucket_size
+		peak = 0.
+		if last_full_bucket > first_full_bucket:
+			peak = max(abs(float(numpy.amin(self.levels_min[0][first_full_bucket:last_full_bucket]))),
+						abs(float(numpy.amax(self.levels_max[0][first_full_bucket:last_full_bucket]))))
+			edges = [(start_sample, first_full_bucket * bucket_size), (last_full_bucket * bucket_size, end_sample)]
+		else:
+			edges = [(start_sample, end_sample)]
+		for edge_start, edge_end in edges:
+			if edge_end <= edge_start:
+				continue
+			if read_samples is not None:
+				samples = read_samples(edge_start, edge_end)
+				peak = max(peak, abs(float(numpy.amin(samples))), abs(float(numpy.amax(samples))))
+			else:
+				_, edge_min, edge_max = self.get_envelope(0, edge_start, edge_end)
+				peak = max(peak, abs(float(numpy.amin(edge_min))), abs(float(numpy.amax(edge_max))))
+		return peak
+
+	# ---------------------------------------------------------------------- #
+
+	def save(self, peaks_file_path):
+		"""
+		write the pyramid to a .peaks file: a small header followed by the
+		float32 minimums and maximums of every level (so that the file can be
+		memory-mapped by @ref load)
+		@param peaks_file_path the full path of the .peaks file
+		"""
+		header = PEAKS_FILE_HEADER.pack(PEAKS_FILE_MAGIC,
+										PEAKS_FILE_VERSION,
+										self.sample_rate or 0,
+										self.num_samples,
+										self.bit_depth or 0,
+										self.min_bucket_size,
+										self.get_num_levels())
+		level_sizes = struct.pack('<' + str(self.get_num_levels()) + 'Q', *[len(level) for level in self.levels_min])
+		level_data = b''.join([numpy.asarray(level_min, dtype='<f4').tobytes() + numpy.asarray(level_max, dtype='<f4').tobytes()
+								for level_min, level_max in zip(self.levels_min, self.levels_max)])
+		build_cache_helper.write_file_atomically(peaks_file_path, header + level_sizes + level_data)
+
+	# ---------------------------------------------------------------------- #
+
+	@classmethod
+	def load(cls, peaks_file_path):
+		"""
+		memory-map a .peaks file written by @ref save
+		@param peaks_file_path the full path of the .peaks file
+		@return a new PeakPyramid whose levels are zero-copy views onto the file
+		"""
+		with open(peaks_file_path, 'rb') as f:
+			peaks_mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+		if len(peaks_mmap) < PEAKS_FILE_HEADER.size:
+			raise Exception("file '" + peaks_file_path + "' is not a .peaks file")
+		magic, version, sample_rate, num_samples, bit_depth, min_bucket_size, num_levels = PEAKS_FILE_HEADER.unpack_from(peaks_mmap, 0)
+		if magic != PEAKS_FILE_MAGIC or version != PEAKS_FILE_VERSION:
+			raise Exception("file '" + peaks_file_path + "' is not a (version " + str(PEAKS_FILE_VERSION) + ") .peaks file")
+		offset = PEAKS_FILE_HEADER.size
+		level_sizes = struct.unpack_from('<' + str(num_levels) + 'Q', peaks_mmap, offset)
+		offset += 8 * num_levels
+		levels_min = []
+		levels_max = []
+		for level_size in level_sizes:
+			levels_min.append(numpy.frombuffer(peaks_mmap, dtype='<f4', count=level_size, offset=offset))
+			offset += 4 * level_size
+			levels_max.append(numpy.frombuffer(peaks_mmap, dtype='<f4', count=level_size, offset=offset))
+			offset += 4 * level_size
+		return cls(levels_min, levels_max, num_samples, min_bucket_size, sample_rate, bit_depth)
+
+######################################################################
+######################################################################
+### Get the width (in pixels) of a full-width figure at the output resolution
+#####
+#####
+### Arguments:
+##### (nothing)
+#####
+### Returns:
+##### int				- figure_width (inches) times image_DPI
+######################################################################
+######################################################################
+def get_output_pixel_width():
+	return int(round(global_values.figure_width * global_values.image_DPI))
+
+######################################################################
+######################################################################
+### Get the peak pyramid of a whole .wav file from the on-disk cache
+##### (building and storing it first, if it is not cached yet)
+#####
+#####
+### Arguments:
+##### wav_file			- a wav_file_helper.WavFile
+##### min_bucket_size	- the number of samples per bucket at level 0
+#####
+### Returns:
+##### PeakPyramid		- the (memory-mapped) pyramid of the whole file
+######################################################################
+######################################################################
+def get_cached_peak_pyramid(wav_file, min_bucket_size=DEFAULT_MIN_BUCKET_SIZE):
+	### Key: content hash of the audio file plus the decimation parameters
+	##### (entries of older content are removed by build_cache_helper)
+	content_hash = build_cache_helper.get_file_content_hash(wav_file.wav_file_path)
+	peaks_file_path = build_cache_helper.get_cache_dir(PEAKS_CACHE_NAMESPACE) + content_hash + '_' + str(min_bucket_size) + '.peaks'
+
+	if os.path.isfile(peaks_file_path):
+		try:
+			peak_pyramid = PeakPyramid.load(peaks_file_path)
+			build_cache_helper.touch_cache_entry(peaks_file_path)
+			return peak_pyramid
+		except Exception:
+			### Unreadable (e.g. older version) entries are rebuilt below
+			pass
+
+	peak_pyramid = PeakPyramid.from_wav_file(wav_file, min_bucket_size)
+	peak_pyramid.save(peaks_file_path)
+	build_cache_helper.evict_least_recently_used(PEAKS_CACHE_NAMESPACE, global_values.peaks_cache_max_bytes, peaks_file_path)
+	return peak_pyramid
+
+######################################################################
+######################################################################
+### Get the level statistics of a frame range of a .wav file from the
+##### on-disk cache (next to the peak pyramids, under the same content hash),
+##### computing and storing them first if they are not cached yet
+#####
+#####
+### Arguments:
+##### wav_file			- a wav_file_helper.WavFile
+##### start_frame		- the first frame of the range
+##### end_frame			- the frame after the last frame of the range
+##### data				- the (already decoded) samples of the range, see
+#####						audio_file_helper.get_mono_data (None means "stream
+#####						them from the file in chunks")
+#####
+### Returns:
+##### dict				- see audio_file_helper.get_data_statistics
+######################################################################
+######################################################################
+def get_cached_audio_statistics(wav_file, start_frame, end_frame, data=None):
+	content_hash = build_cache_helper.get_file_content_hash(wav_file.wav_file_path)
+	statistics_file_path = build_cache_helper.get_cache_dir(PEAKS_CACHE_NAMESPACE) + content_hash + '_' + build_cache_helper.make_cache_key('statistics', start_frame, end_frame) + '.json'
+
+	if os.path.isfile(statistics_file_path):
+		try:
+			with open(statistics_file_path, 'r') as f:
+				statistics = json.load(f)
+			build_cache_helper.touch_cache_entry(statistics_file_path)
+			return statistics
+		except (OSError, ValueError):
+			### Unreadable entries are recomputed below
+			pass
+
+	if data is None:
+		statistics = audio_file_helper.get_audio_statistics(wav_file, start_frame, end_frame)
+	else:
+		chunk_size = audio_file_helper.STATISTICS_CHUNK_SIZE
+		chunks = (data[chunk_start:chunk_start + chunk_size] for chunk_start in range(0, len(data), chunk_size))
+		statistics = audio_file_helper.get_data_statistics(chunks, wav_file.bit_depth, wav_file.is_float())
+	build_cache_helper.write_file_atomically(statistics_file_path, json.dumps({name:float(value) if isinstance(value, (float, numpy.floating)) else value for name, value in statistics.items()}).encode('utf-8'))
+	build_cache_helper.evict_least_recently_used(PEAKS_CACHE_NAMESPACE, global_values.peaks_cache_max_bytes, statistics_file_path)
+	return statistics